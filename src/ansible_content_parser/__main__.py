@@ -6,17 +6,15 @@ via :command:`python -m ansible_content_parser`.
 
 import argparse
 import contextlib
-import copy  # pylint: disable=preferred-module
 import errno
 import json
 import logging
 import os
 import shutil
 import sys
-import tarfile
-import zipfile
 
-from collections.abc import Generator
+from collections.abc import Callable
+from functools import partial
 from importlib.metadata import PackageNotFoundError, version
 from pathlib import Path
 from typing import Any
@@ -24,47 +22,33 @@ from typing import Any
 import giturlparse  # pylint: disable=import-error
 
 from ansiblelint.constants import RC
-from git import Repo
 from packaging.version import Version
 
-from .lint import ansiblelint_main
-from .lintable_dict import LintableDict
+from .clone import clone_repository
+from .exclusion_manifest import write_manifest
+from .extract import extract_stream, extract_tar_file, extract_zip_file
+from .extract_cache import extract_with_cache
+from .ingest_filter import (
+    IngestionFilter,
+    default_exclude_patterns,
+    default_max_file_size,
+)
+from .lint_budget import TimeBudget
+from .lint_cache import LintCache
+from .lint_timings import write_timings
+from .lint_worker import LintWorker
 from .pipeline import run_pipeline
+from .prerun_cache import PrerunCache
 from .report import generate_report
-from .safe_checks import check_tar_file_is_safe, check_zip_file_is_safe
+from .sarif_index import SarifIndex
+from .shard import ShardedLint
 from .version import __version__
+from .workspace import link_tree
 
 
 _logger = logging.getLogger(__name__)
 
 
-# https://stackoverflow.com/questions/6194499/pushd-through-os-system
-@contextlib.contextmanager
-def pushd(new_dir: str) -> Generator[None, None, None]:
-    """Use this in a with block to run some operations from a given directory."""
-    previous_dir = Path.cwd()
-    os.chdir(new_dir)
-    try:
-        yield
-    finally:
-        os.chdir(previous_dir)
-
-
-def execute_ansiblelint(
-    argv: list[str],
-    work_dir: str,
-) -> tuple[dict[str, list[Any]], int]:
-    """Execute ansible-lint."""
-    with pushd(work_dir):
-        # Clear root logger handlers as ansible-lint adds one without checking existing ones.
-        logging.getLogger().handlers.clear()
-
-        result, mark_as_success, return_code = ansiblelint_main(argv)
-        return {
-            "files": [LintableDict(lintable) for lintable in result.files],
-        }, return_code
-
-
 def parse_args(argv: list[str]) -> argparse.Namespace:
     """Parse arguments."""
     parser = argparse.ArgumentParser(
@@ -105,6 +89,168 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
         "a single lint error terminates the execution without generating the "
         "training dataset.",
     )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Stop ansible-lint at the first error when --no-exclude is specified, and "
+        "generate a report that shows only the error.",
+    )
+    parser.add_argument(
+        "--extract-workers",
+        type=int,
+        default=1,
+        help="Specify the number of threads used for extracting files from a zip or "
+        "an uncompressed tar archive (default: 1).",
+    )
+    parser.add_argument(
+        "--extraction-cache",
+        help="Specify a directory for keeping trees extracted from zip/tar archives. When "
+        "the same archive is given again, files are placed in the repository directory "
+        "from the cache without extracting the archive. The directory can be shared by "
+        "concurrent runs.",
+    )
+    parser.add_argument(
+        "--extraction-cache-size",
+        type=int,
+        default=10240,
+        help="Specify the maximum size of the extraction cache in megabytes. Least "
+        "recently used trees are evicted when it is exceeded (default: 10240).",
+    )
+    parser.add_argument(
+        "--extraction-cache-max-age",
+        type=int,
+        default=30,
+        help="Specify the number of days after which unused trees are evicted from the "
+        "extraction cache (default: 30).",
+    )
+    parser.add_argument(
+        "--lint-cache",
+        help="Specify a directory for keeping the results of ansible-lint rules for each "
+        "file. Files whose contents, ansible-lint configuration and versions of "
+        "ansible-lint and ansible-core are unchanged are not linted again. The directory "
+        "can be shared by concurrent runs.",
+    )
+    parser.add_argument(
+        "--lint-cache-size",
+        type=int,
+        default=1024,
+        help="Specify the maximum size of the lint cache in megabytes. Least recently "
+        "used results are evicted when it is exceeded (default: 1024).",
+    )
+    parser.add_argument(
+        "--lint-prerun-cache",
+        help="Specify a directory for keeping the results of the Ansible setup that "
+        "ansible-lint runs when it is loaded. They are reused while the versions and "
+        "configuration of Ansible are unchanged. The directory can be shared by "
+        "concurrent runs.",
+    )
+    parser.add_argument(
+        "--lint-workers",
+        type=int,
+        default=1,
+        help="Specify the number of processes that run ansible-lint. When it is more "
+        "than 1, the repository is split into roles, playbooks and collections, which "
+        "are linted in parallel (default: 1).",
+    )
+    parser.add_argument(
+        "--syntax-check-prepass",
+        action="store_true",
+        help="Run only the Ansible syntax check before ansible-lint to find the files to "
+        "exclude, so that the full rule set of ansible-lint is run only once. When files "
+        "are excluded, sarif.json and lint-result.json contain the results of the syntax "
+        "check.",
+    )
+    parser.add_argument(
+        "--lint-file-time-budget",
+        type=float,
+        metavar="SECONDS",
+        help="Specify the time in seconds that ansible-lint may spend on each file. Files "
+        "that exceed it are excluded in the same way as files with syntax-check errors "
+        "(default: no limit).",
+    )
+    parser.add_argument(
+        "--lint-run-time-budget",
+        type=float,
+        metavar="SECONDS",
+        help="Specify the time in seconds that each execution of ansible-lint may take. "
+        "When it is exceeded, the file being linted and the files that are not linted yet "
+        "are excluded (default: no limit).",
+    )
+    parser.add_argument(
+        "--lint-timings",
+        action="store_true",
+        help="Record the time ansible-lint spends on each phase, rule and file in "
+        "metadata/lint-timings.json and show the most time-consuming ones in report.txt.",
+    )
+    parser.add_argument(
+        "--clone-depth",
+        type=int,
+        help="Create a shallow clone with the specified number of commits when the source "
+        "is a git URL.",
+    )
+    parser.add_argument(
+        "--clone-filter",
+        help="Create a partial clone with the specified filter (e.g. 'blob:none') when the "
+        "source is a git URL. Blobs are fetched on demand.",
+    )
+    parser.add_argument(
+        "--sparse-checkout",
+        action="store_true",
+        help="Check out Ansible-relevant files (e.g. roles/, playbooks/, collections/ "
+        "and YAML files) only when the source is a git URL.",
+    )
+    parser.add_argument(
+        "--git-mirror-cache",
+        help="Specify a directory for keeping bare mirrors of git repositories. When the "
+        "source is a git URL, the mirror is updated with an incremental fetch and the "
+        "repository is cloned from it. The directory can be shared by concurrent runs.",
+    )
+    parser.add_argument(
+        "--git-mirror-cache-size",
+        type=int,
+        default=10240,
+        help="Specify the maximum size of the git mirror cache in megabytes. Least recently "
+        "used mirrors are evicted when it is exceeded (default: 10240).",
+    )
+    parser.add_argument(
+        "--workspace-mode",
+        choices=["copy", "link"],
+        default="copy",
+        help="Specify how files are placed in the repository directory when the source is a "
+        "local directory. 'copy' (=default) copies all files. 'link' clones files with "
+        "reflinks where the file system supports them and hard-links them otherwise. "
+        "The source directory is never modified.",
+    )
+    parser.add_argument(
+        "--ingest-filter",
+        action="store_true",
+        help="Do not place files that are not needed for parsing Ansible content (e.g. "
+        ".git, node_modules, images, binaries, archives and files larger than "
+        f"{default_max_file_size // 1024 // 1024} MB) in the repository directory. This is "
+        "implied by the other --ingest-* options. By default, all files of the source are "
+        "placed.",
+    )
+    parser.add_argument(
+        "--ingest-include",
+        action="append",
+        metavar="PATTERN",
+        help="Place only files that match the specified glob pattern in the repository "
+        "directory. This option can be specified multiple times.",
+    )
+    parser.add_argument(
+        "--ingest-exclude",
+        action="append",
+        metavar="PATTERN",
+        help="Do not place files or directories that match the specified glob pattern in "
+        "the repository directory, in addition to the default ones of --ingest-filter. "
+        "This option can be specified multiple times.",
+    )
+    parser.add_argument(
+        "--ingest-max-file-size",
+        type=int,
+        help="Do not place files larger than the specified size in kilobytes in the "
+        f"repository directory. 0 means no limit (default: {default_max_file_size // 1024}).",
+    )
     parser.add_argument(
         "-v",
         "--verbose",
@@ -140,7 +286,8 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
     )
     parser.add_argument(
         "source",
-        help="source, which can be an zip/tar archive, a git URL or a local directory",
+        help="source, which can be an zip/tar archive, a git URL or a local directory. "
+        "'-' means a zip/tar archive read from the standard input.",
     )
     parser.add_argument(
         "output",
@@ -175,10 +322,46 @@ def set_repo_name_and_repo_url(args: argparse.Namespace, is_file: bool) -> None:
         )
 
 
-def prepare_source_and_output(args: argparse.Namespace) -> Path:
-    """Prepare source (archive/url/directory) and output directory."""
-    source, output = args.source, args.output
+def get_ingest_filter(args: argparse.Namespace) -> IngestionFilter | None:
+    """Create the ingestion filter from the command line arguments.
+
+    None is returned unless --ingest-filter or another --ingest-* option is given, so
+    all files of the source are placed in the repository directory by default.
+    """
+    if not (
+        args.ingest_filter
+        or args.ingest_include
+        or args.ingest_exclude
+        or args.ingest_max_file_size is not None
+    ):
+        return None
+    max_file_size = (
+        default_max_file_size
+        if args.ingest_max_file_size is None
+        else args.ingest_max_file_size * 1024
+    )
+    return IngestionFilter(
+        include=args.ingest_include,
+        exclude=default_exclude_patterns + (args.ingest_exclude or []),
+        max_file_size=max_file_size,
+    )
+
+
+def create_metadata_directory(
+    metadata_path: Path,
+    ingest_filter: IngestionFilter | None,
+) -> None:
+    """Create the metadata directory and record the files skipped at ingestion."""
+    metadata_path.mkdir()
+    if ingest_filter:
+        ingest_filter.write_summary(metadata_path)
+
 
+def get_archive_extractor(
+    args: argparse.Namespace,
+    ingest_filter: IngestionFilter | None,
+) -> Callable[[str, Path], None] | None:
+    """Return the function that extracts the source if it is a supported archive."""
     supported_tar_file_extensions = [
         ".tar",
         ".tar.gz",
@@ -189,50 +372,102 @@ def prepare_source_and_output(args: argparse.Namespace) -> Path:
         ".txz",
     ]
 
+    if args.source.endswith(".zip"):
+        return partial(
+            extract_zip_file,
+            workers=args.extract_workers,
+            ingest_filter=ingest_filter,
+        )
+    for ext in supported_tar_file_extensions:
+        if args.source.endswith(ext):
+            return partial(
+                extract_tar_file,
+                workers=args.extract_workers,
+                ingest_filter=ingest_filter,
+            )
+    return None
+
+
+def extract_archive(
+    extract: Callable[[str, Path], None],
+    args: argparse.Namespace,
+    repository_path: Path,
+    ingest_filter: IngestionFilter | None,
+) -> None:
+    """Extract an archive to the repository directory through the cache if it is enabled."""
+    if args.extraction_cache:
+        extract_with_cache(
+            args.source,
+            repository_path,
+            extract,
+            Path(args.extraction_cache),
+            args.extraction_cache_size * 1024 * 1024,
+            args.extraction_cache_max_age * 24 * 60 * 60,
+            ingest_filter,
+        )
+    else:
+        extract(args.source, repository_path)
+
+
+def prepare_source_and_output(args: argparse.Namespace) -> Path:
+    """Prepare source (archive/url/directory) and output directory."""
+    source, output = args.source, args.output
+    ingest_filter = get_ingest_filter(args)
+
     out_path = setup_output(output)
     repository_path = out_path / "repository"
     metadata_path = out_path / "metadata"
 
+    # Check if the specified source is an archive read from the standard input.
+    if source == "-":
+        try:
+            extract_stream(
+                sys.stdin.buffer,
+                repository_path,
+                args.extract_workers,
+                ingest_filter,
+            )
+            create_metadata_directory(metadata_path, ingest_filter)
+            set_repo_name_and_repo_url(args, False)
+            return get_project_root(repository_path)
+        except Exception:
+            _logger.exception(
+                "An exception thrown in extracting files from the standard input.",
+            )
+            sys.exit(1)
+
     # Check if the specified source is a supported archive.
-    if source.endswith(".zip"):
+    extract = get_archive_extractor(args, ingest_filter)
+    if extract:
         try:
-            check_zip_file_is_safe(source)
-            with zipfile.ZipFile(source) as zip_file:
-                repository_path.mkdir()
-                zip_file.extractall(repository_path)  # noqa: S202
-                metadata_path.mkdir()
-                set_repo_name_and_repo_url(args, True)
-                return get_project_root(repository_path)
+            extract_archive(extract, args, repository_path, ingest_filter)
+            create_metadata_directory(metadata_path, ingest_filter)
+            set_repo_name_and_repo_url(args, True)
+            return get_project_root(repository_path)
         except Exception:
             _logger.exception(
                 "An exception thrown in extracting files from %s.",
                 source,
             )
             sys.exit(1)
-    else:
-        for ext in supported_tar_file_extensions:
-            if source.endswith(ext):
-                try:
-                    check_tar_file_is_safe(source)
-                    with tarfile.open(source) as tar:  # NOSONAR
-                        repository_path.mkdir()
-                        tar.extractall(repository_path)  # noqa: S202
-                        metadata_path.mkdir()
-                        set_repo_name_and_repo_url(args, True)
-                    return get_project_root(repository_path)
-                except Exception:
-                    _logger.exception(
-                        "An exception thrown in extracting files from %s.",
-                        source,
-                    )
-                    sys.exit(1)
 
     # Check if the specified source is a URL
-    if giturlparse.validate(source):
+    if giturlparse.validate(source) or source.startswith("file://"):
         try:
             repository_path.mkdir()
-            Repo.clone_from(source, repository_path)
-            metadata_path.mkdir()
+            clone_repository(
+                source,
+                repository_path,
+                depth=args.clone_depth,
+                blob_filter=args.clone_filter,
+                sparse_checkout=args.sparse_checkout,
+                mirror_cache=(
+                    Path(args.git_mirror_cache) if args.git_mirror_cache else None
+                ),
+                mirror_cache_size=args.git_mirror_cache_size * 1024 * 1024,
+                ingest_filter=ingest_filter,
+            )
+            create_metadata_directory(metadata_path, ingest_filter)
             set_repo_name_and_repo_url(args, False)
             return repository_path
         except Exception:
@@ -245,8 +480,12 @@ def prepare_source_and_output(args: argparse.Namespace) -> Path:
     # Assume the source is a local directory
     if Path(source).is_dir():
         # As shutil.copytree creates repository_path, we do not need to call repository_path,mkdir()
-        shutil.copytree(source, repository_path)
-        metadata_path.mkdir()
+        ignore = ingest_filter.get_ignore_function(source) if ingest_filter else None
+        if args.workspace_mode == "link":
+            link_tree(source, repository_path, ignore)
+        else:
+            shutil.copytree(source, repository_path, ignore=ignore)
+        create_metadata_directory(metadata_path, ingest_filter)
         set_repo_name_and_repo_url(args, True)
     else:
         _logger.error("%s is not a directory.", source)
@@ -299,12 +538,28 @@ def main() -> None:
         update_argv(argv, args)
 
         try:
-            execute_lint_step(args, argv, metadata_path, repository_path, sarif_file)
+            write_report = execute_lint_step(
+                args,
+                argv,
+                metadata_path,
+                repository_path,
+                sarif_file,
+            )
         except Exception:
             _logger.exception("An exception was thrown while running ansible-lint.")
             sys.exit(1)
 
-        return_code = run_pipeline(args, repository_path)
+        try:
+            return_code = run_pipeline(args, repository_path)
+        except Exception:
+            # The report is generated without the module section.
+            write_report()
+            raise
+        write_report(sage_objects=str(metadata_path / "sage-objects.json"))
+        _logger.info(
+            "Execution report was generated at %s.",
+            str(out_path / "report.txt"),
+        )
 
     except OSError as exc:
         # NOTE: Only "broken pipe" is acceptable to ignore
@@ -337,109 +592,194 @@ def execute_lint_step(
     metadata_path: Path,
     repository_path: Path,
     sarif_file: str,
-) -> None:
-    """Execute ansible-lint and create metadata files."""
+) -> Callable[..., None]:
+    """Execute ansible-lint and create metadata files.
+
+    The report is generated when lint errors stop the execution.  Otherwise, a function
+    that generates the report is returned, so that the module section can be added after
+    the pipeline is run.
+    """
     exclude_paths: list[str] = []
+    timings: list[dict[str, dict[str, float]]] = []
+    fail_fast: dict[str, Any] | None = None
 
     lint_result = ""
     lint_result2 = ""
     sarif_file2 = ""
+    # Each SARIF file is read once into an index used for exclusions and the report.
+    sarif_index: SarifIndex | None = None
+    sarif_index2: SarifIndex | None = None
     return_code = RC.SUCCESS
 
-    if args.skip_ansible_lint:
-        sarif_file = ""
-    else:
-        serializable_result, return_code = execute_ansiblelint(
-            argv,
-            str(repository_path),
+    if not args.skip_ansible_lint:
+        lint_cache = (
+            LintCache(
+                Path(args.lint_cache).absolute(),
+                args.lint_cache_size * 1024 * 1024,
+                get_version(),
+            )
+            if args.lint_cache
+            else None
         )
-        lint_result = str(metadata_path / "lint-result.json")
-        with Path(lint_result).open(
-            "w",
-            encoding="utf-8",
-        ) as f:
-            f.write(json.dumps(serializable_result))
-
-        if return_code == RC.SUCCESS or not args.no_exclude:
-            exclude_paths = parse_sarif_json(exclude_paths, sarif_file, True)
-
-            # If syntax-errors occurred on some files, kick off the second run excluding those files
-            if len(exclude_paths) > 0:
-                lint_result2 = str(metadata_path / "lint-result-2.json")
-                sarif_file2 = str(metadata_path / "sarif-2.json")
-                argv = ["ansible-lint", "--sarif-file", sarif_file2]
-                argv.append("--exclude")
-                argv.extend(exclude_paths)
-                update_argv(argv, args)
-                _logger.info(",".join(argv))
-                serializable_result_2, return_code = execute_ansiblelint(
-                    argv,
-                    str(repository_path),
-                )
-                # create a shallow copy of exclude_paths because the following parse_sarif_json() call
-                # will add more files to the list.
-                serializable_result_2["excluded"] = copy.copy(exclude_paths)
-                exclude_paths = parse_sarif_json(exclude_paths, sarif_file2, False)
-
-                with Path(lint_result2).open(mode="w", encoding="utf-8") as f:
-                    f.write(json.dumps(serializable_result_2))
-            else:
-                exclude_paths = parse_sarif_json(exclude_paths, sarif_file, False)
-
+        prerun_cache = (
+            PrerunCache(Path(args.lint_prerun_cache).absolute())
+            if args.lint_prerun_cache
+            else None
+        )
+        time_budget = (
+            TimeBudget(args.lint_file_time_budget, args.lint_run_time_budget)
+            if args.lint_file_time_budget or args.lint_run_time_budget
+            else None
+        )
+        # With a single worker, ansible-lint runs in this process, which parses only
+        # this repository, and the working directory is restored after each run.
+        # Shards are linted in worker processes, which change into the repository.
+        linter: ShardedLint | LintWorker = (
+            ShardedLint(
+                str(repository_path),
+                args.lint_workers,
+                lint_cache,
+                time_budget,
+                lint_timings=args.lint_timings,
+                fail_fast=args.fail_fast and args.no_exclude,
+                prerun_cache=prerun_cache,
+            )
+            if args.lint_workers > 1
+            else LintWorker(
+                str(repository_path),
+                lint_cache,
+                time_budget,
+                lint_timings=args.lint_timings,
+                fail_fast=args.fail_fast and args.no_exclude,
+                prerun_cache=prerun_cache,
+                in_process=True,
+            )
+        )
+        with contextlib.closing(linter):
+            syntax_checked = args.syntax_check_prepass and not args.no_exclude
+            serializable_result, return_code, sarif_index = _run_first(
+                linter,
+                argv,
+                sarif_file,
+                syntax_checked,
+                timings,
+            )
+            # The error ansible-lint stopped at, which fails the execution below
+            fail_fast = serializable_result.get("fail_fast")
+            lint_result = str(metadata_path / "lint-result.json")
+            with Path(lint_result).open(
+                "w",
+                encoding="utf-8",
+            ) as f:
+                f.write(json.dumps(serializable_result))
+
+            if sarif_index and (return_code == RC.SUCCESS or not args.no_exclude):
+                exclude_paths = sarif_index.get_exclude_paths(exclude_paths, True)
+                # Files over the time budget are excluded as files with syntax-check errors.
+                over_budget = serializable_result.get("over_budget", {})
+                exclude_paths = sorted({*exclude_paths, *over_budget})
+
+                # If syntax-errors occurred on some files, kick off the second run excluding those files
+                if len(exclude_paths) > 0:
+                    lint_result2 = str(metadata_path / "lint-result-2.json")
+                    sarif_file2 = str(metadata_path / "sarif-2.json")
+                    argv = ["ansible-lint", "--sarif-file", sarif_file2]
+                    argv.append("--exclude")
+                    argv.extend(exclude_paths)
+                    update_argv(argv, args)
+                    _logger.info(",".join(argv))
+                    if syntax_checked:
+                        serializable_result_2, return_code = linter.run(
+                            argv,
+                            skip_syntax_check=True,
+                        )
+                    else:
+                        # Only the files affected by the exclusion are linted again and
+                        # the results of other files are carried over from the first run.
+                        serializable_result_2, return_code = linter.rerun(
+                            argv,
+                            exclude_paths,
+                        )
+                    _pop_timings(serializable_result_2, timings)
+                    serializable_result_2["excluded"] = exclude_paths
+                    sarif_index2 = SarifIndex.load(sarif_file2)
+                    exclude_paths = sarif_index2.get_exclude_paths(exclude_paths, False)
+                    over_budget = serializable_result_2.get("over_budget", {})
+                    exclude_paths = sorted({*exclude_paths, *over_budget})
+
+                    with Path(lint_result2).open(mode="w", encoding="utf-8") as f:
+                        f.write(json.dumps(serializable_result_2))
+                else:
+                    exclude_paths = sarif_index.get_exclude_paths(exclude_paths, False)
+
+            # Autofix results of shards must be written before the pipeline reads files.
+            linter.apply_writes()
             if len(exclude_paths) > 0:
-                # Rename excluded files to have __EXCLUDED__ extension so that they won't be processed by sage
-                _rename_excluded_files(exclude_paths, repository_path)
+                # The pipeline skips the files in the manifest, so they are not renamed.
+                write_manifest(metadata_path, exclude_paths, repository_path)
                 _logger.warning(
                     "Following files are excluded from training set generation due to ansible-lint rule "
                     "violations: %s",
                     ",".join(exclude_paths),
                 )
+            if args.lint_timings:
+                write_timings(metadata_path, timings)
 
-    generate_report(
+    write_report = partial(
+        generate_report,
         lint_result,
         lint_result2,
-        sarif_file,
-        sarif_file2,
+        sarif_index,
+        sarif_index2,
         args,
         exclude_paths,
+        fail_fast,
     )
 
     if return_code != RC.SUCCESS and args.no_exclude:
+        write_report()
         msg = "One or more lint errors were found by ansible-lint"
         raise RuntimeError(msg)
 
+    return write_report
 
-def _rename_excluded_files(exclude_paths: list[str], repository_path: Path) -> None:
-    with pushd(str(repository_path)):
-        for p in exclude_paths:
-            path = Path(p)
-            # Do not attempt to rename directories (e.g. role names)
-            if path.is_file():
-                Path(p).rename(p + ".__EXCLUDED__")
 
-
-def parse_sarif_json(
-    exclude_paths: list[str],
+def _run_first(
+    linter: ShardedLint | LintWorker,
+    argv: list[str],
     sarif_file: str,
-    syntax_check_errors_only: bool,
-) -> list[str]:
-    """Analyze SARIF.json to see if syntax-check errors occurred or not on the first run."""
-    with Path(sarif_file).open("rb") as f:
-        o = json.load(f)
-        for run in o["runs"]:
-            for result in run["results"]:
-                if (
-                    result["ruleId"].startswith("syntax-check")
-                    or not syntax_check_errors_only
-                    and ("level" not in result or result["level"] == "error")
-                ):
-                    exclude_paths.extend(
-                        [
-                            location["physicalLocation"]["artifactLocation"]["uri"]
-                            for location in result["locations"]
-                        ],
-                    )
-    return sorted(set(exclude_paths))
+    syntax_checked: bool,
+    timings: list[dict[str, dict[str, float]]],
+) -> tuple[dict[str, Any], int, SarifIndex | None]:
+    """Run ansible-lint for the first time and index the SARIF file written by it.
+
+    If syntax_checked is set, the first run is only the syntax check if it finds files to
+    exclude.  The SARIF file is not indexed when the run was stopped at the first error.
+    """
+    if syntax_checked:
+        serializable_result = _pop_timings(linter.syntax_check(argv), timings)
+        sarif_index = SarifIndex.load(sarif_file)
+        if sarif_index.get_exclude_paths([], True) or serializable_result.get(
+            "over_budget",
+        ):
+            return serializable_result, RC.SUCCESS, sarif_index
+        serializable_result, return_code = linter.run(argv, skip_syntax_check=True)
+    else:
+        serializable_result, return_code = linter.run(argv)
+    _pop_timings(serializable_result, timings)
+    if serializable_result.get("fail_fast"):
+        return serializable_result, return_code, None
+    return serializable_result, return_code, SarifIndex.load(sarif_file)
+
+
+def _pop_timings(
+    serializable_result: dict[str, Any],
+    timings: list[dict[str, dict[str, float]]],
+) -> dict[str, Any]:
+    """Move the timings of a run out of its result, which is written to metadata."""
+    if "timings" in serializable_result:
+        timings.append(serializable_result.pop("timings"))
+    return serializable_result
 
 
 def update_argv(argv: list[str], args: argparse.Namespace) -> None:
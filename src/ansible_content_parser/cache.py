@@ -0,0 +1,120 @@
+"""Manage cache directories shared by concurrent processes on a host.
+
+A cache directory contains one subdirectory per entry.  Each entry has a lock file next
+to it (<entry>.lock).  Processes using an entry hold a shared lock on it, and an entry is
+updated or evicted only while an exclusive lock is held.  The modification time of an
+entry directory records when it was used last.
+"""
+
+import contextlib
+import fcntl
+import logging
+import os
+import shutil
+import time
+
+from collections.abc import Callable, Generator
+from pathlib import Path
+
+
+_logger = logging.getLogger(__name__)
+
+
+def get_lock_path(entry: Path) -> Path:
+    """Return the path of the lock file for a cache entry."""
+    return entry.with_name(entry.name + ".lock")
+
+
+@contextlib.contextmanager
+def file_lock(
+    path: Path,
+    *,
+    shared: bool = False,
+    blocking: bool = True,
+) -> Generator[bool, None, None]:
+    """Hold an advisory lock on the given file in a with block.
+
+    If blocking is False and the lock is held by another process, False is yielded
+    without acquiring the lock.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a") as f:
+        operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        if not blocking:
+            operation |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(f, operation)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def exclusive_lock(path: Path) -> Generator[Callable[[], None], None, None]:
+    """Hold an exclusive lock on the given file, which can be downgraded to a shared lock.
+
+    The yielded function converts the lock to a shared lock on the same open file, so
+    that the entry is used with the lock it was created or updated with.  flock() does
+    not guarantee that the conversion is atomic, so another process may acquire an
+    exclusive lock while it is converted, and callers check the entry again afterwards.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield lambda: fcntl.flock(f, fcntl.LOCK_SH)
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def touch(entry: Path) -> None:
+    """Record that a cache entry was used."""
+    os.utime(entry)
+
+
+def get_size(path: Path) -> int:
+    """Return the total size of the files under the given directory."""
+    size = 0
+    for dir_path, _, filenames in os.walk(path):
+        for filename in filenames:
+            with contextlib.suppress(OSError):
+                size += (Path(dir_path) / filename).lstat().st_size
+    return size
+
+
+def evict_least_recently_used(
+    cache_dir: Path,
+    max_size: int,
+    max_age: float | None = None,
+) -> None:
+    """Remove least recently used entries until the cache fits in max_size bytes.
+
+    Entries older than max_age seconds are removed as well.  Entries being used by
+    other processes are never removed.  Names starting with "." are reserved for
+    entries being created and are ignored.
+    """
+    if not cache_dir.is_dir():
+        return
+
+    entries = sorted(
+        (p for p in cache_dir.iterdir() if p.is_dir() and not p.name.startswith(".")),
+        key=lambda p: p.stat().st_mtime,
+    )
+    sizes = {entry: get_size(entry) for entry in entries}
+    total_size = sum(sizes.values())
+    now = time.time()
+
+    for entry in entries:
+        expired = max_age is not None and now - entry.stat().st_mtime > max_age
+        if total_size <= max_size and not expired:
+            continue
+        with file_lock(get_lock_path(entry), blocking=False) as locked:
+            if not locked:
+                continue
+            _logger.info("Evicting %s from the cache.", entry)
+            shutil.rmtree(entry, ignore_errors=True)
+            total_size -= sizes[entry]
@@ -0,0 +1,201 @@
+"""Clone git repositories."""
+
+import contextlib
+import hashlib
+import logging
+import re
+import shutil
+import tempfile
+
+from collections.abc import Generator
+from pathlib import Path
+from typing import Any
+
+import giturlparse  # pylint: disable=import-error
+
+from git import Repo
+
+from .cache import evict_least_recently_used, exclusive_lock, get_lock_path, touch
+from .ingest_filter import IngestionFilter, match_path
+
+
+_logger = logging.getLogger(__name__)
+
+# Patterns (in the .gitignore syntax) of the files checked out with --sparse-checkout.
+sparse_checkout_patterns = [
+    "roles/",
+    "playbooks/",
+    "collections/",
+    "group_vars/",
+    "host_vars/",
+    "inventory/",
+    "inventories/",
+    "*.yml",
+    "*.yaml",
+    ".ansible-lint",
+    ".config/",
+    "ansible.cfg",
+]
+
+
+def normalize_url(source: str) -> str:
+    """Normalize a git URL so that HTTPS and SSH URLs of a repository are the same."""
+    if giturlparse.validate(source):
+        parsed = giturlparse.parse(source)
+        return f"{parsed.host}/{parsed.pathname.strip('/').removesuffix('.git')}"
+    return source.rstrip("/").removesuffix(".git")
+
+
+def get_mirror_name(source: str) -> str:
+    """Return the name of the mirror directory for a git URL."""
+    normalized_url = normalize_url(source)
+    digest = hashlib.sha256(normalized_url.encode()).hexdigest()[:12]
+    return re.sub(r"[^A-Za-z0-9._-]", "_", normalized_url).lstrip(".") + "-" + digest
+
+
+@contextlib.contextmanager
+def mirror(
+    source: str,
+    cache_dir: Path,
+    cache_size: int,
+) -> Generator[Path, None, None]:
+    """Update the bare mirror of a git repository and yield its path.
+
+    The mirror is created on the first use and updated with an incremental fetch
+    afterwards.  While the with block is executed, the mirror is not evicted from the
+    cache.  Least recently used mirrors are evicted when the total size of the cache
+    exceeds cache_size bytes.
+    """
+    mirror_path = cache_dir / get_mirror_name(source)
+    lock_path = get_lock_path(mirror_path)
+
+    while True:
+        with exclusive_lock(lock_path) as downgrade:
+            if mirror_path.is_dir():
+                _logger.debug("Updating the mirror %s", mirror_path)
+                Repo(mirror_path).git.remote("update", "--prune")
+            else:
+                # Clone to a temporary directory first so that an interrupted clone
+                # does not leave a broken mirror behind.
+                temp_path = mirror_path.with_name("." + mirror_path.name)
+                shutil.rmtree(temp_path, ignore_errors=True)
+                _logger.debug("Creating the mirror %s", mirror_path)
+                Repo.clone_from(source, temp_path, mirror=True)
+                temp_path.rename(mirror_path)
+            touch(mirror_path)
+
+            # The mirror is used with a shared lock, so that it is not evicted while
+            # other processes use it too.
+            downgrade()
+            if mirror_path.is_dir():
+                yield mirror_path
+                evict_least_recently_used(cache_dir, cache_size)
+                return
+        _logger.debug(
+            "The mirror %s was evicted while the lock was converted",
+            mirror_path,
+        )
+
+
+def _checkout(
+    repo: Repo,
+    ingest_filter: IngestionFilter,
+    *,
+    sparse_checkout: bool,
+    check_size: bool,
+) -> None:
+    """Check out the files of HEAD accepted by ingest_filter to a no_checkout clone.
+
+    If check_size is False, file sizes are not checked, as getting the size of a blob
+    fetches it in a partial clone.
+    """
+    ls_tree_args = ["-r", "-z", "--full-tree"]
+    if check_size:
+        ls_tree_args.append("-l")
+
+    paths = []
+    for entry in repo.git.ls_tree(*ls_tree_args, "HEAD").split("\0"):
+        if not entry:
+            continue
+        info, path = entry.split("\t", 1)
+        fields = info.split()
+        # Submodules are not cloned.
+        if fields[1] != "blob":
+            continue
+        if sparse_checkout and not any(
+            match_path(path, p) for p in sparse_checkout_patterns
+        ):
+            continue
+        if ingest_filter.accept_file(path, int(fields[3]) if check_size else 0):
+            paths.append(path)
+
+    if not paths:
+        return
+    with tempfile.TemporaryFile() as f:
+        f.write("\0".join(paths).encode())
+        f.seek(0)
+        repo.git.checkout(
+            "HEAD",
+            "--pathspec-from-file=-",
+            "--pathspec-file-nul",
+            istream=f,
+            env={"GIT_LITERAL_PATHSPECS": "1"},
+        )
+
+
+def clone_repository(
+    source: str,
+    repository_path: Path,
+    *,
+    depth: int | None = None,
+    blob_filter: str | None = None,
+    sparse_checkout: bool = False,
+    mirror_cache: Path | None = None,
+    mirror_cache_size: int = 0,
+    ingest_filter: IngestionFilter | None = None,
+) -> None:
+    """Clone a git repository.
+
+    Only the working tree of a single commit is parsed, so the history and the blobs
+    can be left on the server:
+
+    - depth creates a shallow clone with the given number of commits.
+    - blob_filter creates a partial clone (e.g. "blob:none"), in which git fetches the
+      blobs it needs on demand.
+    - sparse_checkout checks out files that match sparse_checkout_patterns only.
+
+    If mirror_cache is specified, the repository is cloned from a local mirror kept in
+    that directory (see mirror()).  As a local clone shares objects with the mirror
+    through hard links, depth and blob_filter are not used in that case.
+
+    If ingest_filter is specified, only the files accepted by it are checked out.  The
+    size limit of the filter is not applied to a partial clone.
+    """
+    kwargs: dict[str, Any] = {}
+    if ingest_filter:
+        kwargs["no_checkout"] = True
+    elif sparse_checkout:
+        kwargs["sparse"] = True
+
+    if mirror_cache:
+        with mirror(source, mirror_cache, mirror_cache_size) as mirror_path:
+            repo = Repo.clone_from(str(mirror_path), repository_path, **kwargs)
+            repo.remote().set_url(source)
+    else:
+        if depth:
+            kwargs["depth"] = depth
+        if blob_filter:
+            kwargs["filter"] = blob_filter
+
+        _logger.debug("Cloning %s with options %s", source, kwargs)
+        repo = Repo.clone_from(source, repository_path, **kwargs)
+
+    if ingest_filter:
+        _checkout(
+            repo,
+            ingest_filter,
+            sparse_checkout=sparse_checkout,
+            check_size=bool(mirror_cache or not blob_filter),
+        )
+    elif sparse_checkout:
+        repo.git.sparse_checkout("set", "--no-cone", *sparse_checkout_patterns)
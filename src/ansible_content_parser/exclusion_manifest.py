@@ -0,0 +1,122 @@
+"""Record the files excluded from training set generation.
+
+Files with errors found by ansible-lint are excluded from the training set.  Their paths
+are written to a manifest in the metadata directory, which the pipeline reads to hide
+those files from sage-scan, so that the repository directory is not modified to exclude
+them and can be a tree shared with the source (see workspace.py).
+"""
+
+from __future__ import annotations
+
+import collections
+import contextlib
+import functools
+import json
+import threading
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+
+_excluded_files_json = "excluded-files.json"
+
+# Excluded files are listed in file_inventory.json with the suffix that was added to
+# their names when they were renamed to be excluded.
+_excluded_suffix = ".__EXCLUDED__"
+
+# The absolute paths of the files hidden from sage-scan by the pipelines in progress
+_hidden: collections.Counter[str] = collections.Counter()
+_hidden_lock = threading.Lock()
+
+
+def write_manifest(
+    metadata_path: Path,
+    exclude_paths: list[str],
+    repository_path: Path,
+) -> None:
+    """Write the files to exclude to the metadata directory.
+
+    Paths that are not files (e.g. role names) are not excluded from the training set.
+    """
+    files = [p for p in exclude_paths if (repository_path / p).is_file()]
+    with (metadata_path / _excluded_files_json).open("w", encoding="utf-8") as f:
+        json.dump(files, f, indent=2)
+
+
+def load_manifest(metadata_path: Path) -> set[str]:
+    """Return the files to exclude, which is empty if no files were excluded."""
+    path = metadata_path / _excluded_files_json
+    if not path.exists():
+        return set()
+    with path.open(encoding="utf-8") as f:
+        return set(json.load(f))
+
+
+def drop_excluded_objects(objects: list[Any], excluded: set[str]) -> list[Any]:
+    """Return the objects of sage-scan that are not defined in excluded files."""
+    return [o for o in objects if getattr(o, "filepath", "") not in excluded]
+
+
+def _is_hidden(path: str) -> bool:
+    return bool(_hidden) and str(Path(path).absolute()) in _hidden
+
+
+@functools.cache
+def _patch_traversal() -> None:
+    """Make sage-scan and ansible-risk-insight skip the hidden files.
+
+    sage-scan lists the files of a repository with find_all_files(), and the loaders of
+    ansible-risk-insight find playbooks, roles and task files with safe_glob().  The
+    hidden files are dropped from the results of safe_glob(), and find_all_files() lists
+    them with the suffix of excluded files, so that they are never loaded.  The patches
+    do nothing while no files are hidden.
+    """
+    # pylint: disable=import-error,import-outside-toplevel
+    import sage_scan.pipeline
+
+    from ansible_risk_insight import finder, model_loader
+
+    original_safe_glob = finder.safe_glob
+
+    @functools.wraps(original_safe_glob)
+    def safe_glob(*args: Any, **kwargs: Any) -> list[str]:
+        return [p for p in original_safe_glob(*args, **kwargs) if not _is_hidden(p)]
+
+    def find_all_files(root_dir: str) -> list[str]:
+        # This is find_all_files() of ansible-risk-insight, which calls safe_glob().
+        files = original_safe_glob([str(Path(root_dir) / "**" / "*")], type="file")
+        return [p + _excluded_suffix if _is_hidden(p) else p for p in files]
+
+    finder.safe_glob = safe_glob
+    model_loader.safe_glob = safe_glob
+    sage_scan.pipeline.find_all_files = find_all_files  # type: ignore[attr-defined]
+
+
+@contextlib.contextmanager
+def hide_excluded_files(
+    repository_path: Path,
+    excluded: set[str],
+) -> Generator[None, None, None]:
+    """Hide excluded files from sage-scan while the context is active.
+
+    Files in the repository are found by the directory traversal of sage-scan, and the
+    excluded ones are skipped (see _patch_traversal()).  A file that is reached by a
+    reference from another file (e.g. include_tasks) may still be loaded, and the
+    objects defined in it are dropped with drop_excluded_objects().
+    """
+    _patch_traversal()
+    paths = [str((repository_path / p).absolute()) for p in excluded]
+    with _hidden_lock:
+        _hidden.update(paths)
+    try:
+        yield
+    finally:
+        with _hidden_lock:
+            _hidden.subtract(paths)
+            for path in paths:
+                if _hidden[path] <= 0:
+                    del _hidden[path]
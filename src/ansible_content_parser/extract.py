@@ -0,0 +1,623 @@
+"""Extract archive files while enforcing the limits defined in safe_checks."""
+
+import io
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import zipfile
+
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from pathlib import Path
+from typing import IO, Any
+
+from .ingest_filter import IngestionFilter, normalize_path
+from .safe_checks import (
+    _check_ratio,
+    _check_total_size_and_entries,
+    _check_zip_info_list,
+    chunk_size,
+)
+
+
+_logger = logging.getLogger(__name__)
+
+
+class _ExtractionBudget:
+    """Count entries and bytes written so far against the safe_checks thresholds.
+
+    The counters are shared by all extraction threads, so the limits are enforced for
+    the archive as a whole.
+    """
+
+    def __init__(self) -> None:
+        self.total_entry_archive = 0
+        self.total_size_archive = 0
+        self.aborted = False
+        self._lock = threading.Lock()
+
+    def add_entry(self) -> None:
+        with self._lock:
+            self.total_entry_archive += 1
+            _check_total_size_and_entries(
+                self.total_entry_archive,
+                self.total_size_archive,
+            )
+
+    def add_size(self, size: int) -> None:
+        with self._lock:
+            if self.aborted:
+                msg = "extraction was aborted"
+                raise RuntimeError(msg)
+            self.total_size_archive += size
+            _check_total_size_and_entries(
+                self.total_entry_archive,
+                self.total_size_archive,
+            )
+
+
+class _TarMemberReader:
+    """Read the data of an uncompressed tar member with os.pread.
+
+    As os.pread does not move the file offset, all threads can share one descriptor.
+    """
+
+    def __init__(self, fd: int, member: tarfile.TarInfo) -> None:
+        self._fd = fd
+        self._offset = member.offset_data
+        self._remaining = member.size
+
+    def read(self, size: int) -> bytes:
+        size = min(size, self._remaining)
+        if size <= 0:
+            return b""
+        chunk = os.pread(self._fd, size, self._offset)
+        if not chunk:
+            msg = "unexpected end of data"
+            raise tarfile.ReadError(msg)
+        self._offset += len(chunk)
+        self._remaining -= len(chunk)
+        return chunk
+
+
+def _get_member_path(root: Path, name: str) -> Path:
+    """Return the path a member is extracted to, making sure it stays under root."""
+    path = root / name
+    if path == root:
+        return root
+    parent = path.parent.resolve()
+    if (parent != root and root not in parent.parents) or path.name == "..":
+        msg = f"{name} points outside of the extraction directory"
+        raise RuntimeError(msg)
+    return parent / path.name
+
+
+def _check_link_target(root: Path, path: Path, linkname: str) -> None:
+    target = (path.parent / linkname).resolve()
+    if target != root and root not in target.parents:
+        msg = f"{path.relative_to(root)} links to {linkname}, which is outside of the extraction directory"
+        raise RuntimeError(msg)
+
+
+def _prepare_target(path: Path) -> None:
+    """Make sure the parent exists and nothing is written through an existing link."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.is_symlink() or (path.exists() and not path.is_dir()):
+        path.unlink()
+
+
+def _copy_stream(
+    src: IO[bytes] | _TarMemberReader,
+    path: Path,
+    budget: _ExtractionBudget,
+    compress_size: int | None = None,
+) -> None:
+    size_entry = 0
+    with path.open("wb") as f:
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            # Check the limits before writing so that we never exceed them on disk.
+            size_entry += len(chunk)
+            if compress_size is not None:
+                _check_ratio(size_entry, compress_size)
+            budget.add_size(len(chunk))
+            f.write(chunk)
+
+
+def _extract_tar_member(
+    tar: tarfile.TarFile,
+    member: tarfile.TarInfo,
+    root: Path,
+    budget: _ExtractionBudget,
+) -> Path | None:
+    """Extract a single tar member and return its path, or None if it was skipped."""
+    path = _get_member_path(root, member.name)
+
+    if member.isdir():
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    if path == root:
+        msg = f"{member.name} is not a directory"
+        raise RuntimeError(msg)
+
+    if member.isreg():
+        budget.add_entry()
+        _prepare_target(path)
+        src = tar.extractfile(member)
+        if src is not None:
+            with src:
+                _copy_stream(src, path, budget)
+    elif member.issym():
+        _check_link_target(root, path, member.linkname)
+        _prepare_target(path)
+        path.symlink_to(member.linkname)
+        return path
+    elif member.islnk():
+        budget.add_entry()
+        link_target = _get_member_path(root, member.linkname)
+        _prepare_target(path)
+        budget.add_size(link_target.stat().st_size)
+        try:
+            path.hardlink_to(link_target)
+        except OSError:
+            shutil.copyfile(link_target, path)
+    else:
+        _logger.warning("%s is skipped as it is not a regular file.", member.name)
+        return None
+
+    _set_attributes(path, member)
+    return path
+
+
+def _accept_tar_member(
+    ingest_filter: IngestionFilter,
+    member: tarfile.TarInfo,
+    sizes: dict[str, int],
+) -> bool:
+    """Apply the ingestion filter to a tar member.
+
+    sizes maps the names of the regular files accepted so far to their sizes, so that
+    a hard link is skipped along with its target.
+    """
+    name = normalize_path(member.name)
+    if member.isdir():
+        return ingest_filter.accept_directory(name)
+    if member.islnk():
+        target = normalize_path(member.linkname)
+        if target in ingest_filter.skipped:
+            ingest_filter.skip(name, ingest_filter.skipped[target])
+            return False
+        return ingest_filter.accept_file(name, sizes.get(target, 0))
+    if not ingest_filter.accept_file(name, member.size):
+        return False
+    if member.isreg():
+        sizes[name] = member.size
+    return True
+
+
+def _set_attributes(path: Path, member: tarfile.TarInfo) -> None:
+    path.chmod(member.mode & 0o777)
+    os.utime(path, (member.mtime, member.mtime))
+
+
+def _set_directory_attributes(root: Path, directories: list[tarfile.TarInfo]) -> None:
+    # Set directory attributes at the end as tarfile.extractall does, deepest first,
+    # so that read-only directories do not prevent their contents from being written.
+    directories.sort(key=lambda m: m.name, reverse=True)
+    for member in directories:
+        _set_attributes(_get_member_path(root, member.name), member)
+
+
+def _run_in_parallel(
+    tasks: list[Callable[[], None]],
+    workers: int,
+    budget: _ExtractionBudget,
+) -> None:
+    """Run tasks in a thread pool and stop the remaining ones on the first failure."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(task) for task in tasks]
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except Exception:
+            budget.aborted = True
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def _has_duplicates(paths: list[Path]) -> bool:
+    return len(set(paths)) != len(paths)
+
+
+def _make_directories(paths: list[Path], is_dir: list[bool]) -> None:
+    """Create all directories up front so that worker threads never race on them."""
+    directories = {
+        path if d else path.parent for path, d in zip(paths, is_dir, strict=True)
+    }
+    for directory in sorted(directories):
+        directory.mkdir(parents=True, exist_ok=True)
+
+
+def _write_tar_member(
+    fd: int,
+    member: tarfile.TarInfo,
+    path: Path,
+    budget: _ExtractionBudget,
+) -> None:
+    _copy_stream(_TarMemberReader(fd, member), path, budget)
+    _set_attributes(path, member)
+
+
+def _extract_tar_file_in_parallel(
+    source: str,
+    root: Path,
+    budget: _ExtractionBudget,
+    workers: int,
+    ingest_filter: IngestionFilter | None,
+) -> bool:
+    """Extract an uncompressed tar archive with a thread pool.
+
+    Returns False without writing anything if the archive is compressed or contains
+    members (symbolic links, sparse or special files, duplicated names) that must be
+    extracted sequentially to get the same result as tarfile.extractall.
+    """
+    try:
+        with tarfile.open(source, mode="r:") as tar:  # NOSONAR
+            members = tar.getmembers()
+    except tarfile.ReadError:
+        return False
+
+    if ingest_filter:
+        accepted_sizes: dict[str, int] = {}
+        members = [
+            m for m in members if _accept_tar_member(ingest_filter, m, accepted_sizes)
+        ]
+
+    if any(
+        m.issym() or m.issparse() or not (m.isreg() or m.isdir() or m.islnk())
+        for m in members
+    ):
+        return False
+    paths = [_get_member_path(root, m.name) for m in members]
+    if _has_duplicates(paths) or any(
+        path == root for path, m in zip(paths, members, strict=True) if not m.isdir()
+    ):
+        return False
+
+    # As all headers are available, reject the archive before writing anything.
+    sizes = {m.name: m.size for m in members if m.isreg()}
+    header_budget = _ExtractionBudget()
+    for m in members:
+        if m.isreg() or m.islnk():
+            header_budget.add_entry()
+            header_budget.add_size(sizes.get(m.linkname if m.islnk() else m.name, 0))
+            budget.add_entry()
+
+    _make_directories(paths, [m.isdir() for m in members])
+
+    fd = os.open(source, os.O_RDONLY)
+    try:
+        _run_in_parallel(
+            [
+                partial(_write_tar_member, fd, m, path, budget)
+                for m, path in zip(members, paths, strict=True)
+                if m.isreg()
+            ],
+            workers,
+            budget,
+        )
+    finally:
+        os.close(fd)
+
+    for m, path in zip(members, paths, strict=True):
+        if m.islnk():
+            link_target = _get_member_path(root, m.linkname)
+            budget.add_size(link_target.stat().st_size)
+            try:
+                path.hardlink_to(link_target)
+            except OSError:
+                shutil.copyfile(link_target, path)
+            _set_attributes(path, m)
+
+    _set_directory_attributes(root, [m for m in members if m.isdir()])
+    return True
+
+
+def _extract_tar_file_in_stream(
+    source: str | IO[bytes],
+    root: Path,
+    budget: _ExtractionBudget,
+    ingest_filter: IngestionFilter | None,
+) -> None:
+    directories: list[tarfile.TarInfo] = []
+    accepted_sizes: dict[str, int] = {}
+    with (
+        tarfile.open(source, mode="r|*")  # NOSONAR
+        if isinstance(source, str)
+        else tarfile.open(fileobj=source, mode="r|*")  # NOSONAR
+    ) as tar:
+        for member in tar:
+            if ingest_filter and not _accept_tar_member(
+                ingest_filter,
+                member,
+                accepted_sizes,
+            ):
+                continue
+            path = _extract_tar_member(tar, member, root, budget)
+            if path is not None and member.isdir():
+                directories.append(member)
+
+    _set_directory_attributes(root, directories)
+
+
+def extract_tar_file(
+    source: str,
+    dest: Path,
+    workers: int = 1,
+    ingest_filter: IngestionFilter | None = None,
+) -> None:
+    """Validate and extract a tar archive in a single streaming pass.
+
+    Entry count, total size and path safety are checked while each member is written, so
+    that the archive is decompressed only once.  If any check fails, dest is removed.
+    When workers is greater than one, members of an uncompressed archive are written
+    with a thread pool.  Members rejected by ingest_filter are not extracted.
+    """
+    if not tarfile.is_tarfile(source):
+        msg = f"{source} is not a valid tar archive file."
+        raise RuntimeError(msg)
+
+    dest.mkdir()
+    root = dest.resolve()
+    budget = _ExtractionBudget()
+    try:
+        if workers <= 1 or not _extract_tar_file_in_parallel(
+            source,
+            root,
+            budget,
+            workers,
+            ingest_filter,
+        ):
+            _extract_tar_file_in_stream(source, root, budget, ingest_filter)
+    except Exception:
+        shutil.rmtree(dest, ignore_errors=True)
+        raise
+
+
+def _sanitize_zip_member_name(name: str) -> str:
+    """Sanitize a member name in the same way as zipfile.ZipFile.extractall does."""
+    arcname = name.replace("/", os.path.sep)
+    if os.path.altsep:
+        arcname = arcname.replace(os.path.altsep, os.path.sep)
+    arcname = os.path.splitdrive(arcname)[1]
+    invalid_path_parts = ("", os.path.curdir, os.path.pardir)
+    return os.path.sep.join(
+        x for x in arcname.split(os.path.sep) if x not in invalid_path_parts
+    )
+
+
+def _filter_zip_info_list(
+    info_list: list[zipfile.ZipInfo],
+    ingest_filter: IngestionFilter,
+) -> list[zipfile.ZipInfo]:
+    accepted = []
+    for info in info_list:
+        name = normalize_path(_sanitize_zip_member_name(info.filename))
+        if info.is_dir():
+            if ingest_filter.accept_directory(name):
+                accepted.append(info)
+        elif ingest_filter.accept_file(name, info.file_size):
+            accepted.append(info)
+    return accepted
+
+
+def _extract_zip_member(
+    zip_file: zipfile.ZipFile,
+    info: zipfile.ZipInfo,
+    root: Path,
+    budget: _ExtractionBudget,
+) -> None:
+    budget.add_entry()
+    path = _get_member_path(root, _sanitize_zip_member_name(info.filename))
+
+    if info.is_dir():
+        path.mkdir(parents=True, exist_ok=True)
+        return
+
+    if path == root:
+        msg = f"{info.filename} is not a directory"
+        raise RuntimeError(msg)
+
+    _prepare_target(path)
+    with zip_file.open(info) as src:
+        _copy_stream(src, path, budget, info.compress_size)
+
+
+def _extract_zip_file_in_parallel(
+    source: str,
+    info_list: list[zipfile.ZipInfo],
+    root: Path,
+    budget: _ExtractionBudget,
+    workers: int,
+) -> bool:
+    """Extract a zip archive with a thread pool.
+
+    Each thread reads the archive through its own ZipFile instance.  Returns False without
+    writing anything if the archive contains duplicated names, which must be extracted
+    sequentially to get the same result as zipfile.ZipFile.extractall.
+    """
+    paths = [
+        _get_member_path(root, _sanitize_zip_member_name(info.filename))
+        for info in info_list
+    ]
+    if _has_duplicates(paths):
+        return False
+    for info, path in zip(info_list, paths, strict=True):
+        budget.add_entry()
+        if path == root and not info.is_dir():
+            msg = f"{info.filename} is not a directory"
+            raise RuntimeError(msg)
+
+    _make_directories(paths, [info.is_dir() for info in info_list])
+
+    local = threading.local()
+    zip_files: list[zipfile.ZipFile] = []
+
+    def write_member(info: zipfile.ZipInfo, path: Path) -> None:
+        zip_file = getattr(local, "zip_file", None)
+        if zip_file is None:
+            zip_file = zipfile.ZipFile(source)
+            local.zip_file = zip_file
+            zip_files.append(zip_file)
+        with zip_file.open(info) as src:
+            _copy_stream(src, path, budget, info.compress_size)
+
+    try:
+        _run_in_parallel(
+            [
+                partial(write_member, info, path)
+                for info, path in zip(info_list, paths, strict=True)
+                if not info.is_dir()
+            ],
+            workers,
+            budget,
+        )
+    finally:
+        for zip_file in zip_files:
+            zip_file.close()
+    return True
+
+
+def extract_zip_file(
+    source: str,
+    dest: Path,
+    workers: int = 1,
+    ingest_filter: IngestionFilter | None = None,
+) -> None:
+    """Validate and extract a zip archive with bounded memory usage.
+
+    The archive is rejected from the central directory metadata before any data is read.
+    Actual sizes are then enforced while members are streamed to disk in fixed-size
+    chunks.  If any check fails, dest is removed.  When workers is greater than one,
+    members are written with a thread pool.  Members rejected by ingest_filter are
+    neither checked nor extracted.
+    """
+    if not zipfile.is_zipfile(source):
+        msg = f"{source} is not a valid zip file."
+        raise RuntimeError(msg)
+
+    with zipfile.ZipFile(source) as zip_file:
+        info_list = zip_file.infolist()
+        if ingest_filter:
+            info_list = _filter_zip_info_list(info_list, ingest_filter)
+        _check_zip_info_list(info_list)
+
+        dest.mkdir()
+        root = dest.resolve()
+        budget = _ExtractionBudget()
+        try:
+            if workers <= 1 or not _extract_zip_file_in_parallel(
+                source,
+                info_list,
+                root,
+                budget,
+                workers,
+            ):
+                for info in info_list:
+                    _extract_zip_member(zip_file, info, root, budget)
+        except Exception:
+            shutil.rmtree(dest, ignore_errors=True)
+            raise
+
+
+class _HeadStream(io.RawIOBase):
+    """Read a stream again from the start after its first bytes were read.
+
+    The first bytes are used for detecting the format of an archive read from a stream
+    that cannot seek (e.g. stdin).
+    """
+
+    def __init__(self, stream: IO[bytes], head_size: int) -> None:
+        super().__init__()
+        self._stream = stream
+        self.head = b""
+        while len(self.head) < head_size:
+            chunk = stream.read(head_size - len(self.head))
+            if not chunk:
+                break
+            self.head += chunk
+        self._offset = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        if self._offset < len(self.head):
+            data = self.head[self._offset : self._offset + len(buffer)]
+            self._offset += len(data)
+        else:
+            data = self._stream.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def _is_zip_header(head: bytes) -> bool:
+    return head.startswith((b"PK\x03\x04", b"PK\x05\x06"))
+
+
+def _is_tar_header(head: bytes) -> bool:
+    compressed = head.startswith((b"\x1f\x8b", b"BZh", b"\xfd7zXZ\x00"))
+    return compressed or head[257:262] == b"ustar"
+
+
+def extract_stream(
+    stream: IO[bytes],
+    dest: Path,
+    workers: int = 1,
+    ingest_filter: IngestionFilter | None = None,
+) -> None:
+    """Validate and extract a zip or tar archive read from a stream (e.g. stdin).
+
+    The format is detected from the magic bytes.  A tar archive, compressed or not, is
+    extracted in a single pass while the stream is read.  As a zip archive has to be read
+    from its central directory at the end, it is written to a temporary file first.  The
+    same limits as extract_tar_file and extract_zip_file are enforced.
+    """
+    head_stream = _HeadStream(stream, tarfile.BLOCKSIZE)
+    reader = io.BufferedReader(head_stream, chunk_size)
+
+    if _is_zip_header(head_stream.head):
+        with tempfile.NamedTemporaryFile(suffix=".zip") as f:
+            size = 0
+            while chunk := reader.read(chunk_size):
+                size += len(chunk)
+                _check_total_size_and_entries(0, size)
+                f.write(chunk)
+            f.flush()
+            extract_zip_file(f.name, dest, workers, ingest_filter)
+        return
+
+    if not _is_tar_header(head_stream.head):
+        msg = "The input stream is not a valid zip or tar archive."
+        raise RuntimeError(msg)
+
+    dest.mkdir()
+    root = dest.resolve()
+    try:
+        _extract_tar_file_in_stream(
+            reader,
+            root,
+            _ExtractionBudget(),
+            ingest_filter,
+        )
+    except Exception:
+        shutil.rmtree(dest, ignore_errors=True)
+        raise
@@ -0,0 +1,103 @@
+"""Cache the trees extracted from archive files.
+
+An entry holds the tree extracted from an archive and the paths skipped by the
+ingestion filter.  Entries are keyed by the SHA-256 of the archive, the safe_checks
+thresholds and the ingestion filter settings, so that an archive that is submitted
+repeatedly is validated and extracted only once.  The repository directory is populated
+from an entry with link_tree(), which does not copy file data (see workspace.py).
+"""
+
+import hashlib
+import json
+import logging
+import shutil
+
+from collections.abc import Callable
+from pathlib import Path
+
+from . import safe_checks
+from .cache import evict_least_recently_used, exclusive_lock, get_lock_path, touch
+from .ingest_filter import IngestionFilter
+from .workspace import link_tree
+
+
+_logger = logging.getLogger(__name__)
+
+_tree = "tree"
+_skipped_json = "skipped.json"
+
+
+def get_cache_key(source: str, ingest_filter: IngestionFilter | None) -> str:
+    """Return the key of the cache entry for an archive file."""
+    digest = hashlib.sha256()
+    with Path(source).open("rb") as f:
+        while chunk := f.read(safe_checks.chunk_size):
+            digest.update(chunk)
+    settings = {
+        "threshold_entries": safe_checks.threshold_entries,
+        "threshold_size": safe_checks.threshold_size,
+        "threshold_ratio": safe_checks.threshold_ratio,
+        "ingest_filter": (
+            {
+                "include": ingest_filter.include,
+                "exclude": ingest_filter.exclude,
+                "max_file_size": ingest_filter.max_file_size,
+            }
+            if ingest_filter
+            else None
+        ),
+    }
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def extract_with_cache(
+    source: str,
+    dest: Path,
+    extract: Callable[[str, Path], None],
+    cache_dir: Path,
+    cache_size: int,
+    max_age: float | None = None,
+    ingest_filter: IngestionFilter | None = None,
+) -> None:
+    """Populate dest with the tree extracted from an archive through the cache.
+
+    On a cache miss, extract is called to validate and extract the archive into a new
+    entry.  Least recently used entries are evicted when the total size of the cache
+    exceeds cache_size bytes, and entries not used for max_age seconds are evicted as
+    well.
+    """
+    entry = cache_dir / get_cache_key(source, ingest_filter)
+    lock_path = get_lock_path(entry)
+
+    while True:
+        with exclusive_lock(lock_path) as downgrade:
+            if entry.is_dir():
+                _logger.info("Using the tree extracted from %s in %s", source, entry)
+            else:
+                # Extract to a temporary directory first so that a failed extraction
+                # does not leave a broken entry behind.
+                temp_path = entry.with_name("." + entry.name)
+                shutil.rmtree(temp_path, ignore_errors=True)
+                temp_path.mkdir(parents=True)
+                try:
+                    extract(source, temp_path / _tree)
+                    with (temp_path / _skipped_json).open("w", encoding="utf-8") as f:
+                        json.dump(ingest_filter.skipped if ingest_filter else {}, f)
+                except Exception:
+                    shutil.rmtree(temp_path, ignore_errors=True)
+                    raise
+                temp_path.rename(entry)
+            touch(entry)
+
+            # The entry is linked with a shared lock, so that other processes can link
+            # it at the same time, and it is not evicted in between (see cache.py).
+            downgrade()
+            if entry.is_dir():
+                link_tree(str(entry / _tree), dest)
+                if ingest_filter:
+                    with (entry / _skipped_json).open(encoding="utf-8") as f:
+                        ingest_filter.skipped.update(json.load(f))
+                evict_least_recently_used(cache_dir, cache_size, max_age)
+                return
+        _logger.debug("The entry %s was evicted while the lock was converted", entry)
@@ -93,8 +93,16 @@ def _gen_ftdata(task: Task, parent: SageObject) -> _FTRecord:
     return record
 
 
-def gen_ftdata_jsonl(sage_objects_json: str, ftdata_jsonl: str) -> None:
-    """Generate ftdata.jsonl file."""
+def gen_ftdata_jsonl(
+    sage_objects_json: str,
+    ftdata_jsonl: str,
+    excluded: set[str] | None = None,
+) -> None:
+    """Generate ftdata.jsonl file.
+
+    Playbooks, task files and tasks in the files in excluded are skipped.
+    """
+    excluded = excluded or set()
     record_lines = []
     for project in load_objects(sage_objects_json).projects():
         parents = []
@@ -103,7 +111,11 @@ def gen_ftdata_jsonl(sage_objects_json: str, ftdata_jsonl: str) -> None:
         if project.taskfiles:
             parents.extend(project.taskfiles)
         for parent in parents:
+            if parent.filepath in excluded:
+                continue
             for task in get_tasks(root=parent, project=project):
+                if task.filepath in excluded:
+                    continue
                 try:
                     record = _gen_ftdata(task=task, parent=parent)
                     record_lines.append(json.dumps(record) + "\n")
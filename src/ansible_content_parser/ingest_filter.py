@@ -0,0 +1,193 @@
+"""Skip files that are not needed for parsing Ansible content at ingestion time.
+
+Files rejected by the filter are never written to the repository directory, so neither
+ansible-lint nor sage has to walk them.
+
+A pattern without "/" is matched against each component of a relative path, so that
+"node_modules" or "*.png" match at any depth.  A pattern with "/" is matched against
+the relative path and each of its parent directories, so that "docs/build" matches
+everything under that directory.  Both use fnmatch syntax.
+"""
+
+import json
+import logging
+import os
+import posixpath
+
+from collections import Counter
+from collections.abc import Callable
+from fnmatch import fnmatchcase
+from pathlib import Path
+
+
+_logger = logging.getLogger(__name__)
+
+default_exclude_patterns = [
+    # Version control and tool directories
+    ".git",
+    ".hg",
+    ".svn",
+    ".tox",
+    ".venv",
+    "__pycache__",
+    "node_modules",
+    # Binaries and packages
+    "*.pyc",
+    "*.so",
+    "*.dll",
+    "*.exe",
+    "*.jar",
+    "*.war",
+    "*.whl",
+    "*.egg",
+    "*.rpm",
+    "*.deb",
+    "*.iso",
+    "*.img",
+    "*.qcow2",
+    # Images and documents
+    "*.png",
+    "*.jpg",
+    "*.jpeg",
+    "*.gif",
+    "*.bmp",
+    "*.ico",
+    "*.pdf",
+    # Archives
+    "*.zip",
+    "*.tar",
+    "*.gz",
+    "*.tgz",
+    "*.bz2",
+    "*.xz",
+    "*.7z",
+]
+
+default_max_file_size = 10 * 1024 * 1024
+
+reason_excluded = "matched an exclude pattern"
+reason_not_included = "matched no include pattern"
+reason_too_large = "larger than the size limit"
+
+_ingest_filter_json = "ingest-filter.json"
+
+
+def match_path(rel_path: str, pattern: str) -> bool:
+    """Return True if a relative path matches a pattern."""
+    pattern = pattern.strip("/")
+    parts = rel_path.split("/")
+    if "/" in pattern:
+        return any(
+            fnmatchcase("/".join(parts[:i]), pattern) for i in range(1, len(parts) + 1)
+        )
+    return any(fnmatchcase(part, pattern) for part in parts)
+
+
+def normalize_path(name: str) -> str:
+    """Convert an archive member name to a relative path used for matching."""
+    return posixpath.normpath(name.replace(os.path.sep, "/").lstrip("/"))
+
+
+class IngestionFilter:
+    """Decide which files are written to the repository directory.
+
+    Files that match an exclude pattern, that match no include pattern (if any include
+    pattern is given) or that are larger than max_file_size bytes are skipped.  A
+    max_file_size of 0 means no limit.  Directories are skipped only when they match an
+    exclude pattern.  Skipped paths are recorded with the reason.
+    """
+
+    def __init__(
+        self,
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        max_file_size: int = 0,
+    ) -> None:
+        """Initialize IngestionFilter."""
+        self.include = include or []
+        self.exclude = exclude or []
+        self.max_file_size = max_file_size
+        self.skipped: dict[str, str] = {}
+
+    def get_reason(self, rel_path: str, size: int = 0) -> str:
+        """Return the reason why a file is skipped, or "" if it is accepted."""
+        if any(match_path(rel_path, p) for p in self.exclude):
+            return reason_excluded
+        if self.include and not any(match_path(rel_path, p) for p in self.include):
+            return reason_not_included
+        if self.max_file_size and size > self.max_file_size:
+            return reason_too_large
+        return ""
+
+    def skip(self, rel_path: str, reason: str) -> None:
+        """Record a path that is skipped."""
+        _logger.debug("%s is skipped as it %s.", rel_path, reason)
+        self.skipped[rel_path] = reason
+
+    def accept_file(self, rel_path: str, size: int = 0) -> bool:
+        """Return True if a file is written to the repository directory."""
+        reason = self.get_reason(rel_path, size)
+        if reason:
+            self.skip(rel_path, reason)
+            return False
+        return True
+
+    def accept_directory(self, rel_path: str) -> bool:
+        """Return True if a directory is written to the repository directory."""
+        if rel_path != "." and any(match_path(rel_path, p) for p in self.exclude):
+            self.skip(rel_path, reason_excluded)
+            return False
+        return True
+
+    def get_ignore_function(
+        self,
+        source: str,
+    ) -> Callable[[str, list[str]], set[str]]:
+        """Return a function that can be passed to shutil.copytree as ignore."""
+
+        def ignore(directory: str, names: list[str]) -> set[str]:
+            rel_dir = Path(directory).relative_to(source)
+            ignored = set()
+            for name in names:
+                path = Path(directory) / name
+                rel_path = normalize_path(str(rel_dir / name))
+                if path.is_dir():
+                    accepted = self.accept_directory(rel_path)
+                else:
+                    try:
+                        size = path.stat().st_size
+                    except OSError:
+                        size = 0
+                    accepted = self.accept_file(rel_path, size)
+                if not accepted:
+                    ignored.add(name)
+            return ignored
+
+        return ignore
+
+    def write_summary(self, metadata_path: Path) -> None:
+        """Write the filter settings and the skipped paths to the metadata directory."""
+        with (metadata_path / _ingest_filter_json).open(
+            "w",
+            encoding="utf-8",
+        ) as f:
+            json.dump(
+                {
+                    "include": self.include,
+                    "exclude": self.exclude,
+                    "max_file_size": self.max_file_size,
+                    "counts": Counter(self.skipped.values()),
+                    "skipped": self.skipped,
+                },
+                f,
+            )
+
+
+def load_summary(metadata_path: Path) -> dict[str, int] | None:
+    """Return the counts of skipped paths per reason, or None if no filter was used."""
+    path = metadata_path / _ingest_filter_json
+    if not path.exists():
+        return None
+    with path.open(encoding="utf-8") as f:
+        counts: dict[str, int] = json.load(f)["counts"]
+    return counts
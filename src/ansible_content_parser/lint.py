@@ -2,108 +2,585 @@
 
 from __future__ import annotations
 
+import contextlib
+import copy  # pylint: disable=preferred-module
+import functools
+import logging
 import os
 import sys
+import threading
+import warnings
 
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 
 # Set the ANSIBLE_LINT_NODEPS envvar to "1" in order to avoid performing checks that would fail
 # when modules are not installed. Far less ansible-lint violations will be reported.
 os.environ["ANSIBLE_LINT_NODEPS"] = "1"
 
+import ansiblelint.app
+
+from ansible_compat.prerun import get_cache_dir
+from ansiblelint import cli
 from ansiblelint.__main__ import (
     _do_transform,
     _logger,
     _perform_mockings_cleanup,
     get_app,
     initialize_logger,
-    initialize_options,
     load_ignore_txt,
     log_entries,
     options,
     path_inject,
+    should_do_markup,
 )
+from ansiblelint.app import _sanitize_list_options, choose_formatter_factory
 from ansiblelint.color import (
     console_options,
     reconfigure,
 )
+from ansiblelint.file_utils import Lintable
+from ansiblelint.skip_utils import normalize_tag
+from ansiblelint.utils import parse_yaml_linenumbers
+from ansiblelint.yaml_utils import load_yamllint_config
+
+from .lint_cache import LintCache, get_rule_config
+from .workspace import materialize
 
 
 if TYPE_CHECKING:
+    from collections.abc import Generator, Iterable
+
+    from ansiblelint._internal.rules import BaseRule
+    from ansiblelint.app import App
+    from ansiblelint.config import Options
+    from ansiblelint.errors import MatchError
+    from ansiblelint.rules import RulesCollection
     from ansiblelint.runner import LintResult
 
+    from .lint_budget import Watchdog
+    from .lint_timings import LintTimings
+    from .prerun_cache import PrerunCache
+    from .shard import ShardContext
+
+
+class FailFastError(Exception):
+    """Raised to stop linting at a match that fails the run."""
+
+    def __init__(self, match: MatchError) -> None:
+        """Initialize FailFastError."""
+        super().__init__(repr(match))
+        self.match = match
+
+
+@dataclass
+class FailFast:
+    """The state of a run that stops at the first match that fails it."""
+
+    # The match the run stopped at
+    match: MatchError | None = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    # The file created when the run stops, which stops other runs sharing it, e.g. the
+    # shards of a repository linted in other processes
+    stop_file: str | None = None
+
+    @property
+    def stopped(self) -> bool:
+        """Return True if the run or another run sharing stop_file has stopped."""
+        return self.match is not None or (
+            self.stop_file is not None and Path(self.stop_file).exists()
+        )
+
+    def stop(self, match: MatchError) -> bool:
+        """Record the match the run stops at and create stop_file.
+
+        Only the first match stops the run when threads of the syntax check find matches
+        at the same time, and False is returned for the others.
+        """
+        with self.lock:
+            if self.match is not None:
+                return False
+            self.match = match
+        if self.stop_file:
+            Path(self.stop_file).touch()
+        return True
+
+
+class LintEngine:
+    """Run ansible-lint repeatedly in a process.
+
+    The rules collections are loaded once and reused by all runs.  The ansible-lint
+    application holds the Ansible runtime and the yamllint configuration of a project
+    directory, so it is loaded again when a run is for another project directory, and
+    the yamllint configuration is loaded again on every run.  ansible-lint reads options
+    from a global object, so the options given to lint() are installed in it only while
+    a run is in progress, and the previous values are restored afterwards.  When
+    prerun_cache is set, it is used to set up the Ansible runtime when the application
+    is loaded.
+    """
+
+    def __init__(self) -> None:
+        """Initialize LintEngine."""
+        self.prerun_cache: PrerunCache | None = None
+        self._app: App | None = None
+        # The project directory the application is loaded for
+        self._app_key: Path | None = None
+        self._rules: dict[tuple[Any, ...], RulesCollection] = {}
+        self._log_handler: logging.Handler | None = None
+        # alter PATH if needed (venv support)
+        path_inject()
+
+    @staticmethod
+    def get_options(arguments: list[str]) -> Options:
+        """Return the options for ansible-lint command line arguments.
+
+        This is based on initialize_options() of ansiblelint/__main__.py, which stores
+        the options in the global object instead of returning them.
+        """
+        _clear_yaml_cache()
+        new_options = cli.get_config(arguments)
+        new_options.cwd = Path.cwd()
+        if new_options.colored is None:
+            new_options.colored = should_do_markup()
+
+        # rename deprecated ids/tags to newer names
+        new_options.tags = [normalize_tag(tag) for tag in new_options.tags]
+        new_options.skip_list = [normalize_tag(tag) for tag in new_options.skip_list]
+        new_options.warn_list = [normalize_tag(tag) for tag in new_options.warn_list]
+        new_options.skip_list = _sanitize_list_options(new_options.skip_list)
+        new_options.warn_list = _sanitize_list_options(new_options.warn_list)
+
+        new_options.configured = True
+        new_options.cache_dir = get_cache_dir(Path(new_options.project_dir))
+        new_options.cache_dir.mkdir(parents=True, exist_ok=True)
+        return new_options
+
+    def discover(self, paths: Iterable[str], lint_options: Options) -> list[Lintable]:
+        """Return the lintables ansible-lint discovers from paths."""
+        # pylint: disable=import-outside-toplevel
+        from ansiblelint.utils import get_lintables
+
+        with self._use_options(paths, lint_options):
+            self._get_app()
+            return get_lintables(opts=options, args=options.lintables)
+
+    def lint(
+        self,
+        paths: Iterable[str],
+        lint_options: Options,
+        previous_result: LintResult | None = None,
+        lint_cache: LintCache | None = None,
+        shard: ShardContext | None = None,
+        watchdog: Watchdog | None = None,
+        timings: LintTimings | None = None,
+        fail_fast: FailFast | None = None,
+    ) -> tuple[LintResult, bool, int]:
+        """Lint paths and return the result, the success mark and the return code.
+
+        When previous_result is given, it must be the result of a run with the same
+        options except additional exclude paths, and matches are carried over from it
+        (see _get_matches_from_previous_result).  When lint_cache is given, the rules
+        are run only on files that are not found in the cache.  When shard is given,
+        only the matches and lintables owned by the shard are reported, and autofix
+        results are stored in the shard instead of being written.  When watchdog is
+        given, files over its time budget are not linted any further, and they are
+        recorded in the watchdog.  When timings is given, the time spent on phases,
+        rules and files is added to it.  When fail_fast is given, linting stops at the
+        first match that fails the run, and the result has only the match, which is
+        recorded in fail_fast.
+        """
+        with self._use_options(paths, lint_options):
+            return self._lint(
+                previous_result,
+                lint_cache,
+                shard,
+                watchdog,
+                timings,
+                fail_fast,
+            )
+
+    @contextlib.contextmanager
+    def _use_options(
+        self,
+        paths: Iterable[str],
+        lint_options: Options,
+    ) -> Generator[None, None, None]:
+        """Install options to the global object of ansible-lint while linting."""
+        saved = copy.copy(vars(options))
+        vars(options).update(copy.deepcopy(vars(lint_options)))
+        options.lintables = list(paths)
+        # Parsed files may have been changed by the previous run.
+        _clear_yaml_cache()
+        try:
+            yield
+        finally:
+            vars(options).clear()
+            vars(options).update(saved)
+
+    def _initialize_logger(self) -> None:
+        """Set up the root logger without adding a handler on every run."""
+        root_logger = logging.getLogger()
+        if self._log_handler:
+            root_logger.removeHandler(self._log_handler)
+        initialize_logger(options.verbosity)
+        self._log_handler = root_logger.handlers[-1]
+        for level, message in log_entries:
+            _logger.log(level, message)
+        # The messages are added again when options are loaded next time.
+        log_entries.clear()
+
+    def _get_app(self) -> App:
+        """Return the ansible-lint application for the options.
+
+        ansible-lint looks up the application with get_app(cached=True) while linting,
+        so the cached one is replaced when the project directory changes.  The
+        application loads the Ansible runtime and the yamllint configuration from the
+        working directory, so runs are made in the project directory, which is given
+        explicitly (see use_work_dir() of lint_worker.py).
+        """
+        key = Path(options.project_dir).resolve()
+        if self._app is None or self._app_key != key:
+            get_app.cache_clear()
+            ansiblelint.app._CACHED_APP = None  # noqa: SLF001
+            with (
+                self.prerun_cache.using()
+                if self.prerun_cache
+                else contextlib.nullcontext()
+            ):
+                self._app = get_app(cached=True)  # the offline value of the options
+            self._app_key = key
+        else:
+            # The configuration file may have been changed since the last run.
+            self._app.yamllint_config = load_yamllint_config()
+        formatter_factory = choose_formatter_factory(options)
+        self._app.formatter = formatter_factory(
+            options.cwd,
+            options.display_relative_path,
+        )
+        return self._app
+
+    def _get_rules(self, app: App) -> RulesCollection:
+        """Return the rules collection for the options."""
+        # pylint: disable=import-outside-toplevel
+        from ansiblelint.rules import RulesCollection
+
+        # Opt-in rules are loaded only if they are enabled unless a profile is used.
+        key = (
+            tuple(str(d) for d in options.rulesdirs),
+            options.profile,
+            () if options.profile else tuple(sorted(options.enable_list)),
+        )
+        if key not in self._rules:
+            self._rules[key] = RulesCollection(
+                options.rulesdirs,
+                profile_name=options.profile,
+                app=app,
+                options=options,
+            )
+        return self._rules[key]
+
+    def _lint(
+        self,
+        previous_result: LintResult | None,
+        lint_cache: LintCache | None,
+        shard: ShardContext | None,
+        watchdog: Watchdog | None,
+        timings: LintTimings | None,
+        fail_fast: FailFast | None,
+    ) -> tuple[LintResult, bool, int]:
+        """Lint with the installed options (based on ansiblelint/__main__.py)."""
+        console_options["force_terminal"] = options.colored
+        reconfigure(console_options)
 
-# pylint: disable=too-many-statements,too-many-locals
-def ansiblelint_main(argv: list[str] | None = None) -> LintResult:
-    """Linter CLI entry point (based on ansiblelint/__main__.py)."""
-    # alter PATH if needed (venv support)
-    path_inject()
+        self._initialize_logger()
+        _logger.debug("Options: %s", options)
+        _logger.debug("CWD: %s", Path.cwd())
 
+        app = self._get_app()
+        rules = self._get_rules(app)
+        _use_yamllint_config(rules, app)
+
+        if isinstance(options.tags, str):
+            options.tags = options.tags.split(",")  # pragma: no cover
+        try:
+            result = _get_matches(
+                rules,
+                previous_result,
+                lint_cache,
+                watchdog,
+                timings,
+                fail_fast,
+            )
+        except FailFastError as exc:
+            # pylint: disable=import-outside-toplevel
+            from ansiblelint.runner import LintResult
+
+            _logger.info("Linting is stopped at the first error: %s", exc)
+            result = LintResult(matches=[exc.match], files={exc.match.lintable})
+        else:
+            if shard:
+                result = _get_shard_result(result, shard)
+
+        # Perform autofix if it is directed and no syntax check errors were found.
+        if options.write_list:
+            _autofix(result, shard, watchdog, timings, fail_fast)
+
+        mark_as_success = True
+
+        if options.strict and result.matches:
+            mark_as_success = False
+
+        # Remove skip_list items from the result
+        result.matches = [
+            m for m in result.matches if m.tag not in app.options.skip_list
+        ]
+        # Mark matches as ignored inside ignore file
+        ignore_map = load_ignore_txt(options.ignore_file)
+        for match in result.matches:
+            if match.tag in ignore_map[match.filename]:
+                match.ignored = True
+
+        # The SARIF file is written in rendering matches.
+        with _measure(timings, "render"):
+            app.render_matches(result.matches)
+
+        _perform_mockings_cleanup(app.options)
+        if options.mock_filters:
+            _logger.warning(
+                "The following filters were mocked during the run: %s",
+                ",".join(options.mock_filters),
+            )
+
+        return_code = app.report_outcome(result, mark_as_success=mark_as_success)
+
+        return result, mark_as_success, return_code
+
+
+@functools.cache
+def get_engine() -> LintEngine:
+    """Return the lint engine shared in the process."""
+    return LintEngine()
+
+
+def ansiblelint_main(
+    argv: list[str] | None = None,
+    previous_result: LintResult | None = None,
+    lint_cache: LintCache | None = None,
+    shard: ShardContext | None = None,
+    *,
+    skip_syntax_check: bool = False,
+    watchdog: Watchdog | None = None,
+    timings: LintTimings | None = None,
+    fail_fast: FailFast | None = None,
+    autofix: bool = True,
+) -> tuple[LintResult, bool, int]:
+    """Linter CLI entry point (based on ansiblelint/__main__.py).
+
+    When skip_syntax_check is True, the Ansible syntax check is not executed, e.g.
+    because syntax_check_main() has been run on the files.  When autofix is False,
+    autofix is disabled regardless of --fix in argv.  See LintEngine.lint() for the
+    other arguments.
+    """
     if argv is None:  # pragma: no cover
         argv = sys.argv
-    initialize_options(argv[1:])
+    engine = get_engine()
+    lint_options = engine.get_options(argv[1:])
+    lint_options._skip_ansible_syntax_check = skip_syntax_check  # noqa: SLF001
+    if not autofix:
+        lint_options.write_list = []
+    return engine.lint(
+        lint_options.lintables,
+        lint_options,
+        previous_result,
+        lint_cache,
+        shard,
+        watchdog,
+        timings,
+        fail_fast,
+    )
 
-    console_options["force_terminal"] = options.colored
-    reconfigure(console_options)
 
-    initialize_logger(options.verbosity)
-    for level, message in log_entries:
-        _logger.log(level, message)
-    _logger.debug("Options: %s", options)
-    _logger.debug("CWD: %s", Path.cwd())
+def syntax_check_main(
+    argv: list[str],
+    watchdog: Watchdog | None = None,
+    timings: LintTimings | None = None,
+) -> LintResult:
+    """Run only the Ansible syntax check on the files ansible-lint discovers.
 
+    Other rules are deselected with tags, so files are loaded and their children are
+    traversed, but no rules are run on them.  Autofix is disabled.  The matches are
+    written to the SARIF file given with --sarif-file as in a full run.
+    """
+    engine = get_engine()
+    lint_options = engine.get_options(argv[1:])
+    lint_options.tags = ["syntax-check"]
+    lint_options.write_list = []
+    result, _, _ = engine.lint(
+        lint_options.lintables,
+        lint_options,
+        watchdog=watchdog,
+        timings=timings,
+    )
+    return result
+
+
+def _get_matches(
+    rules: RulesCollection,
+    previous_result: LintResult | None,
+    lint_cache: LintCache | None,
+    watchdog: Watchdog | None = None,
+    timings: LintTimings | None = None,
+    fail_fast: FailFast | None = None,
+) -> LintResult:
+    """Get matches through the lint cache, the watchdog and timings if they are given.
+
+    When fail_fast is given, FailFastError is raised at the first match that fails the
+    run.
+    """
     # pylint: disable=import-outside-toplevel
-    from ansiblelint.rules import RulesCollection
     from ansiblelint.runner import get_matches
 
-    app = get_app(offline=None)  # to be sure we use the offline value from settings
-    rules = RulesCollection(
-        options.rulesdirs,
-        profile_name=options.profile,
-        app=app,
-        options=options,
+    with contextlib.ExitStack() as stack:
+        # Timings are innermost, so that the files found in the lint cache are not timed.
+        if timings:
+            stack.enter_context(_use_timings(rules, timings))
+        if lint_cache:
+            stack.enter_context(_use_lint_cache(rules, lint_cache))
+        # The watchdog wraps the lint cache, so that interrupted results are not saved.
+        if watchdog:
+            stack.enter_context(_use_watchdog(rules, watchdog))
+        # The matches found in the lint cache stop the run as well.
+        if fail_fast:
+            stack.enter_context(_use_fail_fast(rules, fail_fast))
+        if previous_result is None:
+            return get_matches(rules, options)
+        return _get_matches_from_previous_result(rules, previous_result)
+
+
+def _get_matches_from_previous_result(
+    rules: RulesCollection,
+    previous_result: LintResult,
+) -> LintResult:
+    """Get matches by linting only the files that were not checked on the previous run.
+
+    Lintables are discovered and their children are traversed again, so that excluded
+    files and the files reached only through them are dropped.  The rules are run only
+    on the lintables that were not checked on the previous run, e.g. a file that was a
+    child of an excluded playbook and is now discovered as another kind.  Matches of
+    other files are carried over.  The Ansible syntax check is skipped because the
+    second run excludes all the files with syntax-check errors.
+    """
+    # pylint: disable=import-outside-toplevel
+    from ansiblelint.runner import LintResult, Runner
+    from ansiblelint.utils import get_lintables
+
+    lintables = get_lintables(opts=options, args=options.lintables)
+    previous_files = {lintable: lintable for lintable in previous_result.files}
+    runner = Runner(
+        *lintables,
+        rules=rules,
+        tags=frozenset(options.tags),
+        skip_list=options.skip_list,
+        exclude_paths=options.exclude_paths,
+        verbosity=options.verbosity,
+        checked_files=set(previous_files),
+        project_dir=options.project_dir,
+        _skip_ansible_syntax_check=True,
     )
+    matches = runner.run()
 
-    if isinstance(options.tags, str):
-        options.tags = options.tags.split(",")  # pragma: no cover
-    result = get_matches(rules, options)
+    # Keep the lintables of the previous run as they hold the states set by the
+    # syntax check, e.g. stop_processing.
+    files = {previous_files.get(lintable, lintable) for lintable in runner.lintables}
+    matches.extend(
+        match
+        for match in previous_result.matches
+        if match.lintable in files
+        or (
+            match.lintable not in previous_files
+            and not runner.is_excluded(match.lintable)
+        )
+    )
+    return LintResult(matches=sorted(set(matches)), files=files)
 
-    # Perform autofix if it is directed and no syntax check errors were found.
-    if options.write_list:
-        _transform(result)
 
-    mark_as_success = True
+def discover_lintables(argv: list[str]) -> list[tuple[str, str]]:
+    """Return (name, kind) of the lintables ansible-lint discovers."""
+    engine = get_engine()
+    lint_options = engine.get_options(argv[1:])
+    lintables = engine.discover(lint_options.lintables, lint_options)
+    return sorted((lintable.name, str(lintable.kind)) for lintable in lintables)
 
-    if options.strict and result.matches:
-        mark_as_success = False
 
-    # Remove skip_list items from the result
-    result.matches = [m for m in result.matches if m.tag not in app.options.skip_list]
-    # Mark matches as ignored inside ignore file
-    ignore_map = load_ignore_txt(options.ignore_file)
-    for match in result.matches:
-        if match.tag in ignore_map[match.filename]:
-            match.ignored = True
+def _use_yamllint_config(rules: RulesCollection, app: App) -> None:
+    """Make the yamllint rule use the configuration of the application.
 
-    app.render_matches(result.matches)
+    The rule loads the configuration of the working directory into a class attribute
+    when it is imported, which is kept for the process.
+    """
+    rules.app = app
+    for rule in rules.rules:
+        if rule.id == "yaml":
+            type(rule).config = app.yamllint_config  # type: ignore[attr-defined]
 
-    _perform_mockings_cleanup(app.options)
-    if options.mock_filters:
-        _logger.warning(
-            "The following filters were mocked during the run: %s",
-            ",".join(options.mock_filters),
-        )
 
-    return_code = app.report_outcome(result, mark_as_success=mark_as_success)
+def _clear_yaml_cache() -> None:
+    """Clear the parsed YAML files cached by ansible-lint.
+
+    ansible-lint removes keys from the cached data of the configuration file when it
+    loads options, so the profile and other settings would be lost when it is invoked
+    again in the same process.
+    """
+    parse_yaml_linenumbers.cache_clear()
+
+
+def _get_shard_result(result: LintResult, shard: ShardContext) -> LintResult:
+    """Remove the matches and lintables owned by other shards from a result."""
+    # pylint: disable=import-outside-toplevel
+    from ansiblelint.runner import LintResult
+
+    return LintResult(
+        matches=[
+            match
+            for match in result.matches
+            if (match.tag and match.tag.startswith("syntax-check"))
+            or shard.is_reported(match.lintable.name, str(match.lintable.kind))
+        ],
+        files={
+            lintable
+            for lintable in result.files
+            if shard.is_reported(lintable.name, str(lintable.kind))
+        },
+    )
+
+
+def _autofix(
+    result: LintResult,
+    shard: ShardContext | None,
+    watchdog: Watchdog | None,
+    timings: LintTimings | None,
+    fail_fast: FailFast | None,
+) -> None:
+    """Perform autofix unless the run was stopped or files exceeded the time budget."""
+    if fail_fast and fail_fast.stopped:
+        _logger.info("Autofix is suppressed as linting is stopped.")
+    elif watchdog and watchdog.exceeded:
+        # Files over the time budget are excluded on the next run as files with
+        # syntax check errors, so autofix is suppressed as well.
+        _logger.info("Autofix is suppressed as files exceeded the time budget.")
+    else:
+        with _measure(timings, "transform"):
+            _transform(result, shard)
 
-    return result, mark_as_success, return_code
 
+def _transform(result: LintResult, shard: ShardContext | None = None) -> None:
+    """Perform autofix when there is no syntax-check error.
 
-def _transform(result: LintResult) -> None:
-    """Perform autofix when there is no syntax-check error."""
-    if _syntax_check_errors_found(result):
+    When shard is given, only the files of the shard are fixed.
+    """
+    if syntax_check_errors_found(result):
         _logger.info("Autofix is suppressed as syntax-check errors are found.")
     else:
         ruamel_safe_version = "0.17.26"
@@ -117,10 +594,424 @@ def _transform(result: LintResult) -> None:
                 ruamel_yaml_version_str,
                 ruamel_safe_version,
             )
-        _do_transform(result, options)
+        if shard is None:
+            with _copy_on_write():
+                _do_transform(result, options)
+            return
+
+        # pylint: disable=import-outside-toplevel
+        from ansiblelint.runner import LintResult
+
+        shard_result = LintResult(
+            matches=[
+                match
+                for match in result.matches
+                if match.lintable.name in shard.writable_paths
+            ],
+            files={
+                lintable
+                for lintable in result.files
+                if lintable.name in shard.writable_paths
+            },
+        )
+        with _defer_writes(shard.writes):
+            _do_transform(shard_result, options)
+
+
+@contextlib.contextmanager
+def _use_lint_cache(
+    rules: RulesCollection,
+    lint_cache: LintCache,
+) -> Generator[None, None, None]:
+    """Look up the matches of files in the lint cache before running the rules on them."""
+    # rules.run may have been wrapped for timings.
+    is_wrapped = "run" in vars(rules)
+    original_run = rules.run
+    config = get_rule_config(rules, options)
+    root = str(options.cwd.resolve())
+    hits, misses = lint_cache.hits, lint_cache.misses
+
+    def run(
+        file: Lintable,
+        tags: set[str] | None = None,
+        skip_list: list[str] | None = None,
+    ) -> list[MatchError]:
+        # Rules look at other files for roles and collections (galaxy.yml).
+        if file.path.is_dir() or str(file.kind) == "galaxy":
+            return original_run(file, tags=tags, skip_list=skip_list)
+        try:
+            key = lint_cache.get_key(file, config)
+        except (OSError, UnicodeDecodeError):
+            # Let the rules report the load failure.
+            return original_run(file, tags=tags, skip_list=skip_list)
+
+        matches = lint_cache.load(key, file, rules)
+        if matches is not None:
+            return matches
+
+        with warnings.catch_warnings(record=True) as captured_warnings:
+            warnings.simplefilter("always")
+            matches = original_run(file, tags=tags, skip_list=skip_list)
+        # Warnings are turned into matches by the runner, which is skipped when the
+        # matches are found in the cache.  Do not cache the matches in that case.
+        for warn in captured_warnings:
+            warnings.warn_explicit(
+                warn.message,
+                warn.category,
+                warn.filename,
+                warn.lineno,
+                source=warn.source,
+            )
+        if not captured_warnings:
+            lint_cache.save(key, file, matches, root)
+        return matches
+
+    rules.run = run  # type: ignore[method-assign]
+    try:
+        yield
+    finally:
+        if is_wrapped:
+            rules.run = original_run  # type: ignore[method-assign]
+        else:
+            del rules.run
+        _logger.info(
+            "Lint cache: %d hits, %d misses",
+            lint_cache.hits - hits,
+            lint_cache.misses - misses,
+        )
+        lint_cache.evict_least_recently_used()
+
+
+@contextlib.contextmanager
+def _use_watchdog(
+    rules: RulesCollection,
+    watchdog: Watchdog,
+) -> Generator[None, None, None]:
+    """Time the files being linted, and stop linting the files over the time budget.
+
+    The rules and the traversal of children are interrupted by the watchdog.  The syntax
+    check of playbooks is timed only.  Role directories are never over budget, as the
+    time spent on their files is counted for the files.
+    """
+    # pylint: disable=import-outside-toplevel
+    from ansiblelint.runner import Runner
+
+    # rules.run may have been wrapped by the lint cache or for timings.
+    is_wrapped = "run" in vars(rules)
+    original_run = rules.run
+    original_find_children = Runner.find_children
+    original_syntax_check = Runner._get_ansible_syntax_check_matches  # noqa: SLF001
+
+    def run(
+        file: Lintable,
+        tags: set[str] | None = None,
+        skip_list: list[str] | None = None,
+    ) -> list[MatchError]:
+        if file.path.is_dir():
+            return original_run(file, tags, skip_list)
+        return watchdog.call(file.name, [], original_run, file, tags, skip_list)
+
+    def find_children(self: Runner, lintable: Lintable) -> list[Lintable]:
+        if lintable.path.is_dir():
+            return original_find_children(self, lintable)
+        return watchdog.call(
+            lintable.name,
+            [],
+            original_find_children,
+            self,
+            lintable,
+        )
+
+    def get_syntax_check_matches(
+        self: Runner,
+        lintable: Lintable,
+        app: App,
+    ) -> list[MatchError]:
+        if lintable.kind != "playbook":
+            return original_syntax_check(self, lintable, app)
+        return watchdog.measure(
+            lintable.name,
+            original_syntax_check,
+            self,
+            lintable,
+            app,
+        )
+
+    rules.run = run  # type: ignore[method-assign]
+    Runner.find_children = find_children  # type: ignore[method-assign]
+    Runner._get_ansible_syntax_check_matches = get_syntax_check_matches  # type: ignore[method-assign] # noqa: SLF001
+    try:
+        yield
+    finally:
+        if is_wrapped:
+            rules.run = original_run  # type: ignore[method-assign]
+        else:
+            del rules.run
+        Runner.find_children = original_find_children  # type: ignore[method-assign]
+        Runner._get_ansible_syntax_check_matches = original_syntax_check  # type: ignore[method-assign] # noqa: SLF001
+
+
+@contextlib.contextmanager
+def _use_fail_fast(
+    rules: RulesCollection,
+    fail_fast: FailFast,
+) -> Generator[None, None, None]:
+    """Raise FailFastError at the first match that fails the run.
+
+    A match fails the run unless it is skipped, ignored with the ignore file, in the
+    warn list or fixed by autofix, or any match does with --strict.  The matches found
+    by the rules and the syntax check are examined.  Other matches, e.g. load failures
+    of children, are not, and they fail the run when it finishes.  When fail_fast has a
+    stop_file, it is created at the match, and no more files are linted once it exists.
+    """
+    # pylint: disable=import-outside-toplevel
+    from ansiblelint.runner import Runner
+
+    ignore_map = load_ignore_txt(options.ignore_file)
+    probe = _AutofixProbe()
+
+    def check(matches: list[MatchError]) -> list[MatchError]:
+        for match in matches:
+            if not _fails_run(match, ignore_map, probe):
+                continue
+            if not fail_fast.stop(match):
+                return matches
+            raise FailFastError(match)
+        return matches
+
+    is_wrapped = "run" in vars(rules)
+    original_run = rules.run
+    original_syntax_check = Runner._get_ansible_syntax_check_matches  # noqa: SLF001
+
+    def run(
+        file: Lintable,
+        tags: set[str] | None = None,
+        skip_list: list[str] | None = None,
+    ) -> list[MatchError]:
+        # Other files are not checked after another run sharing stop_file is stopped.
+        if fail_fast.stopped:
+            return []
+        return check(original_run(file, tags, skip_list))
+
+    def get_syntax_check_matches(
+        self: Runner,
+        lintable: Lintable,
+        app: App,
+    ) -> list[MatchError]:
+        # Other files are not checked after the run is stopped.
+        if fail_fast.stopped:
+            return []
+        return check(original_syntax_check(self, lintable, app))
+
+    rules.run = run  # type: ignore[method-assign]
+    Runner._get_ansible_syntax_check_matches = get_syntax_check_matches  # type: ignore[method-assign] # noqa: SLF001
+    try:
+        yield
+    finally:
+        if is_wrapped:
+            rules.run = original_run  # type: ignore[method-assign]
+        else:
+            del rules.run
+        Runner._get_ansible_syntax_check_matches = original_syntax_check  # type: ignore[method-assign] # noqa: SLF001
+
+
+class _AutofixProbe:
+    """Tell if autofix fixes matches without writing files.
+
+    The transforms of matches are applied to the data of YAML files loaded in memory,
+    as the Transformer of ansible-lint does before it writes the files.  The data of a
+    file is loaded once, and the transforms of its matches are applied to it in order.
+    """
+
+    def __init__(self) -> None:
+        """Initialize _AutofixProbe."""
+        # pylint: disable=import-outside-toplevel
+        from ansiblelint.runner import LintResult
+        from ansiblelint.transformer import Transformer
+
+        self._transformer = Transformer(LintResult(matches=[], files=set()), options)
+        self._data: dict[str, Any] = {}
+
+    def is_fixed(self, match: MatchError) -> bool:
+        """Return True if autofix fixes a match."""
+        file = match.lintable
+        if (
+            self._transformer.write_set == {"none"}
+            or str(file.base_kind) != "text/yaml"
+        ):
+            return False
+        if file.filename not in self._data:
+            self._data[file.filename] = self._load(file)
+        if self._data[file.filename] is None:
+            return False
+        self._transformer._do_transforms(  # noqa: SLF001
+            file,
+            self._data[file.filename],
+            True,
+            [match],
+        )
+        # The match is fixed again when autofix writes the files.
+        fixed, match.fixed = match.fixed, False
+        return fixed
+
+    @staticmethod
+    def _load(file: Lintable) -> Any:
+        """Load a YAML file as the Transformer does, or return None if it is not fixed."""
+        # pylint: disable=import-outside-toplevel
+        from ansiblelint.yaml_utils import FormattedYAML
+        from ruamel.yaml.comments import CommentedMap, CommentedSeq
+
+        try:
+            content = file.content
+        except (OSError, UnicodeDecodeError):
+            return None
+        yaml = FormattedYAML(version=(1, 1) if file.is_owned_by_ansible() else None)
+        data = yaml.load(content)
+        return data if isinstance(data, CommentedMap | CommentedSeq) else None
+
+
+def _fails_run(
+    match: MatchError,
+    ignore_map: dict[str, set[str]],
+    probe: _AutofixProbe,
+) -> bool:
+    """Return True if a match fails the run (see report_outcome() of ansible-lint)."""
+    if match.tag in options.skip_list:
+        return False
+    if options.strict:
+        return True
+    if match.tag in ignore_map[match.filename] or not {
+        match.tag,
+        match.rule.id,
+        *match.rule.tags,
+    }.isdisjoint(options.warn_list):
+        return False
+    # Fixed matches do not fail the run.
+    return not probe.is_fixed(match)
+
+
+def _measure(
+    timings: LintTimings | None,
+    phase: str,
+) -> contextlib.AbstractContextManager[None]:
+    """Return a context that adds the time spent in it to a phase if timings are given."""
+    if timings is None:
+        return contextlib.nullcontext()
+    return timings.measure(phase)
+
+
+@contextlib.contextmanager
+def _use_timings(
+    rules: RulesCollection,
+    timings: LintTimings,
+) -> Generator[None, None, None]:
+    """Time the phases of ansible-lint, the rules and the files.
+
+    The phases are the discovery of lintables, the traversal of children, the syntax
+    check and the rules.  The time of a file is the sum of these phases on it.
+    """
+    # pylint: disable=import-outside-toplevel
+    import ansiblelint.utils
+
+    from ansiblelint.runner import Runner
+
+    is_wrapped = "run" in vars(rules)
+    original_run = rules.run
+    original_get_lintables = ansiblelint.utils.get_lintables
+    original_find_children = Runner.find_children
+    original_syntax_check = Runner._get_ansible_syntax_check_matches  # noqa: SLF001
+
+    def run(
+        file: Lintable,
+        tags: set[str] | None = None,
+        skip_list: list[str] | None = None,
+    ) -> list[MatchError]:
+        with timings.measure("rules", file=file.name):
+            return original_run(file, tags, skip_list)
+
+    def get_lintables(*args: Any, **kwargs: Any) -> list[Lintable]:
+        with timings.measure("discovery"):
+            return original_get_lintables(*args, **kwargs)
+
+    def find_children(self: Runner, lintable: Lintable) -> list[Lintable]:
+        with timings.measure("children", file=lintable.name):
+            return original_find_children(self, lintable)
+
+    def get_syntax_check_matches(
+        self: Runner,
+        lintable: Lintable,
+        app: App,
+    ) -> list[MatchError]:
+        with timings.measure("syntax-check", file=lintable.name):
+            return original_syntax_check(self, lintable, app)
+
+    def time_rule(rule: BaseRule) -> None:
+        original_getmatches = rule.getmatches
+
+        def getmatches(file: Lintable) -> list[MatchError]:
+            with timings.measure(rule=rule.id):
+                return original_getmatches(file)
+
+        rule.getmatches = getmatches  # type: ignore[method-assign]
+
+    for rule in rules.rules:
+        time_rule(rule)
+    rules.run = run  # type: ignore[method-assign]
+    ansiblelint.utils.get_lintables = get_lintables
+    Runner.find_children = find_children  # type: ignore[method-assign]
+    Runner._get_ansible_syntax_check_matches = get_syntax_check_matches  # type: ignore[method-assign] # noqa: SLF001
+    try:
+        yield
+    finally:
+        for rule in rules.rules:
+            del rule.getmatches
+        if is_wrapped:
+            rules.run = original_run  # type: ignore[method-assign]
+        else:
+            del rules.run
+        ansiblelint.utils.get_lintables = original_get_lintables
+        Runner.find_children = original_find_children  # type: ignore[method-assign]
+        Runner._get_ansible_syntax_check_matches = original_syntax_check  # type: ignore[method-assign] # noqa: SLF001
+
+
+@contextlib.contextmanager
+def _copy_on_write() -> Generator[None, None, None]:
+    """Make private copies of hard-linked files before ansible-lint autofix rewrites them.
+
+    Lintable.write is patched on the class, so it applies to every ansible-lint run in
+    the process while the context is active.  Runs in the same process must not overlap.
+    """
+    original_write = Lintable.write
+
+    def write(self: Lintable, *, force: bool = False) -> Any:
+        if force or self.updated:
+            materialize(self.path.expanduser().resolve())
+        return original_write(self, force=force)
+
+    Lintable.write = write  # type: ignore[method-assign]
+    try:
+        yield
+    finally:
+        Lintable.write = original_write  # type: ignore[method-assign]
+
+
+@contextlib.contextmanager
+def _defer_writes(writes: dict[str, str]) -> Generator[None, None, None]:
+    """Store the contents ansible-lint autofix writes in a dict keyed by absolute paths."""
+    original_write = Lintable.write
+
+    def write(self: Lintable, *, force: bool = False) -> Any:
+        if force or self.updated:
+            writes[str(self.path.expanduser().resolve())] = self.content
+
+    Lintable.write = write  # type: ignore[method-assign]
+    try:
+        yield
+    finally:
+        Lintable.write = original_write  # type: ignore[method-assign]
 
 
-def _syntax_check_errors_found(result: LintResult) -> bool:
+def syntax_check_errors_found(result: LintResult) -> bool:
     """Check if syntax check errors were found or not."""
     return any(
         match.tag and match.tag.startswith("syntax-check") for match in result.matches
@@ -0,0 +1,156 @@
+"""Enforce time budgets on ansible-lint runs.
+
+A watchdog thread measures the time ansible-lint spends on each file.  When a file
+exceeds the per-file budget, or the run exceeds its deadline, LintTimeoutError is raised
+asynchronously in the thread that lints the file, and the file is recorded as over
+budget.  The files over budget are excluded in the same way as the files with
+syntax-check errors.
+
+The exception is delivered only while Python code runs, so the Ansible syntax check,
+which runs ansible-playbook in subprocesses, is timed but not interrupted.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import ctypes
+import dataclasses
+import threading
+import time
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, TypeVar
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator
+
+
+T = TypeVar("T")
+
+
+class LintTimeoutError(BaseException):
+    """Raised in a thread that lints a file over the time budget.
+
+    This is not a subclass of Exception so that it is not caught by ansible-lint rules.
+    """
+
+
+@dataclass(frozen=True)
+class TimeBudget:
+    """Time budgets of ansible-lint in seconds."""
+
+    file_seconds: float | None = None
+    run_seconds: float | None = None
+    # The time (as time.time()) by which the current run must finish
+    deadline: float | None = None
+
+    def start(self) -> TimeBudget:
+        """Return the budget for a run that starts now."""
+        if self.run_seconds is None:
+            return self
+        return dataclasses.replace(self, deadline=time.time() + self.run_seconds)
+
+
+class Watchdog:
+    """Interrupt the files that exceed a time budget."""
+
+    def __init__(self, budget: TimeBudget, interval: float = 0.1) -> None:
+        """Initialize Watchdog."""
+        self.budget = budget
+        self.interval = interval
+        # Elapsed seconds of the files over budget
+        self.exceeded: dict[str, float] = {}
+        self._elapsed: dict[str, float] = {}
+        # The file and the start time of the call being watched, keyed by thread ids
+        self._watched: dict[int, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    @contextlib.contextmanager
+    def watching(self) -> Generator[Watchdog, None, None]:
+        """Run the watchdog thread while the context is active."""
+        self._stopped.clear()
+        thread = threading.Thread(target=self._watch, daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            self._stopped.set()
+            thread.join()
+
+    def call(
+        self,
+        name: str,
+        default: T,
+        func: Callable[..., T],
+        *args: Any,
+        **kwargs: Any,
+    ) -> T:
+        """Call func for a file, and return default if the file is over budget."""
+        if name in self.exceeded:
+            return default
+        if self._is_past_deadline():
+            self._exceed(name, 0.0)
+            return default
+        thread_id = threading.get_ident()
+        start = time.monotonic()
+        try:
+            try:
+                with self._lock:
+                    self._watched[thread_id] = (name, start)
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._watched.pop(thread_id, None)
+                    self._add(name, time.monotonic() - start)
+        except LintTimeoutError:
+            self._exceed(name, self._elapsed.get(name, 0.0))
+            return default
+
+    def measure(
+        self,
+        name: str,
+        func: Callable[..., T],
+        *args: Any,
+        **kwargs: Any,
+    ) -> T:
+        """Call func for a file without interrupting it, and add the elapsed time."""
+        start = time.monotonic()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._add(name, time.monotonic() - start)
+
+    def _add(self, name: str, seconds: float) -> None:
+        """Add elapsed seconds to a file (the lock must be held)."""
+        elapsed = self._elapsed.get(name, 0.0) + seconds
+        self._elapsed[name] = elapsed
+        if self.budget.file_seconds is not None and elapsed > self.budget.file_seconds:
+            self.exceeded[name] = round(elapsed, 3)
+
+    def _exceed(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.exceeded[name] = round(seconds, 3)
+
+    def _is_past_deadline(self) -> bool:
+        return self.budget.deadline is not None and time.time() > self.budget.deadline
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval):
+            now = time.monotonic()
+            past_deadline = self._is_past_deadline()
+            with self._lock:
+                for thread_id, (name, start) in list(self._watched.items()):
+                    elapsed = self._elapsed.get(name, 0.0) + now - start
+                    if past_deadline or (
+                        self.budget.file_seconds is not None
+                        and elapsed > self.budget.file_seconds
+                    ):
+                        # The elapsed time is added by call() in the thread.
+                        del self._watched[thread_id]
+                        ctypes.pythonapi.PyThreadState_SetAsyncExc(
+                            ctypes.c_ulong(thread_id),
+                            ctypes.py_object(LintTimeoutError),
+                        )
@@ -0,0 +1,301 @@
+"""Cache the matches found by ansible-lint rules in each file.
+
+An entry holds the matches found in a file by the rules.  Entries are keyed by the
+SHA-256 of the file content, the attributes of the lintable that rules look at (path,
+kind, role and parent), the effective rule configuration, which includes the yamllint
+configuration and the content of the ansible-lint configuration file, and the versions
+of ansible-content-parser, ansible-lint and ansible-core, so that unchanged files are not
+linted again when a repository is parsed repeatedly.
+
+Entries are JSON files written with an atomic rename, so that concurrent processes can
+share a cache directory without holding locks while they read and write entries.  A
+missing or broken entry is a cache miss.  The modification time of an entry records
+when it was used last, and least recently used entries are evicted by one process at a
+time when the total size exceeds the limit.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import copy
+import dataclasses
+import hashlib
+import importlib
+import json
+import logging
+import os
+import tempfile
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from ansiblelint.errors import MatchError, RuleMatchTransformMeta
+
+from .cache import file_lock
+
+
+if TYPE_CHECKING:
+    from ansiblelint.config import Options
+    from ansiblelint.file_utils import Lintable
+    from ansiblelint.rules import RulesCollection
+    from pathspec import PathSpec
+    from yamllint.config import YamlLintConfig
+
+
+_logger = logging.getLogger(__name__)
+
+_eviction_lock = ".eviction.lock"
+
+# Options that affect the matches found by rules
+_rule_option_names = [
+    "enable_list",
+    "extra_vars",
+    "kinds",
+    "loop_var_prefix",
+    "max_block_depth",
+    "max_tasks",
+    "mock_filters",
+    "mock_modules",
+    "mock_roles",
+    "nodeps",
+    "offline",
+    "only_builtins_allow_collections",
+    "only_builtins_allow_modules",
+    "profile",
+    "rules",
+    "rulesdirs",
+    "skip_action_validation",
+    "skip_list",
+    "supported_ansible",
+    "tags",
+    "task_name_prefix",
+    "use_default_rules",
+    "var_naming_pattern",
+    "warn_list",
+]
+
+
+def _get_patterns(spec: PathSpec | None) -> list[str | None] | None:
+    if spec is None:
+        return None
+    return [getattr(pattern, "pattern", None) for pattern in spec.patterns]
+
+
+def _get_yamllint_config(config: YamlLintConfig | None) -> dict[str, Any] | None:
+    """Return the settings of a yamllint configuration that affect the matches."""
+    if config is None:
+        return None
+    return {
+        "rules": config.rules,
+        "ignore": _get_patterns(config.ignore),
+        "yaml_files": _get_patterns(config.yaml_files),
+        "locale": config.locale,
+    }
+
+
+def _get_file_digest(path: str | None) -> str | None:
+    """Return the SHA-256 of a file, or None if it is not given or not readable."""
+    if not path:
+        return None
+    try:
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def get_rule_config(rules: RulesCollection, options: Options) -> str:
+    """Return a string that identifies the effective rule configuration.
+
+    Settings of rules that are not loaded into options, such as those of the yamllint
+    rule, are identified by the yamllint configuration of the application and the
+    digest of the ansible-lint configuration file.
+    """
+    config = {name: getattr(options, name) for name in _rule_option_names}
+    # These lists are built from sets, so their orders vary.
+    for name in ["enable_list", "skip_list", "tags", "warn_list"]:
+        config[name] = sorted(config[name])
+    config["rule_ids"] = sorted(rule.id for rule in rules)
+    config["yamllint_config"] = _get_yamllint_config(
+        getattr(rules.app, "yamllint_config", None),
+    )
+    config["config_file"] = _get_file_digest(options.config_file)
+    return json.dumps(config, sort_keys=True, default=str)
+
+
+def _serialize_transform_meta(meta: RuleMatchTransformMeta | None) -> Any:
+    if meta is None:
+        return None
+    cls = type(meta)
+    return {
+        "class": f"{cls.__module__}:{cls.__qualname__}",
+        "fields": dataclasses.asdict(meta),
+    }
+
+
+def _deserialize_transform_meta(data: Any) -> RuleMatchTransformMeta | None:
+    if data is None:
+        return None
+    module_name, _, class_name = data["class"].partition(":")
+    cls = getattr(importlib.import_module(module_name), class_name)
+    if not issubclass(cls, RuleMatchTransformMeta):
+        msg = f"{data['class']} is not a transform metadata class."
+        raise TypeError(msg)
+    # JSON does not distinguish tuples from lists.  Sequences in transform metadata
+    # are tuples as the classes are frozen.
+    meta: RuleMatchTransformMeta = cls(
+        **{
+            k: tuple(v) if isinstance(v, list) else v for k, v in data["fields"].items()
+        },
+    )
+    return meta
+
+
+class LintCache:
+    """The LintCache class."""
+
+    def __init__(self, cache_dir: Path, max_size: int, version: str) -> None:
+        """Initialize LintCache."""
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+
+    def get_key(self, lintable: Lintable, config: str) -> str:
+        """Return the key of the entry for a lintable."""
+        digest = hashlib.sha256()
+        digest.update(lintable.content.encode())
+        attributes = {
+            "version": self.version,
+            "config": config,
+            "name": lintable.name,
+            "kind": lintable.kind,
+            "base_kind": lintable.base_kind,
+            "role": lintable.role,
+            "parent": (
+                None
+                if lintable.parent is None
+                else [lintable.parent.name, lintable.parent.kind]
+            ),
+            "line_offset": lintable.line_offset,
+        }
+        digest.update(json.dumps(attributes, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def get_entry_path(self, key: str) -> Path:
+        """Return the path of an entry."""
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def load(
+        self,
+        key: str,
+        lintable: Lintable,
+        rules: RulesCollection,
+    ) -> list[MatchError] | None:
+        """Return the matches in an entry, or None if there is no valid entry."""
+        path = self.get_entry_path(key)
+        try:
+            with path.open(encoding="utf-8") as f:
+                entries = json.load(f)
+            matches = []
+            for entry in entries:
+                match = MatchError(
+                    message=entry["message"],
+                    lintable=lintable,
+                    tag=entry["tag"],
+                    details=entry["details"],
+                    column=entry["column"],
+                    rule=copy.copy(rules[entry["rule"]]),
+                    transform_meta=_deserialize_transform_meta(
+                        entry["transform_meta"],
+                    ),
+                )
+                # MatchError adds line_offset of the lintable to lineno.
+                match.lineno = entry["lineno"]
+                match.match_type = entry["match_type"]
+                match.yaml_path = entry["yaml_path"]
+                matches.append(match)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            _logger.warning("Ignored a broken lint cache entry %s", path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return matches
+
+    def save(
+        self,
+        key: str,
+        lintable: Lintable,
+        matches: list[MatchError],
+        root: str,
+    ) -> None:
+        """Save matches found in a lintable to an entry if they can be reused.
+
+        Matches found in other files and matches that refer to the absolute path of
+        the repository root directory are not reusable.
+        """
+        entries = []
+        for match in matches:
+            if (
+                match.lintable.filename != lintable.filename
+                or root in match.message
+                or root in match.details
+            ):
+                return
+            entry = {
+                "message": match.message,
+                "tag": match.tag,
+                "lineno": match.lineno,
+                "details": match.details,
+                "column": match.column,
+                "rule": match.rule.id,
+                "match_type": match.match_type,
+                "yaml_path": match.yaml_path,
+                "transform_meta": _serialize_transform_meta(match.transform_meta),
+            }
+            entries.append(entry)
+
+        path = self.get_entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=path.parent,
+            prefix=".",
+            delete=False,
+        ) as f:
+            try:
+                json.dump(entries, f)
+            except (TypeError, ValueError):
+                # Transform metadata that cannot be serialized
+                f.close()
+                Path(f.name).unlink()
+                return
+        Path(f.name).replace(path)
+
+    def evict_least_recently_used(self) -> None:
+        """Remove least recently used entries until the cache fits in max_size bytes.
+
+        Nothing is done if another process is evicting entries.
+        """
+        if not self.cache_dir.is_dir():
+            return
+        with file_lock(self.cache_dir / _eviction_lock, blocking=False) as locked:
+            if not locked:
+                return
+            entries = []
+            for path in self.cache_dir.glob("*/*.json"):
+                with contextlib.suppress(OSError):
+                    stat = path.stat()
+                    entries.append((stat.st_mtime, stat.st_size, path))
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_size <= self.max_size:
+                    break
+                with contextlib.suppress(OSError):
+                    path.unlink()
+                total_size -= size
@@ -0,0 +1,109 @@
+"""Measure the time ansible-lint spends on phases, rules and files.
+
+The time is measured in the thread that runs each step.  The syntax check runs on
+playbooks in parallel threads and shards are linted in parallel processes, so the sums
+of their times can be longer than the elapsed time of a run.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import threading
+import time
+
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from collections.abc import Generator, Iterable
+    from pathlib import Path
+
+
+_lint_timings_json = "lint-timings.json"
+
+# The categories of timings, each of which maps names to seconds
+_categories = ("phases", "rules", "files")
+
+
+class LintTimings:
+    """Wall time spent by ansible-lint on phases, rules and files in seconds."""
+
+    def __init__(self) -> None:
+        """Initialize LintTimings."""
+        self.phases: dict[str, float] = {}
+        self.rules: dict[str, float] = {}
+        self.files: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def measure(
+        self,
+        phase: str | None = None,
+        *,
+        rule: str | None = None,
+        file: str | None = None,
+    ) -> Generator[None, None, None]:
+        """Add the time spent in the context to a phase, a rule and a file."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            seconds = time.monotonic() - start
+            with self._lock:
+                for timings, name in (
+                    (self.phases, phase),
+                    (self.rules, rule),
+                    (self.files, file),
+                ):
+                    if name is not None:
+                        timings[name] = timings.get(name, 0.0) + seconds
+
+    def to_dict(self) -> dict[str, dict[str, float]]:
+        """Return the timings in a serializable form."""
+        with self._lock:
+            return {
+                "phases": dict(self.phases),
+                "rules": dict(self.rules),
+                "files": dict(self.files),
+            }
+
+
+def merge_timings(
+    timings: Iterable[dict[str, dict[str, float]]],
+) -> dict[str, dict[str, float]]:
+    """Add up timings, sorting each category by time in descending order."""
+    merged: dict[str, dict[str, float]] = {category: {} for category in _categories}
+    for t in timings:
+        for category in _categories:
+            for name, seconds in t.get(category, {}).items():
+                merged[category][name] = merged[category].get(name, 0.0) + seconds
+    return {
+        category: {
+            name: round(seconds, 3)
+            for name, seconds in sorted(
+                merged[category].items(),
+                key=lambda x: (-x[1], x[0]),
+            )
+        }
+        for category in _categories
+    }
+
+
+def write_timings(
+    metadata_path: Path,
+    timings: Iterable[dict[str, dict[str, float]]],
+) -> None:
+    """Write the sum of the timings of ansible-lint runs to the metadata directory."""
+    with (metadata_path / _lint_timings_json).open("w", encoding="utf-8") as f:
+        json.dump(merge_timings(timings), f, indent=2)
+
+
+def load_timings(metadata_path: Path) -> dict[str, dict[str, float]] | None:
+    """Return the timings of ansible-lint, or None if they were not recorded."""
+    path = metadata_path / _lint_timings_json
+    if not path.exists():
+        return None
+    with path.open(encoding="utf-8") as f:
+        timings: dict[str, dict[str, float]] = json.load(f)
+    return timings
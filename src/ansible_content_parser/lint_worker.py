@@ -0,0 +1,354 @@
+"""Run ansible-lint in a worker process.
+
+ansible-lint resolves configuration files, lintables and the results relative to the
+working directory of the process, and it keeps options and patches of its classes in
+global state, so two runs cannot share a process at the same time.  ansible-lint is
+executed in worker processes that move to the repository directory for each run
+instead, so that the calling process never changes its working directory.
+
+The pools of worker processes are started on first use and kept for the whole process
+(see get_executor()), so that all repositories parsed in the process share warm worker
+processes and their lint engines.  A worker process runs one task at a time, so several
+repositories can be parsed concurrently in threads of the process, and their runs are
+queued to the workers.  The result of the last run on each repository is kept in the
+worker process to be carried over to the second run.  When a worker process dies, the
+pool is broken, and it is replaced with a new one (see run_with_executor()).
+
+A process that parses one repository at a time, like the CLI, can run ansible-lint in
+the process itself instead (see LintWorker), which saves starting a worker process and
+loading ansible-lint again in it.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import multiprocessing
+import os
+import threading
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from .lint import FailFast, ansiblelint_main, get_engine, syntax_check_main
+from .lint_budget import Watchdog
+from .lint_timings import LintTimings
+from .lintable_dict import LintableDict
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from ansiblelint.runner import LintResult
+
+    from .lint_budget import TimeBudget
+    from .lint_cache import LintCache
+    from .prerun_cache import PrerunCache
+
+
+_logger = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+# The results of the last runs in a worker process by repository directory
+_last_result: dict[str, LintResult] = {}
+
+# The pools of worker processes by the number of workers
+_executors: dict[int, ProcessPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+# Runs in the calling process are made one at a time.
+_in_process_lock = threading.Lock()
+
+
+def get_executor(workers: int = 1) -> ProcessPoolExecutor:
+    """Return the pool of worker processes with the number of workers.
+
+    The pool is shared by all callers in the process and is shut down when the process
+    exits.
+    """
+    with _executors_lock:
+        if workers not in _executors:
+            _executors[workers] = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executors[workers]
+
+
+def _discard_executor(workers: int, executor: ProcessPoolExecutor) -> None:
+    """Discard a broken pool, so that get_executor() starts a new one.
+
+    The pool is removed only if it is still the cached one, as another caller may have
+    replaced it already.
+    """
+    with _executors_lock:
+        if _executors.get(workers) is executor:
+            del _executors[workers]
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_with_executor(
+    workers: int,
+    fn: Callable[[ProcessPoolExecutor], _T],
+) -> _T:
+    """Call fn with the pool of worker processes and return the result.
+
+    When a worker process dies, all futures of the pool fail with BrokenProcessPool.  The
+    pool is then replaced and fn is called once again with the new pool.  If the new
+    pool is broken too, it is replaced for later calls and the error is raised.
+    """
+    executor = get_executor(workers)
+    try:
+        return fn(executor)
+    except BrokenProcessPool:
+        _discard_executor(workers, executor)
+        _logger.warning(
+            "A lint worker process terminated abruptly. Running again in new workers.",
+        )
+    executor = get_executor(workers)
+    try:
+        return fn(executor)
+    except BrokenProcessPool:
+        _discard_executor(workers, executor)
+        raise
+
+
+def _call_in_process(fn: Callable[..., _T], /, *args: Any, **kwargs: Any) -> _T:
+    """Call a task in the calling process and restore the working directory."""
+    with _in_process_lock:
+        previous_dir = Path.cwd()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            os.chdir(previous_dir)
+
+
+def watch(
+    budget: TimeBudget | None,
+) -> contextlib.AbstractContextManager[Watchdog | None]:
+    """Return a context that runs a watchdog for the budget if it is given."""
+    if budget is None:
+        return contextlib.nullcontext()
+    return Watchdog(budget).watching()
+
+
+def use_prerun_cache(prerun_cache: PrerunCache | None) -> None:
+    """Make the lint engine of a worker process use a prerun cache."""
+    get_engine().prerun_cache = prerun_cache
+
+
+def use_work_dir(
+    argv: list[str],
+    work_dir: str,
+    prerun_cache: PrerunCache | None,
+) -> list[str]:
+    """Move to a repository directory and return argv with it as the project directory.
+
+    ansible-lint would look for the project directory in the parents of the working
+    directory, and the lint engine keeps the application loaded for the project
+    directory, so the repository directory is given as the project directory.
+    """
+    os.chdir(work_dir)
+    use_prerun_cache(prerun_cache)
+    return [*argv, "--project-dir", str(Path.cwd())]
+
+
+def get_serializable_result(
+    result: LintResult,
+    watchdog: Watchdog | None,
+    timings: LintTimings | None = None,
+    fail_fast: FailFast | None = None,
+) -> dict[str, Any]:
+    """Return the lintables, the files over the time budget and timings of a result.
+
+    When the run was stopped at the first error, the error is returned in "fail_fast".
+    """
+    serializable_result: dict[str, Any] = {
+        "files": [LintableDict(lintable) for lintable in result.files],
+    }
+    if watchdog and watchdog.exceeded:
+        serializable_result["over_budget"] = dict(sorted(watchdog.exceeded.items()))
+    if timings:
+        serializable_result["timings"] = timings.to_dict()
+    if fail_fast and fail_fast.match:
+        match = fail_fast.match
+        serializable_result["fail_fast"] = {
+            "filename": match.filename,
+            "line": match.lineno,
+            "rule": match.tag,
+            "message": match.message,
+            "details": match.details,
+        }
+    return serializable_result
+
+
+def _lint(
+    argv: list[str],
+    work_dir: str,
+    prerun_cache: PrerunCache | None,
+    lint_cache: LintCache | None,
+    carry_over: bool,
+    skip_syntax_check: bool,
+    budget: TimeBudget | None,
+    lint_timings: bool,
+    stop_at_first_error: bool,
+) -> tuple[dict[str, Any], int]:
+    argv = use_work_dir(argv, work_dir, prerun_cache)
+    previous_result = _last_result.pop(work_dir, None) if carry_over else None
+    timings = LintTimings() if lint_timings else None
+    fail_fast = FailFast() if stop_at_first_error else None
+    with watch(budget) as watchdog:
+        result, _, return_code = ansiblelint_main(
+            argv,
+            previous_result,
+            lint_cache,
+            skip_syntax_check=skip_syntax_check,
+            watchdog=watchdog,
+            timings=timings,
+            fail_fast=fail_fast,
+        )
+    _last_result[work_dir] = result
+    return get_serializable_result(result, watchdog, timings, fail_fast), return_code
+
+
+def _forget(work_dir: str) -> None:
+    _last_result.pop(work_dir, None)
+
+
+def syntax_check(
+    argv: list[str],
+    work_dir: str,
+    prerun_cache: PrerunCache | None,
+    budget: TimeBudget | None = None,
+    *,
+    lint_timings: bool = False,
+) -> dict[str, Any]:
+    """Run only the Ansible syntax check on a repository (see syntax_check_main())."""
+    argv = use_work_dir(argv, work_dir, prerun_cache)
+    timings = LintTimings() if lint_timings else None
+    with watch(budget) as watchdog:
+        result = syntax_check_main(argv, watchdog, timings)
+    return get_serializable_result(result, watchdog, timings)
+
+
+class LintWorker:
+    """Run ansible-lint on a repository in the worker process shared in the process.
+
+    When in_process is set, ansible-lint is run in the calling process instead.  The
+    working directory of the process is changed to the repository during a run and
+    restored afterwards, and runs of all repositories are made one at a time, so this is
+    meant for a process that parses one repository at a time.
+    """
+
+    def __init__(
+        self,
+        work_dir: str,
+        lint_cache: LintCache | None = None,
+        time_budget: TimeBudget | None = None,
+        *,
+        lint_timings: bool = False,
+        fail_fast: bool = False,
+        prerun_cache: PrerunCache | None = None,
+        in_process: bool = False,
+    ) -> None:
+        """Initialize LintWorker."""
+        self.work_dir = work_dir
+        self.lint_cache = lint_cache
+        self.time_budget = time_budget
+        self.lint_timings = lint_timings
+        self.fail_fast = fail_fast
+        self.prerun_cache = prerun_cache
+        self.in_process = in_process
+
+    def _call(self, fn: Callable[..., _T], /, *args: Any, **kwargs: Any) -> _T:
+        """Call a task in the calling process or in the worker process.
+
+        The results carried over to the second run are kept in the worker process, so
+        all runs of a repository are executed by the same single worker.  If the worker
+        process dies, the result is lost and the task is run in a new worker process
+        without it.
+        """
+        if self.in_process:
+            return _call_in_process(fn, *args, **kwargs)
+        return run_with_executor(
+            1,
+            lambda executor: executor.submit(fn, *args, **kwargs).result(),
+        )
+
+    def _start_budget(self) -> TimeBudget | None:
+        return self.time_budget.start() if self.time_budget else None
+
+    def syntax_check(self, argv: list[str]) -> dict[str, Any]:
+        """Run only the Ansible syntax check and return the serializable result."""
+        return self._call(
+            syntax_check,
+            argv,
+            self.work_dir,
+            self.prerun_cache,
+            self._start_budget(),
+            lint_timings=self.lint_timings,
+        )
+
+    def run(
+        self,
+        argv: list[str],
+        *,
+        skip_syntax_check: bool = False,
+    ) -> tuple[dict[str, Any], int]:
+        """Lint the repository and return the serializable result and the return code.
+
+        The files that exceeded the time budget are returned in "over_budget" of the
+        result with their elapsed seconds, and the timings of the run in "timings" if
+        lint_timings is set.  If fail_fast is set, the run stops at the first error,
+        which is returned in "fail_fast".
+        """
+        return self._call(
+            _lint,
+            argv,
+            self.work_dir,
+            self.prerun_cache,
+            self.lint_cache,
+            False,
+            skip_syntax_check,
+            self._start_budget(),
+            self.lint_timings,
+            self.fail_fast,
+        )
+
+    def rerun(
+        self,
+        argv: list[str],
+        exclude_paths: list[str],
+    ) -> tuple[dict[str, Any], int]:
+        """Lint the repository again with additional --exclude paths in argv.
+
+        Only the files affected by the exclusion are linted again and the results of
+        other files are carried over from the previous run.  exclude_paths is not used
+        as the paths are given in argv, and it is accepted for the same interface as
+        ShardedLint.rerun().
+        """
+        return self._call(
+            _lint,
+            argv,
+            self.work_dir,
+            self.prerun_cache,
+            self.lint_cache,
+            True,
+            False,
+            self._start_budget(),
+            self.lint_timings,
+            self.fail_fast,
+        )
+
+    def apply_writes(self) -> None:
+        """Do nothing as autofix results are written by the run."""
+
+    def close(self) -> None:
+        """Drop the result kept for the repository.
+
+        The worker process is kept for other repositories.
+        """
+        self._call(_forget, self.work_dir)
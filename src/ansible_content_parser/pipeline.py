@@ -4,10 +4,15 @@ import argparse
 import logging
 import os
 
+from functools import partial
 from pathlib import Path
 
+from .exclusion_manifest import (
+    drop_excluded_objects,
+    hide_excluded_files,
+    load_manifest,
+)
 from .gen_ftdata import gen_ftdata_jsonl
-from .report import add_module_summary
 
 
 _logger = logging.getLogger(__name__)
@@ -18,7 +23,6 @@ def run_pipeline(args: argparse.Namespace, repository_path: Path) -> int:
     out_path = Path(args.output).absolute()
     metadata_path = out_path / "metadata"
 
-    report_path = out_path / "report.txt"
     ftdata_path = out_path / "ftdata.jsonl"
     lint_result_path = metadata_path / "lint-result.json"
     sage_objects_path = metadata_path / "sage-objects.json"
@@ -37,27 +41,30 @@ def run_pipeline(args: argparse.Namespace, repository_path: Path) -> int:
 
     dp = SagePipeline()
 
-    dp.run(
-        target_dir=str(repository_path),
-        lint_result=str(lint_result_path),
-        output_dir=str(metadata_path),
-        source={
-            "data_source_description": args.source_description,
-            "license": args.source_license,
-            "repo_name": args.repo_name,
-            "repo_url": args.repo_url,
-        },
-    )
+    # The files excluded due to ansible-lint errors are hidden from sage-scan, and the
+    # objects defined in them are dropped before they are written to sage-objects.json
+    # if they are loaded through references from other files.
+    excluded = load_manifest(metadata_path)
+    with hide_excluded_files(repository_path, excluded):
+        dp.run(
+            target_dir=str(repository_path),
+            lint_result=str(lint_result_path),
+            output_dir=str(metadata_path),
+            source={
+                "data_source_description": args.source_description,
+                "license": args.source_license,
+                "repo_name": args.repo_name,
+                "repo_url": args.repo_url,
+            },
+            process_fn=partial(drop_excluded_objects, excluded=excluded),
+        )
 
     # Generate FT Data
     gen_ftdata_jsonl(
         str(sage_objects_path),
         str(ftdata_path),
+        excluded,
     )
     _logger.info("Training data set was created at %s.", str(ftdata_path))
 
-    # Add module section to the report
-    add_module_summary(str(sage_objects_path), args)
-    _logger.info("Execution report was generated at %s.", str(report_path))
-
     return 0
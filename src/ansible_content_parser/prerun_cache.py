@@ -0,0 +1,199 @@
+"""Share the results of the prerun of ansible-lint across runs.
+
+When ansible-lint is loaded in a process, ansible-compat runs ``ansible-config dump``
+and ``ansible --version`` to set up the Ansible runtime (see Runtime of ansible-compat),
+which takes most of the time spent in loading ansible-lint in every worker process.  As
+ansible-lint is run with ANSIBLE_LINT_NODEPS (see lint.py), it works offline and never
+installs requirements of repositories, so the results depend only on the installation
+and the configuration of Ansible.
+
+Entries are keyed by the versions of ansible-compat, ansible-core and ansible-lint, the
+path of the ansible command, the Ansible configuration file and the environment
+variables of Ansible, so that an entry is never used with another version or
+configuration.  An entry is populated once by the first process that needs it while it
+holds an exclusive lock on the entry, and other processes wait for it and read it under
+the lock (see cache.py), so a cache directory can be shared by concurrent runs and
+containers.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+
+from importlib.metadata import version
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from .cache import evict_least_recently_used, file_lock, get_lock_path, touch
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator
+
+    from ansible_compat.runtime import Runtime
+
+
+_logger = logging.getLogger(__name__)
+
+_prerun_json = "prerun.json"
+
+# The outputs of ansible-config dump and ansible --version in an entry
+_results = ("config_dump", "ansible_version")
+
+_packages = ("ansible-compat", "ansible-core", "ansible-lint")
+
+# Entries are small, and they are evicted when they are not used for 30 days.
+_max_size = 64 * 1024 * 1024
+_max_age = 30 * 24 * 60 * 60
+
+
+def get_cache_key() -> str:
+    """Return the key of the entry for the Ansible installation and configuration."""
+    # pylint: disable=import-outside-toplevel
+    from ansible.config.manager import find_ini_config_file
+
+    config_file = find_ini_config_file()
+    attributes = {
+        "versions": {package: version(package) for package in _packages},
+        "ansible": shutil.which("ansible"),
+        "config_file": config_file,
+        "config": (
+            hashlib.sha256(Path(config_file).read_bytes()).hexdigest()
+            if config_file
+            else None
+        ),
+        "environ": {
+            name: value
+            for name, value in os.environ.items()
+            if name.startswith("ANSIBLE_") or name == "HOME"
+        },
+    }
+    return hashlib.sha256(json.dumps(attributes, sort_keys=True).encode()).hexdigest()
+
+
+def _dump_config() -> str:
+    """Return the output of ansible-config dump in the same way as ansible-compat."""
+    env = os.environ.copy()
+    # Avoid possible ANSI garbage
+    env["ANSIBLE_FORCE_COLOR"] = "0"
+    return subprocess.check_output(  # noqa: S603
+        ["ansible-config", "dump"],  # noqa: S607
+        text=True,
+        env=env,
+    )
+
+
+@contextlib.contextmanager
+def _use_config_dump(config_dump: str) -> Generator[None, None, None]:
+    """Make ansible-compat use a config dump instead of running ansible-config."""
+    # pylint: disable=import-outside-toplevel
+    from ansible_compat import runtime
+
+    original_ansible_config = runtime.AnsibleConfig  # type: ignore[attr-defined]
+    runtime.AnsibleConfig = functools.partial(  # type: ignore[attr-defined,assignment]
+        original_ansible_config,
+        config_dump,
+    )
+    try:
+        yield
+    finally:
+        runtime.AnsibleConfig = original_ansible_config  # type: ignore[attr-defined]
+
+
+def _load(entry: Path) -> dict[str, str] | None:
+    """Return the results in an entry, or None if there is no valid entry."""
+    path = entry / _prerun_json
+    try:
+        with path.open(encoding="utf-8") as f:
+            prerun = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        prerun = None
+    if not isinstance(prerun, dict) or not all(
+        isinstance(prerun.get(name), str) for name in _results
+    ):
+        _logger.warning("Ignored a broken prerun cache entry %s", entry)
+        return None
+    return prerun
+
+
+def _save(entry: Path, prerun: dict[str, str]) -> None:
+    """Write the results to an entry, replacing a broken entry if any."""
+    # Write to a temporary directory first so that a failed write does not leave a
+    # broken entry behind.
+    temp_path = entry.with_name("." + entry.name)
+    shutil.rmtree(temp_path, ignore_errors=True)
+    temp_path.mkdir(parents=True)
+    with (temp_path / _prerun_json).open("w", encoding="utf-8") as f:
+        json.dump(prerun, f)
+    shutil.rmtree(entry, ignore_errors=True)
+    temp_path.rename(entry)
+
+
+class PrerunCache:
+    """The PrerunCache class."""
+
+    def __init__(self, cache_dir: Path) -> None:
+        """Initialize PrerunCache."""
+        self.cache_dir = cache_dir
+
+    def _initialize(
+        self,
+        runtime: Runtime,
+        original_init: Callable[..., None],
+        *args: Any,
+        **kwargs: Any,
+    ) -> None:
+        """Initialize an Ansible runtime with the results in the cache."""
+        # pylint: disable=import-outside-toplevel
+        from packaging.version import Version
+
+        entry = self.cache_dir / get_cache_key()
+        with file_lock(get_lock_path(entry)):
+            prerun = _load(entry)
+            if prerun:
+                _logger.info("Using the prerun results in %s", entry)
+                # ansible --version is not run when the version is known.
+                runtime._version = Version(prerun["ansible_version"])  # noqa: SLF001
+                config_dump = prerun["config_dump"]
+            else:
+                config_dump = _dump_config()
+            with _use_config_dump(config_dump):
+                original_init(runtime, *args, **kwargs)
+            if prerun:
+                touch(entry)
+            else:
+                _save(
+                    entry,
+                    {
+                        "config_dump": config_dump,
+                        "ansible_version": str(runtime.version),
+                    },
+                )
+        evict_least_recently_used(self.cache_dir, _max_size, _max_age)
+
+    @contextlib.contextmanager
+    def using(self) -> Generator[None, None, None]:
+        """Use the cache to initialize Ansible runtimes while in a with block."""
+        # pylint: disable=import-outside-toplevel
+        from ansible_compat.runtime import Runtime
+
+        original_init = Runtime.__init__
+        cache = self
+
+        def init(self: Runtime, *args: Any, **kwargs: Any) -> None:
+            cache._initialize(self, original_init, *args, **kwargs)  # noqa: SLF001
+
+        Runtime.__init__ = init  # type: ignore[method-assign]
+        try:
+            yield
+        finally:
+            Runtime.__init__ = original_init  # type: ignore[method-assign]
@@ -6,133 +6,132 @@ import json
 import logging
 
 from collections import Counter
+from collections.abc import Callable
 from pathlib import Path
-from typing import TypedDict
-
-from sarif import loader  # pylint: disable=import-error
-from sarif.operations import summary_op  # pylint: disable=import-error
+from typing import Any, TextIO, TypedDict
 
+from .ingest_filter import load_summary
+from .lint_timings import load_timings
 from .lintable_dict import LintableDict
+from .sarif_index import SarifIndex
 from .version import __version__
 
 
 _logger = logging.getLogger(__name__)
 
 _label_count = "Count"
+_label_elapsed = "Elapsed (s)"
 _label_file_type = "File Type"
 _label_file_path = "File Path"
 _label_file_state = "Excluded/Autofixed"
 _label_module_name = "Module Name"
+_label_phase = "Phase"
+_label_reason = "Reason"
+_label_rule_id = "Rule ID"
 _label_total = "TOTAL"
 
 _report_txt = "report.txt"
+_report_json = "report.json"
+
+# The number of rules and files shown in the summary of timings
+_top_timings = 10
 
 
-def filetype_summary(result: dict[str, list[LintableDict]]) -> str:
-    """Calculate summary stats for file types."""
+def _write_table(
+    f: TextIO,
+    columns: list[tuple[str, bool]],
+    rows: list[list[str]],
+    num_spaces: int,
+    total: list[str] | None = None,
+) -> None:
+    """Write a table with the labels and the alignments (right-aligned or not) of columns.
+
+    The widths of columns are computed before any row is written.  A left-aligned last
+    column is not padded.  The total row follows the rows if it is given.  No newline is
+    written after the last separator.
+    """
+    widths = [len(label) for label, _ in columns]
+    for row in [*rows, total] if total else rows:
+        widths = [max(w, len(value)) for w, value in zip(widths, row, strict=True)]
+    spaces = " " * num_spaces
+    separator = "-" * (sum(widths) + num_spaces * (len(widths) - 1))
+
+    def format_row(row: list[str]) -> str:
+        cells = [
+            value.rjust(w) if right else value.ljust(w)
+            for (_, right), w, value in zip(columns, widths, row, strict=True)
+        ]
+        if not columns[-1][1]:
+            cells[-1] = row[-1]
+        return spaces.join(cells) + "\n"
+
+    f.write(separator + "\n")
+    f.write(format_row([label for label, _ in columns]))
+    f.write(separator + "\n")
+    for row in rows:
+        f.write(format_row(row))
+    if total:
+        f.write(separator + "\n")
+        f.write(format_row(total))
+    f.write(separator)
+
+
+def _write_count_table(
+    f: TextIO,
+    label: str,
+    counts: dict[str, int],
+    sort_key: Callable[[str], Any],
+) -> dict[str, int]:
+    """Write a table of counts with the total and return the counts in the table order."""
+    sorted_counts = {name: counts[name] for name in sorted(counts, key=sort_key)}
+    rows = [[name, str(count)] for name, count in sorted_counts.items()]
+    total = [_label_total, str(sum(counts.values()))]
+    _write_table(f, [(label, False), (_label_count, True)], rows, 5, total)
+    return sorted_counts
+
+
+def write_filetype_summary(
+    f: TextIO,
+    result: dict[str, list[LintableDict]],
+) -> dict[str, int]:
+    """Write summary stats for file types and return the counts."""
     kinds = {f["filename"]: f["kind"] for f in result["files"]}
-    counts = Counter(kinds.values())
-    entries = []
-    total = 0
-    max_kind_len = len(_label_file_type)
-    max_count_len = 0
-    for kind in sorted(counts, key=lambda x: counts[x], reverse=True):
-        kind_str = "(file type not identified)" if kind == "" else kind
-        count = str(counts[kind])
-        total += counts[kind]
-        entries.append([kind_str, count])
-        max_kind_len = max(max_kind_len, len(kind_str))
-
-    max_count_len = max(len(str(total)), len(_label_count))
-
-    num_spaces = 5
-    separator = "-" * (max_kind_len + num_spaces + max_count_len)
-    summary = separator + "\n"
-    summary += (
-        _label_file_type.ljust(max_kind_len)
-        + " " * num_spaces
-        + _label_count.rjust(max_count_len)
-        + "\n"
-    )
-    summary += separator + "\n"
-    for kind_str, count in entries:
-        summary += (
-            kind_str.ljust(max_kind_len)
-            + " " * num_spaces
-            + count.rjust(max_count_len)
-            + "\n"
-        )
-    summary += separator + "\n"
-    summary += (
-        _label_total.ljust(max_kind_len)
-        + " " * num_spaces
-        + str(total).rjust(max_count_len)
-        + "\n"
-    )
-    summary += separator
+    counts: dict[str, int] = {}
+    for kind, count in Counter(kinds.values()).items():
+        counts["(file type not identified)" if kind == "" else kind] = count
+    # Kinds with the same count are in the order they are found.
+    return _write_count_table(f, _label_file_type, counts, lambda x: -counts[x])
 
-    return summary
+
+def write_ingest_filter_summary(f: TextIO, counts: dict[str, int]) -> dict[str, int]:
+    """Write summary for files skipped by the ingestion filter and return the counts."""
+    return _write_count_table(f, _label_reason, counts, lambda x: (-counts[x], x))
 
 
-def get_file_list_summary(files: list[LintableDict], excluded_paths: list[str]) -> str:
-    """Get summary string from the lintable list."""
-    entries = []
-    max_filename_len = len(_label_file_path)
-    max_kind_len = len(_label_file_type)
-    max_state_len = len(_label_file_state)
+def write_file_list_summary(
+    f: TextIO,
+    files: list[LintableDict],
+    excluded_paths: set[str],
+) -> list[list[str]]:
+    """Write summary from the lintable list and return the rows of files.
+
+    A row has the path, the kind and the state (excluded, autofixed or empty) of a file.
+    """
     kinds = {f["filename"]: f["kind"] for f in files}
     updated = {f["filename"]: f["updated"] for f in files}
-    excluded = {f["filename"]: (f["filename"] in excluded_paths) for f in files}
+    rows = []
     for filename in sorted(kinds):
         kind = kinds[filename]
         if kind != "":  # Skip files that was not identified by ansible-lint
             state = (
                 "excluded"
-                if excluded[filename]
+                if filename in excluded_paths
                 else "autofixed" if updated[filename] else ""
             )
-            entries.append([filename, kind, state])
-            max_filename_len = max(max_filename_len, len(filename))
-            max_kind_len = max(max_kind_len, len(kind))
-            max_state_len = max(max_state_len, len(state))
-
-    num_spaces = 2
-    separator = "-" * (
-        max_filename_len + num_spaces + max_kind_len + num_spaces + max_state_len
-    )
-    summary = separator + "\n"
-    summary += (
-        _label_file_path.ljust(max_filename_len)
-        + " " * num_spaces
-        + _label_file_type.ljust(max_kind_len)
-        + " " * num_spaces
-        + _label_file_state
-        + "\n"
-    )
-    summary += separator + "\n"
-    for filename, kind, state in entries:
-        summary += (
-            filename.ljust(max_filename_len)
-            + " " * num_spaces
-            + kind.ljust(max_kind_len)
-            + " " * num_spaces
-            + state
-            + "\n"
-        )
-    summary += separator
-
-    return summary
-
-
-def get_sarif_summary(metadata_path: Path, sarif_file: str) -> str:
-    """Get summary string from the SARIF JSON file."""
-    sarif_summary = metadata_path / "sarif_summary.txt"
-    sarif_file_set = loader.load_sarif_files(sarif_file)
-    summary_op.generate_summary(sarif_file_set, str(sarif_summary), False)
-    with sarif_summary.open(encoding="utf-8") as f:
-        summary = f.read()
-    sarif_summary.unlink()
-    return summary
+            rows.append([filename, kind, state])
+    columns = [(_label_file_path, False), (_label_file_type, False)]
+    _write_table(f, [*columns, (_label_file_state, False)], rows, 2)
+    return rows
 
 
 class _SageObject(TypedDict):
@@ -150,160 +149,213 @@ def get_module_name(o: _SageObject) -> str:
     return module_name
 
 
-def get_module_summary(sage_objects: str) -> str:
-    """Get summary string for Ansible modules found in running the Content Parser."""
-    modules = []
-    with Path(sage_objects).open(encoding="utf-8") as f:
-        for line in f:
+def write_module_summary(f: TextIO, sage_objects: str) -> dict[str, int]:
+    """Write summary for Ansible modules found in tasks and return the counts."""
+    counts: Counter[str] = Counter()
+    with Path(sage_objects).open(encoding="utf-8") as objects:
+        for line in objects:
             o = json.loads(line)
             if o.get("py/object") == "sage_scan.models.Task":
-                modules.append(get_module_name(o))
-
-    counts = Counter(modules)
-    entries = []
-    max_module_len = len(_label_module_name)
-    total = 0
-    for module in sorted(counts, key=lambda x: (-counts[x], x)):
-        count = str(counts[module])
-        total += counts[module]
-        entries.append([module, count])
-        max_module_len = max(max_module_len, len(module))
-
-    max_count_len = max(len(str(total)), len(_label_count))
-
-    num_spaces = 5
-    separator = "-" * (max_module_len + num_spaces + max_count_len)
-    summary = separator + "\n"
-    summary += (
-        _label_module_name.ljust(max_module_len)
-        + _label_count.rjust(max_count_len + num_spaces)
-        + "\n"
-    )
-    summary += separator + "\n"
-    for module, count in entries:
-        summary += (
-            module.ljust(max_module_len)
-            + " " * num_spaces
-            + count.rjust(max_count_len)
-            + "\n"
-        )
-    summary += separator + "\n"
-    summary += (
-        _label_total.ljust(max_module_len)
-        + " " * num_spaces
-        + str(total).rjust(max_count_len)
-        + "\n"
-    )
-    summary += separator
-    return summary
+                counts[get_module_name(o)] += 1
+    return _write_count_table(f, _label_module_name, counts, lambda x: (-counts[x], x))
 
 
-def get_excluded_files(excluded: list[str]) -> str:
-    """Get the list of excluded files in the second ansible-lint run."""
-    max_filename_len = len(_label_file_path)
+def write_excluded_files(f: TextIO, excluded: list[str]) -> None:
+    """Write the list of excluded files in the second ansible-lint run."""
+    separator = "-" * max([len(_label_file_path)] + [len(p) for p in excluded]) + "\n"
+    f.write(separator)
+    f.write(_label_file_path + "\n")
+    f.write(separator)
     for file_path in excluded:
-        max_filename_len = max(max_filename_len, len(file_path))
+        f.write(f"{file_path}\n")
+    f.write(separator)
 
-    summary = "-" * max_filename_len + "\n"
-    summary += _label_file_path + "\n"
-    summary += "-" * max_filename_len + "\n"
-    for file_path in excluded:
-        summary += f"{file_path}\n"
-    summary += "-" * max_filename_len + "\n"
 
+def write_elapsed_summary(
+    f: TextIO,
+    label: str,
+    elapsed: dict[str, float],
+    digits: int,
+) -> None:
+    """Write summary for elapsed seconds of named entries."""
+    rows = [[name, f"{seconds:.{digits}f}"] for name, seconds in elapsed.items()]
+    _write_table(f, [(label, False), (_label_elapsed, True)], rows, 5)
+
+
+def write_timings_summary(f: TextIO, timings: dict[str, dict[str, float]]) -> None:
+    """Write summary for the phases, rules and files that took the most time."""
+    rules = dict(list(timings.get("rules", {}).items())[:_top_timings])
+    files = dict(list(timings.get("files", {}).items())[:_top_timings])
+    f.write("- Phases\n\n")
+    write_elapsed_summary(f, _label_phase, timings.get("phases", {}), 3)
+    f.write(f"\n\n- Top {_top_timings} rules\n\n")
+    write_elapsed_summary(f, _label_rule_id, rules, 3)
+    f.write(f"\n\n- Top {_top_timings} files\n\n")
+    write_elapsed_summary(f, _label_file_path, files, 3)
+
+
+def get_fail_fast_summary(error: dict[str, Any]) -> str:
+    """Get summary string for the error ansible-lint stopped at."""
+    summary = f"""File Path: {error["filename"]}
+Line     : {error["line"]}
+Rule ID  : {error["rule"]}
+Message  : {error["message"]}"""
+    if error["details"]:
+        summary += f"\nDetails  : {error['details']}"
     return summary
 
 
+def _write_section(f: TextIO, title: str) -> None:
+    f.write(f"\n\n[ {title} ]\n\n")
+
+
 def generate_report(
     json_file: str,
     json_file2: str,
-    sarif_file: str,
-    sarif_file2: str,
+    sarif_index: SarifIndex | None,
+    sarif_index2: SarifIndex | None,
     args: argparse.Namespace,
     excluded_paths: list[str],
+    fail_fast: dict[str, Any] | None = None,
+    sage_objects: str = "",
 ) -> None:
-    """Generate report."""
-    report = f"""
+    """Generate report.
+
+    Sections are written to report.txt as they are generated, and the counts and the
+    lists in them are written to report.json.  When ansible-lint stopped at the first
+    error (fail_fast), only the error is reported.  The module section is added when
+    the sage objects file (sage_objects) is given.
+    """
+    out_path = Path(args.output)
+    report: dict[str, Any] = {}
+    with (out_path / _report_txt).open(mode="w") as f:
+        _write_report(
+            f,
+            report,
+            json_file,
+            json_file2,
+            sarif_index,
+            sarif_index2,
+            args,
+            excluded_paths,
+            fail_fast,
+        )
+        if sage_objects and not fail_fast:
+            _write_section(f, "List of Ansible modules found in tasks")
+            report["modules"] = write_module_summary(f, sage_objects)
+            f.write("\n")
+    with (out_path / _report_json).open(mode="w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def _write_report(
+    f: TextIO,
+    report: dict[str, Any],
+    json_file: str,
+    json_file2: str,
+    sarif_index: SarifIndex | None,
+    sarif_index2: SarifIndex | None,
+    args: argparse.Namespace,
+    excluded_paths: list[str],
+    fail_fast: dict[str, Any] | None,
+) -> None:
+    report.update(
+        {
+            "date_time": datetime.datetime.now(tz=datetime.timezone.utc).isoformat(),
+            "version": __version__,
+            "source": args.source,
+            "output": args.output,
+        },
+    )
+    f.write(
+        f"""
 ********************************************************************************
 ****                Ansible Content Parser Execution Report                 ****
 ********************************************************************************
 
-Date/Time             : {datetime.datetime.now(tz=datetime.timezone.utc).isoformat()}
-Content Parser Version: {__version__}
-Source Repository     : {args.source}
-Output Directory      : {args.output}
-"""
-    out_path = Path(args.output)
-    metadata_path = out_path / "metadata"
-
+Date/Time             : {report["date_time"]}
+Content Parser Version: {report["version"]}
+Source Repository     : {report["source"]}
+Output Directory      : {report["output"]}
+""",
+    )
+    metadata_path = Path(args.output) / "metadata"
+
+    if fail_fast:
+        _logger.error(
+            "ansible-lint stopped at the first error: %s at %s:%s",
+            fail_fast["rule"],
+            fail_fast["filename"],
+            fail_fast["line"],
+        )
+        _write_section(f, "ansible-lint stopped at the first error")
+        f.write(get_fail_fast_summary(fail_fast) + "\n")
+        report["fail_fast"] = fail_fast
+        return
+
+    ingest_filter_counts = load_summary(metadata_path)
+    if ingest_filter_counts:
+        _write_section(f, "Files skipped at ingestion")
+        report["ingest_filter"] = write_ingest_filter_summary(f, ingest_filter_counts)
+        f.write("\n")
+
+    over_budget: dict[str, float] = {}
     if json_file:
-        with Path(json_file).open(encoding="utf-8") as f:
-            result = json.load(f)
+        with Path(json_file).open(encoding="utf-8") as json_f:
+            result = json.load(json_f)
             files_all = result["files"]
+            over_budget.update(result.get("over_budget", {}))
 
     last_json_file = json_file2 if json_file2 else json_file
     if last_json_file:
-        with Path(last_json_file).open(encoding="utf-8") as f:
-            result = json.load(f)
+        with Path(last_json_file).open(encoding="utf-8") as json_f:
+            result = json.load(json_f)
             files = result["files"]
             excluded = result.get("excluded", [])
+            over_budget.update(result.get("over_budget", {}))
 
             # If the "last" JSON file was the one obtained from the second run,
             # it does not contain the information about the excluded files.
             # If it is the case, add those files in the JSON file from the first run.
             if last_json_file != json_file:
-                files += [f for f in files_all if f["filename"] in excluded]
-
-        report += f"""
-
-[ File counts per type ]
-
-{filetype_summary(result)}
-
-
-[ List of Ansible files identified ]
-
-{get_file_list_summary(files, excluded_paths)}
-
-
-[ Issues found by ansible-lint ]
-"""
-    if sarif_file2:
-        report += f"""
-(First run)
-{get_sarif_summary(metadata_path, sarif_file)}
-
-(Second run)
-
-- Files excluded from the second run due to syntax-check errors found in the first run
-
-{get_excluded_files(excluded)}
-{get_sarif_summary(metadata_path, sarif_file2)}
-"""
-    else:
-        if sarif_file:
-            report += f"""
-{get_sarif_summary(metadata_path, sarif_file)}
-"""
-    with (out_path / _report_txt).open(mode="w") as f:
-        f.write(report)
-
-    return
-
-
-def add_module_summary(sage_objects: str, args: argparse.Namespace) -> None:
-    """Add Ansible module summary to the report."""
-    summary = get_module_summary(sage_objects)
-
-    out_path = Path(args.output)
-    report_path = out_path / _report_txt
-
-    with report_path.open(mode="a") as f:
+                excluded_set = set(excluded)
+                files += [f for f in files_all if f["filename"] in excluded_set]
+
+        _write_section(f, "File counts per type")
+        report["file_types"] = write_filetype_summary(f, result)
+        f.write("\n")
+        _write_section(f, "List of Ansible files identified")
+        rows = write_file_list_summary(f, files, set(excluded_paths))
+        f.write("\n")
+        # The files are in the columnar form, which is more compact than objects.
+        report["files"] = {
+            column: [row[i] for row in rows]
+            for i, column in enumerate(["path", "kind", "state"])
+        }
+        report["excluded"] = sorted(excluded_paths)
+        if over_budget:
+            report["over_budget"] = dict(sorted(over_budget.items()))
+            _write_section(f, "Files excluded due to the time budget of ansible-lint")
+            write_elapsed_summary(f, _label_file_path, report["over_budget"], 1)
+            f.write("\n")
+        f.write("\n\n[ Issues found by ansible-lint ]\n")
+    if sarif_index and sarif_index2:
+        f.write(f"\n(First run)\n{sarif_index.summary}\n\n(Second run)\n\n")
         f.write(
-            f"""
-
-[ List of Ansible modules found in tasks ]
-
-{summary}
-""",
+            "- Files excluded from the second run due to syntax-check errors found in"
+            " the first run\n\n",
         )
+        write_excluded_files(f, excluded)
+        f.write(f"\n{sarif_index2.summary}\n")
+        report["excluded_from_second_run"] = excluded
+        report["issues"] = [sarif_index.get_counts(), sarif_index2.get_counts()]
+    elif sarif_index:
+        f.write(f"\n{sarif_index.summary}\n")
+        report["issues"] = [sarif_index.get_counts()]
+
+    timings = load_timings(metadata_path)
+    if timings is not None:
+        _write_section(f, "Time spent by ansible-lint")
+        write_timings_summary(f, timings)
+        f.write("\n")
+        report["timings"] = timings
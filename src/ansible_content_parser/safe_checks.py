@@ -11,6 +11,9 @@ threshold_size = 1000000000
 # Increased threshold_ratio from 10 to 100 for reduce false positives.
 threshold_ratio = 100
 
+# Size of the buffer used for reading archive members.
+chunk_size = 64 * 1024
+
 
 def _check_total_size_and_entries(
     total_entry_archive: int,
@@ -67,8 +70,32 @@ def check_tar_file_is_safe(source: str) -> None:
             _check_total_size_and_entries(total_entry_archive, total_size_archive)
 
 
+def _check_ratio(size_entry: int, compress_size: int) -> None:
+    ratio = (size_entry / compress_size) if compress_size != 0 else 1
+    if ratio > threshold_ratio:
+        msg = "ratio between compressed and uncompressed data is highly suspicious, looks like a Zip Bomb Attack"
+        raise RuntimeError(
+            msg,
+        )
+
+
+def _check_zip_info_list(info_list: list[zipfile.ZipInfo]) -> None:
+    """Check the sizes recorded in the central directory without reading any data."""
+    total_size_archive = 0
+
+    for total_entry_archive, info in enumerate(info_list, start=1):
+        total_size_archive += info.file_size
+        _check_ratio(info.file_size, info.compress_size)
+        _check_total_size_and_entries(total_entry_archive, total_size_archive)
+
+
 def check_zip_file_is_safe(source: str) -> None:
-    """Make sure that expanding the zip file is safe."""
+    """Make sure that expanding the zip file is safe.
+
+    The central directory is checked first so that obvious zip bombs are rejected
+    before any data is decompressed.  Actual sizes are then checked while members are
+    read in fixed-size chunks, so memory usage does not depend on the member sizes.
+    """
     if not zipfile.is_zipfile(source):
         msg = f"{source} is not a valid zip file."
         raise RuntimeError(
@@ -79,16 +106,22 @@ def check_zip_file_is_safe(source: str) -> None:
     total_entry_archive = 0
 
     with zipfile.ZipFile(source, "r") as f:
+        _check_zip_info_list(f.infolist())
+
         for info in f.infolist():
-            data = f.read(info)
             total_entry_archive += 1
-
-            total_size_archive = total_size_archive + len(data)
-            ratio = (len(data) / info.compress_size) if info.compress_size != 0 else 1
-            if ratio > threshold_ratio:
-                msg = "ratio between compressed and uncompressed data is highly suspicious, looks like a Zip Bomb Attack"
-                raise RuntimeError(
-                    msg,
-                )
+            size_entry = 0
+            with f.open(info) as entry:
+                while True:
+                    chunk = entry.read(chunk_size)
+                    if not chunk:
+                        break
+                    size_entry += len(chunk)
+                    total_size_archive += len(chunk)
+                    _check_ratio(size_entry, info.compress_size)
+                    _check_total_size_and_entries(
+                        total_entry_archive,
+                        total_size_archive,
+                    )
 
             _check_total_size_and_entries(total_entry_archive, total_size_archive)
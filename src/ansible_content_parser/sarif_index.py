@@ -0,0 +1,190 @@
+"""Index the results in a SARIF file written by ansible-lint.
+
+The SARIF file of a large repository can be hundreds of megabytes.  It is read once into
+a SarifIndex, which keeps the artifact URIs of the results by rule and level and the
+counts of the results by severity and rule, so that the files to exclude and the report
+are computed without reading the file again.
+
+The summary of the results is the same text as the summary of sarif-tools, which is
+computed from the counts without loading the file into sarif-tools.
+"""
+
+from __future__ import annotations
+
+import json
+import textwrap
+
+from collections import defaultdict
+from pathlib import Path
+from typing import Any
+
+
+_severities = ["error", "warning", "note"]
+
+# The maximum length of an issue type in the summary
+_max_key_len = 120
+_continuation = " ..."
+
+
+def _combine_code_and_description(code: str, description: str) -> str:
+    """Return the key of an issue type in the same way as sarif-tools."""
+    code = code.strip()
+    length_budget = _max_key_len - (len(code) + 1 if code else 0)
+    length_budget_pre_continuation = length_budget - len(_continuation)
+    if length_budget_pre_continuation < 10:
+        return code
+    if "\n" in description:
+        description = description[: description.index("\n")]
+    if description.startswith(code):
+        description = description[len(code) :]
+    description = description.strip()
+    if not description:
+        return code or "<NONE>"
+    if len(description) > length_budget:
+        shorter_description = textwrap.shorten(
+            description,
+            width=length_budget_pre_continuation,
+            placeholder=_continuation,
+        )
+        if len(shorter_description) < length_budget_pre_continuation - 40:
+            description = description[:length_budget_pre_continuation] + _continuation
+        else:
+            description = shorter_description
+    return f"{code} {description}" if code else description
+
+
+def _get_severity(result: dict[str, Any], rules: dict[str, dict[str, Any]]) -> str:
+    """Return the severity of a result in the same way as sarif-tools."""
+    if result.get("level"):
+        return str(result["level"])
+    if result.get("kind", "fail") not in ("fail", None, ""):
+        return "none"
+    rule = rules.get(result["ruleId"], {})
+    return str(rule.get("defaultConfiguration", {}).get("level") or "warning")
+
+
+def _get_description(result: dict[str, Any]) -> str:
+    """Return the description of a result in the same way as sarif-tools."""
+    rule_id: str = result["ruleId"]
+    if "message" not in result:
+        return rule_id
+    message = result["message"]
+    text: str = message["text"] if "text" in message else message["id"]
+    if text.startswith(rule_id) and len(text) > len(rule_id) + 1:
+        # sarif-tools takes only the character after the rule ID in this case.
+        return text[len(rule_id) + 1].strip()
+    return text
+
+
+class _IssueType:
+    """The results of a rule with a severity."""
+
+    def __init__(self, code: str, description: str) -> None:
+        """Initialize _IssueType."""
+        self.code = code
+        self.key = _combine_code_and_description(code, description)
+        self.common_description = description
+        self.count = 1
+
+    def add(self, description: str) -> None:
+        """Add a result, shortening the key to the common prefix of descriptions."""
+        self.count += 1
+        if description.startswith(self.common_description):
+            return
+        for i, (c1, c2) in enumerate(
+            zip(self.common_description, description, strict=False),
+        ):
+            if c1 != c2:
+                self.common_description = self.common_description[:i]
+                self.key = _combine_code_and_description(
+                    self.code,
+                    self.common_description + _continuation,
+                )
+                return
+
+
+class SarifIndex:
+    """The SarifIndex class."""
+
+    def __init__(
+        self,
+        uris: dict[tuple[str, str | None], set[str]],
+        issue_types: dict[str, dict[str, _IssueType]],
+    ) -> None:
+        """Initialize SarifIndex.
+
+        uris maps a rule ID and a level to the artifact URIs of the results, where the
+        level is None if it is not given in the results.  issue_types maps a severity and
+        a rule ID to the results in the order they are found.
+        """
+        self.uris = uris
+        self.issue_types = issue_types
+
+    @classmethod
+    def load(cls, path: str) -> SarifIndex:
+        """Read a SARIF file and index its results."""
+        with Path(path).open("rb") as f:
+            data = json.load(f)
+        uris: dict[tuple[str, str | None], set[str]] = defaultdict(set)
+        issue_types: dict[str, dict[str, _IssueType]] = defaultdict(dict)
+        for run in data["runs"]:
+            rules = {
+                rule["id"]: rule
+                for rule in run.get("tool", {}).get("driver", {}).get("rules", [])
+            }
+            for result in run["results"]:
+                rule_id = result["ruleId"]
+                uris[rule_id, result.get("level")].update(
+                    location["physicalLocation"]["artifactLocation"]["uri"]
+                    for location in result["locations"]
+                )
+                description = _get_description(result)
+                types = issue_types[_get_severity(result, rules)]
+                if rule_id in types:
+                    types[rule_id].add(description)
+                else:
+                    types[rule_id] = _IssueType(rule_id, description)
+        return cls(dict(uris), dict(issue_types))
+
+    @property
+    def summary(self) -> str:
+        """Return the summary of the results in the same text as sarif-tools."""
+        lines = []
+        severities = (
+            [*_severities, "none"] if "none" in self.issue_types else _severities
+        )
+        for severity in severities:
+            issue_types = self.issue_types.get(severity, {}).values()
+            lines.append(f"\n{severity}: {sum(t.count for t in issue_types)}")
+            # Rules with the same key are shown as one issue type.
+            histogram: dict[str, int] = {}
+            for t in sorted(issue_types, key=lambda t: t.count, reverse=True):
+                histogram[t.key] = histogram.get(t.key, 0) + t.count
+            lines.extend(f" - {key}: {count}" for key, count in histogram.items())
+        return "".join(line + "\n" for line in lines)
+
+    def get_counts(self) -> dict[str, dict[str, int]]:
+        """Return the numbers of results by severity and rule ID."""
+        return {
+            severity: {rule_id: t.count for rule_id, t in issue_types.items()}
+            for severity, issue_types in self.issue_types.items()
+        }
+
+    def get_exclude_paths(
+        self,
+        exclude_paths: list[str],
+        syntax_check_errors_only: bool,
+    ) -> list[str]:
+        """Return exclude_paths with the files that have syntax-check errors.
+
+        Unless syntax_check_errors_only is set, files with other errors are added too.
+        """
+        paths = set(exclude_paths)
+        for (rule_id, level), uris in self.uris.items():
+            if (
+                rule_id.startswith("syntax-check")
+                or not syntax_check_errors_only
+                and level in (None, "error")
+            ):
+                paths.update(uris)
+        return sorted(paths)
@@ -0,0 +1,553 @@
+"""Run ansible-lint on shards of a repository in parallel.
+
+The lintables discovered by ansible-lint are partitioned into shards at role, playbook
+and collection boundaries: each role and each playbook is a shard, and other files
+belong to the shard of the collection that contains them, or of the repository root.
+Shards are linted in a pool of worker processes and their results are merged into the
+same shapes as a single ansible-lint run produces.
+
+A file is owned by the shard that discovered it.  Matches and lintables are reported by
+the owner only, except for syntax-check matches and for children of other kinds than
+the discovered ones, which no shard owns.  Autofix writes only the files a shard owns,
+and the contents are written by the main process after all shards are linted, so that
+no shard reads a file updated by another shard.  As in a single run, autofix is
+suppressed in all shards when any shard finds syntax-check errors.  The shards depend
+only on the repository, and the results are merged in the order of the shards, so the
+output does not depend on the number of workers.
+
+The pool of worker processes is shared in the process and kept for the whole process
+like the worker process of LintWorker (see lint_worker.py), so the lint engines stay
+loaded for the second run and for other repositories.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import copy  # pylint: disable=preferred-module
+import functools
+import json
+import logging
+import os
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, Any
+
+from .lint import (
+    FailFast,
+    ansiblelint_main,
+    discover_lintables,
+    syntax_check_errors_found,
+)
+from .lint_timings import LintTimings, merge_timings
+from .lint_worker import (
+    get_serializable_result,
+    run_with_executor,
+    syntax_check,
+    use_work_dir,
+    watch,
+)
+from .workspace import materialize
+
+
+if TYPE_CHECKING:
+    from .lint_budget import TimeBudget
+    from .lint_cache import LintCache
+    from .prerun_cache import PrerunCache
+
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Shard:
+    """The Shard class."""
+
+    key: str
+    paths: list[str]
+
+
+@dataclass
+class ShardContext:
+    """The state of a shard being linted in a worker process."""
+
+    key: str
+    owners: dict[tuple[str, str], str]
+    writable_paths: set[str]
+    # Contents to be written by autofix, keyed by absolute paths
+    writes: dict[str, str] = field(default_factory=dict)
+
+    def is_reported(self, name: str, kind: str) -> bool:
+        """Return True if the shard reports matches in a lintable."""
+        owner = self.owners.get((name, kind))
+        return owner is None or owner == self.key
+
+
+@dataclass
+class ShardOutput:
+    """The ShardOutput class."""
+
+    files: list[dict[str, Any]]
+    sarif: dict[str, Any]
+    return_code: int
+    writes: dict[str, str]
+    # Elapsed seconds of the files over the time budget
+    over_budget: dict[str, float] = field(default_factory=dict)
+    # The timings of ansible-lint, which are cleared once they are reported
+    timings: dict[str, dict[str, float]] | None = None
+    # The error the shard was stopped at
+    fail_fast: dict[str, Any] | None = None
+    # Whether syntax-check errors were found, which suppress autofix in all shards
+    syntax_check_errors: bool = False
+
+
+def get_shard_key(name: str, kind: str, collection_roots: list[str]) -> str:
+    """Return the key of the shard a lintable belongs to."""
+    parts = PurePosixPath(name).parts
+    if "roles" in parts[:-1]:
+        i = parts.index("roles")
+        return str(PurePosixPath(*parts[: i + 2]))
+    if kind == "playbook":
+        return name
+    for root in collection_roots:
+        if name.startswith(f"{root}/"):
+            return root
+    return "."
+
+
+def partition_lintables(lintables: list[tuple[str, str]]) -> list[Shard]:
+    """Partition (name, kind) of lintables into shards sorted by their keys."""
+    collection_roots = sorted(
+        {
+            str(PurePosixPath(name).parent)
+            for name, kind in lintables
+            if kind == "galaxy" and str(PurePosixPath(name).parent) != "."
+        },
+        key=len,
+        reverse=True,
+    )
+    paths: dict[str, set[str]] = {}
+    for name, kind in lintables:
+        key = get_shard_key(name, kind, collection_roots)
+        paths.setdefault(key, set()).add(name)
+    return [Shard(key, sorted(paths[key])) for key in sorted(paths)]
+
+
+def merge_sarif(sarifs: list[dict[str, Any]]) -> dict[str, Any]:
+    """Merge SARIF documents of shards into one."""
+    merged = copy.deepcopy(sarifs[0])
+    run = merged["runs"][0]
+    rules: dict[str, Any] = {}
+    results: dict[str, Any] = {}
+    for sarif in sarifs:
+        for r in sarif["runs"]:
+            for rule in r["tool"]["driver"]["rules"]:
+                rules.setdefault(rule["id"], rule)
+            for result in r["results"]:
+                results.setdefault(json.dumps(result, sort_keys=True), result)
+    run["tool"]["driver"]["rules"] = [rules[k] for k in sorted(rules)]
+    run["results"] = sorted(results.values(), key=_get_result_sort_key)
+    return merged
+
+
+def _get_result_sort_key(result: dict[str, Any]) -> tuple[Any, ...]:
+    location = result["locations"][0]["physicalLocation"]
+    region = location.get("region", {})
+    return (
+        location["artifactLocation"]["uri"],
+        region.get("startLine", 0),
+        region.get("startColumn", 0),
+        result["ruleId"],
+        result["message"]["text"],
+    )
+
+
+def merge_files(outputs: list[ShardOutput]) -> list[dict[str, Any]]:
+    """Merge the lintables reported by shards.
+
+    A lintable reported by several shards appears once, with the values reported by
+    the first shard.
+    """
+    files: dict[tuple[str, str], dict[str, Any]] = {}
+    for output in outputs:
+        for f in output.files:
+            files.setdefault((f["filename"], f["kind"]), f)
+    return [files[k] for k in sorted(files)]
+
+
+def _is_excluded(name: str, exclude_paths: list[str]) -> bool:
+    return any(name == p or name.startswith(f"{p.rstrip('/')}/") for p in exclude_paths)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_owners(path: str) -> dict[tuple[str, str], str]:
+    """Return the owner shards of (name, kind) of lintables written to a file.
+
+    The owners are read once per worker process instead of being sent with every shard.
+    """
+    with Path(path).open(encoding="utf-8") as f:
+        return {(name, kind): owner for name, kind, owner in json.load(f)}
+
+
+def _discover(
+    argv: list[str],
+    work_dir: str,
+    prerun_cache: PrerunCache | None,
+) -> list[tuple[str, str]]:
+    # This changes the working directory of the worker process only.
+    return discover_lintables(use_work_dir(argv, work_dir, prerun_cache))
+
+
+def _lint_shard(
+    argv: list[str],
+    work_dir: str,
+    prerun_cache: PrerunCache | None,
+    owners_file: str,
+    shard: Shard,
+    lint_cache: LintCache | None,
+    skip_syntax_check: bool,
+    budget: TimeBudget | None,
+    lint_timings: bool,
+    stop_file: str | None,
+    autofix: bool,
+) -> ShardOutput:
+    argv = use_work_dir(argv, work_dir, prerun_cache)
+    timings = LintTimings() if lint_timings else None
+    # All shards of a run stop when one of them stops at an error.
+    fail_fast = FailFast(stop_file=stop_file) if stop_file else None
+    with tempfile.TemporaryDirectory() as temp_dir, watch(budget) as watchdog:
+        sarif_file = str(Path(temp_dir) / "sarif.json")
+        shard_argv = [*argv, "--sarif-file", sarif_file, "--", *shard.paths]
+        context = ShardContext(shard.key, _load_owners(owners_file), set(shard.paths))
+        result, _, return_code = ansiblelint_main(
+            shard_argv,
+            lint_cache=lint_cache,
+            shard=context,
+            skip_syntax_check=skip_syntax_check,
+            watchdog=watchdog,
+            timings=timings,
+            fail_fast=fail_fast,
+            autofix=autofix,
+        )
+        with Path(sarif_file).open("rb") as f:
+            sarif = json.load(f)
+    serializable_result = get_serializable_result(result, watchdog, timings, fail_fast)
+    return ShardOutput(
+        serializable_result["files"],
+        sarif,
+        return_code,
+        context.writes,
+        serializable_result.get("over_budget", {}),
+        serializable_result.get("timings"),
+        serializable_result.get("fail_fast"),
+        syntax_check_errors_found(result),
+    )
+
+
+class ShardedLint:
+    """Run ansible-lint on shards of a repository in a pool of worker processes."""
+
+    def __init__(
+        self,
+        work_dir: str,
+        workers: int,
+        lint_cache: LintCache | None = None,
+        time_budget: TimeBudget | None = None,
+        *,
+        lint_timings: bool = False,
+        fail_fast: bool = False,
+        prerun_cache: PrerunCache | None = None,
+    ) -> None:
+        """Initialize ShardedLint."""
+        self.work_dir = work_dir
+        self.workers = workers
+        self.lint_cache = lint_cache
+        self.time_budget = time_budget
+        self.lint_timings = lint_timings
+        self.fail_fast = fail_fast
+        self.prerun_cache = prerun_cache
+        self.owners: dict[tuple[str, str], str] = {}
+        self.shards: list[Shard] = []
+        self.outputs: list[ShardOutput] = []
+        # The outputs of shards linted with autofix, whose autofix was suppressed by
+        # syntax-check errors in other shards, by shard keys
+        self._autofixed: dict[str, ShardOutput] = {}
+        self._owners_file = ""
+        self._temp_dir: tempfile.TemporaryDirectory[str] | None = None
+
+    def _get_argv(self, argv: list[str]) -> tuple[list[str], str]:
+        """Remove --sarif-file from arguments and return them with the SARIF file."""
+        i = argv.index("--sarif-file")
+        sarif_file = argv[i + 1]
+        return [*argv[:i], *argv[i + 2 :]], sarif_file
+
+    def _lint_shards(
+        self,
+        argv: list[str],
+        shards: list[Shard],
+        budget: TimeBudget | None,
+        *,
+        skip_syntax_check: bool = False,
+        autofix: bool = True,
+    ) -> list[ShardOutput]:
+        stop_file = None
+        if self.fail_fast:
+            stop_file = str(Path(self._owners_file).with_suffix(".stop"))
+            Path(stop_file).unlink(missing_ok=True)
+
+        def lint(executor: ProcessPoolExecutor) -> list[ShardOutput]:
+            futures = [
+                executor.submit(
+                    _lint_shard,
+                    argv,
+                    self.work_dir,
+                    self.prerun_cache,
+                    self._owners_file,
+                    shard,
+                    self.lint_cache,
+                    skip_syntax_check,
+                    budget,
+                    self.lint_timings,
+                    stop_file,
+                    autofix,
+                )
+                for shard in shards
+            ]
+            if self.fail_fast:
+                # Only the output of the first shard stopped at an error is returned.
+                # The shards that are not started yet are cancelled, and the running
+                # ones stop at their next file as the stop file exists.
+                for future in as_completed(futures):
+                    output = future.result()
+                    if output.fail_fast:
+                        for f in futures:
+                            f.cancel()
+                        wait(futures)
+                        return [output]
+            return [future.result() for future in futures]
+
+        # If a worker process dies, all shards are linted again in a new pool.
+        return run_with_executor(self.workers, lint)
+
+    def _write_outputs(
+        self,
+        outputs: list[ShardOutput],
+        sarif_file: str,
+    ) -> tuple[dict[str, Any], int]:
+        with Path(sarif_file).open("w", encoding="utf-8") as f:
+            json.dump(merge_sarif([output.sarif for output in outputs]), f, indent=2)
+        return_code = max(output.return_code for output in outputs)
+        result: dict[str, Any] = {"files": merge_files(outputs)}
+        over_budget: dict[str, float] = {}
+        for output in outputs:
+            for name, seconds in output.over_budget.items():
+                over_budget[name] = max(seconds, over_budget.get(name, 0.0))
+        if over_budget:
+            result["over_budget"] = dict(sorted(over_budget.items()))
+        # The outputs carried over from the previous run were timed in that run.
+        timings = [output.timings for output in outputs if output.timings is not None]
+        if timings:
+            result["timings"] = merge_timings(timings)
+        for output in outputs:
+            output.timings = None
+        fail_fast = [output.fail_fast for output in outputs if output.fail_fast]
+        if fail_fast:
+            result["fail_fast"] = fail_fast[0]
+        return result, return_code
+
+    def syntax_check(self, argv: list[str]) -> dict[str, Any]:
+        """Run only the Ansible syntax check on the whole repository.
+
+        The syntax check is run on files in parallel by a single worker process, so
+        the repository is not split into shards.
+        """
+        budget = self.time_budget.start() if self.time_budget else None
+        return run_with_executor(
+            self.workers,
+            lambda executor: executor.submit(
+                syntax_check,
+                argv,
+                self.work_dir,
+                self.prerun_cache,
+                budget,
+                lint_timings=self.lint_timings,
+            ).result(),
+        )
+
+    def run(
+        self,
+        argv: list[str],
+        *,
+        skip_syntax_check: bool = False,
+    ) -> tuple[dict[str, Any], int]:
+        """Lint all shards and write the merged SARIF file given with --sarif-file.
+
+        Autofix results are not written until apply_writes() or rerun() is called.
+        """
+        lintables = run_with_executor(
+            self.workers,
+            lambda executor: executor.submit(
+                _discover,
+                argv,
+                self.work_dir,
+                self.prerun_cache,
+            ).result(),
+        )
+        self.shards = partition_lintables(lintables) or [Shard(".", [])]
+        paths = {path: shard.key for shard in self.shards for path in shard.paths}
+        self.owners = {(name, kind): paths[name] for name, kind in lintables}
+        self._owners_file = self._write_owners()
+        _logger.info(
+            "Linting %d shards with %d workers",
+            len(self.shards),
+            self.workers,
+        )
+
+        shard_argv, sarif_file = self._get_argv(argv)
+        # All shards share the deadline of the run.
+        budget = self.time_budget.start() if self.time_budget else None
+        self.outputs = self._lint_shards(
+            shard_argv,
+            self.shards,
+            budget,
+            skip_syntax_check=skip_syntax_check,
+        )
+        self._autofixed = {}
+        if any(output.syntax_check_errors for output in self.outputs):
+            self._suppress_autofix(shard_argv, budget, skip_syntax_check)
+        return self._write_outputs(self.outputs, sarif_file)
+
+    def _suppress_autofix(
+        self,
+        argv: list[str],
+        budget: TimeBudget | None,
+        skip_syntax_check: bool,
+    ) -> None:
+        """Lint the shards fixed by autofix again without autofix.
+
+        A single run suppresses autofix when any syntax-check error is found, so the
+        shards are linted again to report the issues that autofix would fix.  Their
+        outputs with autofix are kept for rerun(), as the second run fixes them.
+        """
+        indexes = [i for i, output in enumerate(self.outputs) if output.writes]
+        if not indexes:
+            return
+        _logger.info(
+            "Linting %d shards again as autofix is suppressed by syntax-check errors",
+            len(indexes),
+        )
+        outputs = self._lint_shards(
+            argv,
+            [self.shards[i] for i in indexes],
+            budget,
+            skip_syntax_check=skip_syntax_check,
+            autofix=False,
+        )
+        for i, output in zip(indexes, outputs, strict=True):
+            autofixed = self.outputs[i]
+            # The time spent on the run with autofix is reported with this run.
+            if autofixed.timings is not None and output.timings is not None:
+                output.timings = merge_timings([autofixed.timings, output.timings])
+            autofixed.timings = None
+            self._autofixed[self.shards[i].key] = autofixed
+            self.outputs[i] = output
+
+    def rerun(
+        self,
+        argv: list[str],
+        exclude_paths: list[str],
+    ) -> tuple[dict[str, Any], int]:
+        """Lint the shards affected by excluded paths again.
+
+        A shard is affected if it has a lintable or a match in an excluded path.  The
+        results of other shards are carried over from the previous run and their
+        autofix results are written.
+        """
+        affected = []
+        for output in self.outputs:
+            uris = [
+                location["physicalLocation"]["artifactLocation"]["uri"]
+                for run in output.sarif["runs"]
+                for result in run["results"]
+                for location in result["locations"]
+            ]
+            affected.append(
+                any(
+                    _is_excluded(name, exclude_paths)
+                    for name in [*uris, *(f["filename"] for f in output.files)]
+                ),
+            )
+
+        outputs: dict[str, ShardOutput] = {}
+        shards = []
+        for shard, output, is_affected in zip(
+            self.shards,
+            self.outputs,
+            affected,
+            strict=True,
+        ):
+            if not is_affected:
+                outputs[shard.key] = self._autofixed.get(shard.key, output)
+                continue
+            paths = [p for p in shard.paths if not _is_excluded(p, exclude_paths)]
+            if paths:
+                shards.append(Shard(shard.key, paths))
+        if not outputs and not shards:
+            shards = [Shard(".", [])]
+        _logger.info("Linting %d shards affected by excluded paths", len(shards))
+
+        shard_argv, sarif_file = self._get_argv(argv)
+        if shards:
+            budget = self.time_budget.start() if self.time_budget else None
+            outputs.update(
+                zip(
+                    [shard.key for shard in shards],
+                    self._lint_shards(shard_argv, shards, budget),
+                    strict=True,
+                ),
+            )
+        self._autofixed = {}
+        keys = {shard.key for shard in shards}
+        self.shards = sorted(
+            [s for s in self.shards if s.key in outputs and s.key not in keys] + shards,
+            key=lambda s: s.key,
+        )
+        self.outputs = [outputs[shard.key] for shard in self.shards]
+        self.apply_writes()
+        return self._write_outputs(self.outputs, sarif_file)
+
+    def apply_writes(self) -> None:
+        """Write autofix results of the last run."""
+        for output in self.outputs:
+            self._apply_writes(output)
+
+    def _write_owners(self) -> str:
+        """Write the owners to a new file, whose path is unique to the run."""
+        if self._temp_dir is None:
+            self._temp_dir = tempfile.TemporaryDirectory()
+        fd, path = tempfile.mkstemp(suffix=".json", dir=self._temp_dir.name)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(
+                [[name, kind, owner] for (name, kind), owner in self.owners.items()],
+                f,
+            )
+        return path
+
+    def close(self) -> None:
+        """Remove the files of the owners.
+
+        The worker processes are kept for other repositories.
+        """
+        if self._temp_dir:
+            self._temp_dir.cleanup()
+            self._temp_dir = None
+
+    @staticmethod
+    def _apply_writes(output: ShardOutput) -> None:
+        for path, content in sorted(output.writes.items()):
+            with contextlib.suppress(FileNotFoundError):
+                materialize(Path(path))
+            Path(path).write_text(content, encoding="utf-8")
+        output.writes = {}
@@ -0,0 +1,61 @@
+"""Populate the repository directory from a local directory without copying file data.
+
+Files are cloned with reflinks on file systems that support them (e.g. Btrfs, XFS), or
+hard-linked to the source files otherwise.  As a hard-linked file shares its data with
+the source, a private copy of it is made right before ansible-lint autofix rewrites it
+(see lint.py), so that the source tree is never modified.
+"""
+
+import contextlib
+import fcntl
+import logging
+import os
+import shutil
+
+from collections.abc import Callable
+from pathlib import Path
+
+
+_logger = logging.getLogger(__name__)
+
+# FICLONE ioctl request defined in linux/fs.h
+_ficlone = 0x40049409
+
+
+def _reflink(src: str, dst: str) -> None:
+    with Path(src).open("rb") as fsrc, Path(dst).open("wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), _ficlone, fsrc.fileno())
+
+
+def _link_or_copy(src: str, dst: str) -> str:
+    """Clone, hard-link or copy a file, in this order of preference."""
+    try:
+        _reflink(src, dst)
+        shutil.copystat(src, dst)
+    except OSError:
+        with contextlib.suppress(FileNotFoundError):
+            Path(dst).unlink()
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+    return dst
+
+
+def link_tree(
+    source: str,
+    dest: Path,
+    ignore: Callable[[str, list[str]], set[str]] | None = None,
+) -> None:
+    """Create dest with the same contents as source without copying file data if possible."""
+    shutil.copytree(source, dest, ignore=ignore, copy_function=_link_or_copy)
+
+
+def materialize(path: Path) -> None:
+    """Replace a hard-linked file with a private copy of it."""
+    if not path.is_file() or path.stat().st_nlink <= 1:
+        return
+    _logger.debug("Making a private copy of %s", path)
+    temp_path = path.with_name(f".{path.name}.__COPY__")
+    shutil.copy2(path, temp_path)
+    temp_path.replace(path)
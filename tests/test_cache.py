@@ -0,0 +1,85 @@
+"""Test cache.py."""
+
+import os
+
+from pathlib import Path
+from unittest import TestCase
+
+from ansible_content_parser.cache import (
+    evict_least_recently_used,
+    exclusive_lock,
+    file_lock,
+    get_lock_path,
+)
+
+from .test_main import temp_dir
+
+
+def _create_entry(cache_dir: Path, name: str, size: int, mtime: int) -> Path:
+    entry = cache_dir / name
+    entry.mkdir(parents=True)
+    (entry / "data").write_bytes(b"A" * size)
+    os.utime(entry, (mtime, mtime))
+    return entry
+
+
+class TestCache(TestCase):
+    """The TestCache class."""
+
+    def test_file_lock(self) -> None:
+        """Test that a non-blocking lock is not acquired while the lock is held."""
+        with temp_dir() as work:
+            lock_path = Path(work.name) / "entry.lock"
+            with file_lock(lock_path, shared=True) as locked:
+                assert locked
+                with file_lock(lock_path, shared=True, blocking=False) as locked2:
+                    assert locked2
+                with file_lock(lock_path, blocking=False) as locked3:
+                    assert not locked3
+            with file_lock(lock_path, blocking=False) as locked4:
+                assert locked4
+
+    def test_exclusive_lock(self) -> None:
+        """Test that an exclusive lock is downgraded to a shared lock."""
+        with temp_dir() as work:
+            lock_path = Path(work.name) / "entry.lock"
+            with exclusive_lock(lock_path) as downgrade:
+                with file_lock(lock_path, shared=True, blocking=False) as locked:
+                    assert not locked
+                downgrade()
+                with file_lock(lock_path, shared=True, blocking=False) as locked:
+                    assert locked
+                with file_lock(lock_path, blocking=False) as locked:
+                    assert not locked
+            with file_lock(lock_path, blocking=False) as locked:
+                assert locked
+
+    def test_evict_least_recently_used(self) -> None:
+        """Test that least recently used entries that are not in use are evicted."""
+        with temp_dir() as work:
+            cache_dir = Path(work.name)
+            entry1 = _create_entry(cache_dir, "entry1", 100, 1000)
+            entry2 = _create_entry(cache_dir, "entry2", 100, 2000)
+            entry3 = _create_entry(cache_dir, "entry3", 100, 3000)
+            entry4 = _create_entry(cache_dir, "entry4", 100, 4000)
+
+            with file_lock(get_lock_path(entry1), shared=True):
+                evict_least_recently_used(cache_dir, 250)
+
+            assert entry1.exists()
+            assert not entry2.exists()
+            assert not entry3.exists()
+            assert entry4.exists()
+
+    def test_evict_expired_entries(self) -> None:
+        """Test that entries older than max_age are evicted."""
+        with temp_dir() as work:
+            cache_dir = Path(work.name)
+            entry1 = _create_entry(cache_dir, "entry1", 100, 1000)
+            entry2 = _create_entry(cache_dir, "entry2", 100, 2000)
+            os.utime(entry2)
+
+            evict_least_recently_used(cache_dir, 1000, max_age=3600)
+
+            assert not entry1.exists()
+            assert entry2.exists()
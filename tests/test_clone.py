@@ -0,0 +1,193 @@
+"""Test clone.py."""
+
+import contextlib
+import shutil
+
+from collections.abc import Callable, Generator
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from ansible_content_parser.cache import exclusive_lock
+from ansible_content_parser.clone import (
+    clone_repository,
+    get_mirror_name,
+    normalize_url,
+)
+from ansible_content_parser.ingest_filter import (
+    IngestionFilter,
+    reason_excluded,
+    reason_too_large,
+)
+from git import Actor, Repo
+
+from .test_main import sample_playbook, temp_dir
+
+
+actor = Actor("Test User", "test@example.com")
+
+
+def create_bare_repository(work_path: Path) -> str:
+    """Create a bare repository with two commits and return its file:// URL."""
+    work_tree = work_path / "work"
+    repo = Repo.init(work_tree)
+    (work_tree / "playbook.yml").write_text(sample_playbook)
+    repo.index.add(["playbook.yml"])
+    repo.index.commit("first commit", author=actor, committer=actor)
+
+    (work_tree / "roles" / "a" / "tasks").mkdir(parents=True)
+    (work_tree / "roles" / "a" / "tasks" / "main.yml").write_text("---\n")
+    (work_tree / "docs").mkdir()
+    (work_tree / "docs" / "image.png").write_bytes(b"\x89PNG" * 1024)
+    repo.index.add(["roles/a/tasks/main.yml", "docs/image.png"])
+    repo.index.commit("second commit", author=actor, committer=actor)
+
+    bare_path = work_path / "bare.git"
+    bare = repo.clone(bare_path, bare=True)
+    bare.git.config("uploadpack.allowFilter", "true")
+    return bare_path.as_uri()
+
+
+class TestClone(TestCase):
+    """The TestClone class."""
+
+    def test_clone_repository(self) -> None:
+        """Test a full clone."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            url = create_bare_repository(work_path)
+            repository_path = work_path / "repository"
+            clone_repository(url, repository_path)
+
+            repo = Repo(repository_path)
+            assert repo.git.rev_list("--count", "HEAD") == "2"
+            assert (repository_path / "docs" / "image.png").is_file()
+
+    def test_clone_repository_with_shallow_partial_sparse_clone(self) -> None:
+        """Test a shallow, partial and sparse clone."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            url = create_bare_repository(work_path)
+            repository_path = work_path / "repository"
+            clone_repository(
+                url,
+                repository_path,
+                depth=1,
+                blob_filter="blob:none",
+                sparse_checkout=True,
+            )
+
+            repo = Repo(repository_path)
+            assert repo.git.rev_list("--count", "HEAD") == "1"
+            assert repo.git.config("remote.origin.promisor") == "true"
+            assert (repository_path / "playbook.yml").is_file()
+            assert (repository_path / "roles" / "a" / "tasks" / "main.yml").is_file()
+            assert not (repository_path / "docs").exists()
+
+    def test_clone_repository_with_mirror_cache(self) -> None:
+        """Test cloning through the mirror cache."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            url = create_bare_repository(work_path)
+            cache_dir = work_path / "cache"
+
+            repository_path = work_path / "repository"
+            clone_repository(
+                url,
+                repository_path,
+                mirror_cache=cache_dir,
+                mirror_cache_size=1024 * 1024 * 1024,
+            )
+            repo = Repo(repository_path)
+            assert repo.remote().url == url
+            assert repo.git.rev_list("--count", "HEAD") == "2"
+            assert (cache_dir / get_mirror_name(url)).is_dir()
+
+            # Add a commit to the origin and make sure it is fetched into the mirror.
+            work_tree = Repo(work_path / "work")
+            (work_path / "work" / "playbook2.yml").write_text(sample_playbook)
+            work_tree.index.add(["playbook2.yml"])
+            work_tree.index.commit("third commit", author=actor, committer=actor)
+            work_tree.git.push(str(work_path / "bare.git"), "HEAD")
+
+            repository_path2 = work_path / "repository2"
+            clone_repository(
+                url,
+                repository_path2,
+                sparse_checkout=True,
+                mirror_cache=cache_dir,
+                mirror_cache_size=1024 * 1024 * 1024,
+            )
+            assert (repository_path2 / "playbook2.yml").is_file()
+            assert not (repository_path2 / "docs").exists()
+
+    def test_clone_repository_with_mirror_evicted(self) -> None:
+        """Test that a mirror evicted while its lock is downgraded is created again."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            url = create_bare_repository(work_path)
+            cache_dir = work_path / "cache"
+            mirror_path = cache_dir / get_mirror_name(url)
+            downgrades: list[Path] = []
+
+            @contextlib.contextmanager
+            def evicting_lock(path: Path) -> Generator[Callable[[], None], None, None]:
+                with exclusive_lock(path) as downgrade:
+
+                    def evict_and_downgrade() -> None:
+                        # Another process evicts the mirror on the first conversion.
+                        if not downgrades:
+                            shutil.rmtree(mirror_path)
+                        downgrades.append(path)
+                        downgrade()
+
+                    yield evict_and_downgrade
+
+            repository_path = work_path / "repository"
+            with patch("ansible_content_parser.clone.exclusive_lock", evicting_lock):
+                clone_repository(
+                    url,
+                    repository_path,
+                    mirror_cache=cache_dir,
+                    mirror_cache_size=1024 * 1024 * 1024,
+                )
+            assert len(downgrades) == 2
+            assert mirror_path.is_dir()
+            assert Repo(repository_path).git.rev_list("--count", "HEAD") == "2"
+
+    def test_clone_repository_with_ingest_filter(self) -> None:
+        """Test that files rejected by the ingestion filter are not checked out."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            url = create_bare_repository(work_path)
+            repository_path = work_path / "repository"
+            ingest_filter = IngestionFilter(max_file_size=1024)
+            clone_repository(url, repository_path, ingest_filter=ingest_filter)
+
+            assert (repository_path / "playbook.yml").is_file()
+            assert (repository_path / "roles" / "a" / "tasks" / "main.yml").is_file()
+            assert not (repository_path / "docs").exists()
+            assert ingest_filter.skipped == {"docs/image.png": reason_too_large}
+
+            # The size limit is not applied to a partial clone.
+            repository_path2 = work_path / "repository2"
+            ingest_filter = IngestionFilter(exclude=["roles"], max_file_size=1024)
+            clone_repository(
+                url,
+                repository_path2,
+                blob_filter="blob:none",
+                sparse_checkout=True,
+                ingest_filter=ingest_filter,
+            )
+            assert (repository_path2 / "playbook.yml").is_file()
+            assert not (repository_path2 / "roles").exists()
+            assert not (repository_path2 / "docs").exists()
+            assert ingest_filter.skipped == {"roles/a/tasks/main.yml": reason_excluded}
+
+    def test_normalize_url(self) -> None:
+        """Test that HTTPS and SSH URLs of a repository are normalized to the same string."""
+        assert (
+            normalize_url("https://github.com/ansible/ansible-tower-samples.git")
+            == normalize_url("git@github.com:ansible/ansible-tower-samples.git")
+            == "github.com/ansible/ansible-tower-samples"
+        )
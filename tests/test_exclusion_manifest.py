@@ -0,0 +1,88 @@
+"""Test exclusion_manifest.py."""
+
+from functools import partial
+from pathlib import Path
+from unittest import TestCase
+
+from ansible_content_parser.exclusion_manifest import (
+    drop_excluded_objects,
+    hide_excluded_files,
+)
+
+from .test_main import sample_playbook, sample_playbook_name, temp_dir
+
+
+role_tasks = """---
+- name: Debug
+  ansible.builtin.debug:
+    msg: hello
+"""
+
+role_tasks2 = """---
+- name: Service started
+  ansible.builtin.service:
+    name: httpd
+    state: started
+"""
+
+excluded = {sample_playbook_name, "roles/web/tasks/service.yml"}
+
+
+def _create_repository(path: Path) -> Path:
+    repository = path / "repository"
+    (repository / "playbooks").mkdir(parents=True)
+    (repository / "roles" / "web" / "tasks").mkdir(parents=True)
+    (repository / sample_playbook_name).write_text(sample_playbook)
+    (repository / "playbooks" / "site.yml").write_text(
+        sample_playbook.replace("Apache", "Site"),
+    )
+    (repository / "roles" / "web" / "tasks" / "main.yml").write_text(role_tasks)
+    (repository / "roles" / "web" / "tasks" / "service.yml").write_text(role_tasks2)
+    return repository
+
+
+def _scan(repository: Path, output: Path, excluded: set[str]) -> tuple[str, str]:
+    """Run sage-scan and return file_inventory.json and sage-objects.json."""
+    # pylint: disable=import-error,import-outside-toplevel
+    from sage_scan.pipeline import SagePipeline
+
+    with hide_excluded_files(repository, excluded):
+        SagePipeline().run(  # type: ignore[no-untyped-call]
+            target_dir=str(repository),
+            output_dir=str(output),
+            source={},
+            process_fn=partial(drop_excluded_objects, excluded=excluded),
+        )
+    return (
+        (output / "file_inventory.json").read_text().replace(str(repository), ""),
+        (output / "sage-objects.json").read_text(),
+    )
+
+
+class TestExclusionManifest(TestCase):
+    """The TestExclusionManifest class."""
+
+    def test_hide_excluded_files(self) -> None:
+        """Test that hidden files are scanned like the files renamed to be excluded."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+
+            # Files were renamed to be excluded before the manifest was introduced.
+            renamed = _create_repository(work_path / "renamed")
+            for name in excluded:
+                (renamed / name).rename(renamed / f"{name}.__EXCLUDED__")
+            expected = _scan(renamed, work_path / "renamed" / "output", set())
+
+            repository = _create_repository(work_path / "hidden")
+            inventory, objects = _scan(
+                repository,
+                work_path / "hidden" / "output",
+                excluded,
+            )
+
+            assert inventory == expected[0]
+            assert objects == expected[1]
+            assert "roles/web/tasks/service.yml.__EXCLUDED__" in inventory
+            assert "roles/web/tasks/service.yml" not in objects
+            # The repository is not modified.
+            assert all((repository / name).is_file() for name in excluded)
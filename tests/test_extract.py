@@ -0,0 +1,393 @@
+"""Test extract.py."""
+
+import io
+import tarfile
+import zipfile
+
+from pathlib import Path
+from typing import Literal
+from unittest import TestCase
+from unittest.mock import patch
+
+from ansible_content_parser.extract import (
+    extract_stream,
+    extract_tar_file,
+    extract_zip_file,
+)
+from ansible_content_parser.ingest_filter import (
+    IngestionFilter,
+    reason_excluded,
+    reason_too_large,
+)
+
+from .test_main import sample_playbook, temp_dir
+
+
+def _add_file(tar: tarfile.TarFile, name: str, data: bytes, mode: int = 0o644) -> None:
+    tarinfo = tarfile.TarInfo(name)
+    tarinfo.size = len(data)
+    tarinfo.mode = mode
+    tarinfo.mtime = 1700000000
+    tar.addfile(tarinfo, io.BytesIO(data))
+
+
+def _assert_same_tree(expected: Path, actual: Path) -> None:
+    expected_files = sorted(p.relative_to(expected) for p in expected.rglob("*"))
+    actual_files = sorted(p.relative_to(actual) for p in actual.rglob("*"))
+    assert actual_files == expected_files
+    for p in expected_files:
+        if (expected / p).is_file():
+            assert (actual / p).read_bytes() == (expected / p).read_bytes()
+
+
+class TestExtractTarFile(TestCase):
+    """The TestExtractTarFile class."""
+
+    def test_extract_tar_file(self) -> None:
+        """Test that the extracted tree matches the one created by extractall."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "test.tar.gz"
+            with tarfile.open(source, "w:gz") as tar:
+                tarinfo = tarfile.TarInfo("project")
+                tarinfo.type = tarfile.DIRTYPE
+                tarinfo.mode = 0o755
+                tar.addfile(tarinfo)
+                _add_file(tar, "project/playbook.yml", sample_playbook.encode())
+                _add_file(tar, "project/roles/a/tasks/main.yml", b"---\n", 0o600)
+                tarinfo = tarfile.TarInfo("project/link.yml")
+                tarinfo.type = tarfile.SYMTYPE
+                tarinfo.linkname = "playbook.yml"
+                tar.addfile(tarinfo)
+                tarinfo = tarfile.TarInfo("project/hardlink.yml")
+                tarinfo.type = tarfile.LNKTYPE
+                tarinfo.linkname = "project/playbook.yml"
+                tar.addfile(tarinfo)
+
+            expected = work_path / "expected"
+            with tarfile.open(source) as tar:
+                tar.extractall(expected)  # noqa: S202
+            actual = work_path / "actual"
+            extract_tar_file(str(source), actual)
+
+            expected_files = sorted(
+                p.relative_to(expected) for p in expected.rglob("*")
+            )
+            actual_files = sorted(p.relative_to(actual) for p in actual.rglob("*"))
+            assert actual_files == expected_files
+            for p in expected_files:
+                if (expected / p).is_file():
+                    assert (actual / p).read_bytes() == (expected / p).read_bytes()
+                    assert (actual / p).stat().st_mode == (expected / p).stat().st_mode
+                    assert (actual / p).stat().st_mtime == (
+                        expected / p
+                    ).stat().st_mtime
+            assert (actual / "project" / "link.yml").is_symlink()
+
+    def test_extract_tar_file_with_path_traversal(self) -> None:
+        """Test that a member pointing outside of the destination is rejected."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "test.tar"
+            with tarfile.open(source, "w") as tar:
+                _add_file(tar, "../evil.yml", b"---\n")
+
+            dest = work_path / "repository"
+            with self.assertRaises(RuntimeError):
+                extract_tar_file(str(source), dest)
+            assert not dest.exists()
+            assert not (work_path / "evil.yml").exists()
+
+    def test_extract_tar_file_with_symlink_outside(self) -> None:
+        """Test that a symbolic link pointing outside of the destination is rejected."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "test.tar"
+            with tarfile.open(source, "w") as tar:
+                tarinfo = tarfile.TarInfo("link")
+                tarinfo.type = tarfile.SYMTYPE
+                tarinfo.linkname = "/etc"
+                tar.addfile(tarinfo)
+                _add_file(tar, "link/evil.yml", b"---\n")
+
+            dest = work_path / "repository"
+            with self.assertRaises(RuntimeError):
+                extract_tar_file(str(source), dest)
+            assert not dest.exists()
+
+    def test_extract_tar_file_with_too_many_files(self) -> None:
+        """Test that partial output is removed when the entry limit is exceeded."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "test.tar.xz"
+            with tarfile.open(source, "w:xz") as tar:
+                for i in range(11):
+                    _add_file(tar, f"{i}.yml", sample_playbook.encode())
+
+            dest = work_path / "repository"
+            with (
+                patch("ansible_content_parser.safe_checks.threshold_entries", 10),
+                self.assertRaises(RuntimeError) as context,
+            ):
+                extract_tar_file(str(source), dest)
+
+            assert (
+                context.exception.args[0]
+                == "too many entries in this archive, can lead to inodes exhaustion of the system"
+            )
+            assert not dest.exists()
+
+    def test_extract_tar_file_too_big(self) -> None:
+        """Test that extraction stops as soon as the size limit is exceeded."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "test.tar.bz2"
+            with tarfile.open(source, "w:bz2") as tar:
+                _add_file(tar, "big.txt", b"A" * 4096)
+
+            dest = work_path / "repository"
+            with (
+                patch("ansible_content_parser.safe_checks.threshold_size", 1024),
+                self.assertRaises(RuntimeError) as context,
+            ):
+                extract_tar_file(str(source), dest)
+
+            assert (
+                context.exception.args[0]
+                == "the uncompressed data size is too much for the application resource capacity"
+            )
+            assert not dest.exists()
+
+    def test_extract_tar_file_in_parallel(self) -> None:
+        """Test that parallel extraction creates the same tree as extractall."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "test.tar"
+            with tarfile.open(source, "w") as tar:
+                for i in range(50):
+                    _add_file(
+                        tar,
+                        f"project/roles/r{i % 5}/tasks/{i}.yml",
+                        b"---\n" * i,
+                    )
+                tarinfo = tarfile.TarInfo("project/hardlink.yml")
+                tarinfo.type = tarfile.LNKTYPE
+                tarinfo.linkname = "project/roles/r1/tasks/1.yml"
+                tar.addfile(tarinfo)
+
+            expected = work_path / "expected"
+            with tarfile.open(source) as tar:
+                tar.extractall(expected)  # noqa: S202
+            actual = work_path / "actual"
+            extract_tar_file(str(source), actual, 4)
+
+            _assert_same_tree(expected, actual)
+
+    def test_extract_tar_file_in_parallel_too_big(self) -> None:
+        """Test that the size limit is enforced across all threads."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "test.tar"
+            with tarfile.open(source, "w") as tar:
+                for i in range(10):
+                    _add_file(tar, f"{i}.txt", b"A" * 200)
+
+            dest = work_path / "repository"
+            with (
+                patch("ansible_content_parser.safe_checks.threshold_size", 1024),
+                self.assertRaises(RuntimeError),
+            ):
+                extract_tar_file(str(source), dest, 4)
+            assert not dest.exists()
+
+    def test_extract_tar_file_with_ingest_filter(self) -> None:
+        """Test that members rejected by the ingestion filter are not extracted."""
+        for workers in [1, 4]:
+            with temp_dir() as work:
+                work_path = Path(work.name)
+                source = work_path / "test.tar"
+                with tarfile.open(source, "w") as tar:
+                    _add_file(tar, "project/playbook.yml", sample_playbook.encode())
+                    _add_file(tar, "project/node_modules/a/index.js", b"")
+                    _add_file(tar, "project/big.yml", b"#" * 2048)
+                    tarinfo = tarfile.TarInfo("project/big-link.yml")
+                    tarinfo.type = tarfile.LNKTYPE
+                    tarinfo.linkname = "project/big.yml"
+                    tar.addfile(tarinfo)
+
+                ingest_filter = IngestionFilter(
+                    exclude=["node_modules"],
+                    max_file_size=1024,
+                )
+                dest = work_path / "repository"
+                extract_tar_file(str(source), dest, workers, ingest_filter)
+
+                assert sorted(p.relative_to(dest) for p in dest.rglob("*")) == [
+                    Path("project"),
+                    Path("project/playbook.yml"),
+                ]
+                assert ingest_filter.skipped == {
+                    "project/node_modules/a/index.js": reason_excluded,
+                    "project/big.yml": reason_too_large,
+                    "project/big-link.yml": reason_too_large,
+                }
+
+
+class TestExtractZipFile(TestCase):
+    """The TestExtractZipFile class."""
+
+    def test_extract_zip_file(self) -> None:
+        """Test that the extracted tree matches the one created by extractall."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "test.zip"
+            with zipfile.ZipFile(
+                source,
+                "w",
+                compression=zipfile.ZIP_DEFLATED,
+            ) as zip_file:
+                zip_file.writestr("project/", "")
+                zip_file.writestr("project/playbook.yml", sample_playbook)
+                zip_file.writestr("project/roles/a/tasks/main.yml", "---\n")
+                zip_file.writestr("../project/evil.yml", "---\n")
+                zip_file.writestr("/project/absolute.yml", "---\n")
+
+            expected = work_path / "expected"
+            with zipfile.ZipFile(source) as zip_file:
+                zip_file.extractall(expected)  # noqa: S202
+            actual = work_path / "actual"
+            extract_zip_file(str(source), actual)
+
+            expected_files = sorted(
+                p.relative_to(expected) for p in expected.rglob("*")
+            )
+            actual_files = sorted(p.relative_to(actual) for p in actual.rglob("*"))
+            assert actual_files == expected_files
+            for p in expected_files:
+                if (expected / p).is_file():
+                    assert (actual / p).read_bytes() == (expected / p).read_bytes()
+
+    def test_extract_zip_file_with_highly_compressed_member(self) -> None:
+        """Test that a zip bomb is rejected before anything is written."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "test.zip"
+            with zipfile.ZipFile(
+                source,
+                "w",
+                compression=zipfile.ZIP_DEFLATED,
+            ) as zip_file:
+                zip_file.writestr("a.txt", "A" * 4096)
+
+            dest = work_path / "repository"
+            with self.assertRaises(RuntimeError) as context:
+                extract_zip_file(str(source), dest)
+
+            assert (
+                context.exception.args[0]
+                == "ratio between compressed and uncompressed data is highly suspicious, looks like a Zip Bomb Attack"
+            )
+            assert not dest.exists()
+
+    def test_extract_zip_file_in_parallel(self) -> None:
+        """Test that parallel extraction creates the same tree as extractall."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "test.zip"
+            with zipfile.ZipFile(source, "w") as zip_file:
+                for i in range(50):
+                    zip_file.writestr(
+                        f"project/roles/r{i % 5}/tasks/{i}.yml",
+                        "---\n" * i,
+                    )
+
+            expected = work_path / "expected"
+            with zipfile.ZipFile(source) as zip_file:
+                zip_file.extractall(expected)  # noqa: S202
+            actual = work_path / "actual"
+            extract_zip_file(str(source), actual, 4)
+
+            _assert_same_tree(expected, actual)
+
+    def test_extract_zip_file_with_ingest_filter(self) -> None:
+        """Test that skipped members are not checked against the ratio limit."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "test.zip"
+            with zipfile.ZipFile(
+                source,
+                "w",
+                compression=zipfile.ZIP_DEFLATED,
+            ) as zip_file:
+                zip_file.writestr("project/playbook.yml", sample_playbook)
+                zip_file.writestr("project/.git/", "")
+                zip_file.writestr("project/.git/objects/pack.pack", "A" * 4096)
+
+            ingest_filter = IngestionFilter(exclude=[".git"])
+            dest = work_path / "repository"
+            extract_zip_file(str(source), dest, ingest_filter=ingest_filter)
+
+            assert sorted(p.relative_to(dest) for p in dest.rglob("*")) == [
+                Path("project"),
+                Path("project/playbook.yml"),
+            ]
+            assert ingest_filter.skipped == {
+                "project/.git": reason_excluded,
+                "project/.git/objects/pack.pack": reason_excluded,
+            }
+
+
+class TestExtractStream(TestCase):
+    """The TestExtractStream class."""
+
+    def test_extract_stream(self) -> None:
+        """Test that tar and zip archives read from a stream are extracted."""
+        modes: list[Literal["w", "w:gz", "w:bz2", "w:xz", "zip"]] = [
+            "w",
+            "w:gz",
+            "w:bz2",
+            "w:xz",
+            "zip",
+        ]
+        for mode in modes:
+            with temp_dir() as work:
+                work_path = Path(work.name)
+                source = work_path / "test"
+                if mode == "zip":
+                    with zipfile.ZipFile(source, "w") as zip_file:
+                        zip_file.writestr("project/playbook.yml", sample_playbook)
+                else:
+                    with tarfile.open(source, mode) as tar:
+                        _add_file(tar, "project/playbook.yml", sample_playbook.encode())
+
+                dest = work_path / "repository"
+                with source.open("rb") as f:
+                    extract_stream(f, dest)
+                assert (
+                    dest / "project" / "playbook.yml"
+                ).read_text() == sample_playbook
+
+    def test_extract_stream_with_invalid_data(self) -> None:
+        """Test that a stream that is neither a tar nor a zip archive is rejected."""
+        with temp_dir() as work:
+            dest = Path(work.name) / "repository"
+            with self.assertRaises(RuntimeError):
+                extract_stream(io.BytesIO(sample_playbook.encode()), dest)
+            assert not dest.exists()
+
+    def test_extract_stream_too_big(self) -> None:
+        """Test that the size limit is enforced while a tar stream is read."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            data = io.BytesIO()
+            with tarfile.open(fileobj=data, mode="w:gz") as tar:
+                _add_file(tar, "big.txt", b"A" * 4096)
+            data.seek(0)
+
+            dest = work_path / "repository"
+            with (
+                patch("ansible_content_parser.safe_checks.threshold_size", 1024),
+                self.assertRaises(RuntimeError),
+            ):
+                extract_stream(data, dest)
+            assert not dest.exists()
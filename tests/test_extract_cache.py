@@ -0,0 +1,136 @@
+"""Test extract_cache.py."""
+
+import contextlib
+import io
+import shutil
+import tarfile
+
+from collections.abc import Callable, Generator
+from functools import partial
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from ansible_content_parser.cache import exclusive_lock
+from ansible_content_parser.extract import extract_tar_file
+from ansible_content_parser.extract_cache import extract_with_cache, get_cache_key
+from ansible_content_parser.ingest_filter import IngestionFilter, reason_excluded
+
+from .test_main import sample_playbook, temp_dir
+
+
+def _create_tar_file(source: Path) -> None:
+    with tarfile.open(source, "w:gz") as tar:
+        for name, data in [
+            ("project/playbook.yml", sample_playbook.encode()),
+            ("project/logo.png", b"\x89PNG"),
+        ]:
+            tarinfo = tarfile.TarInfo(name)
+            tarinfo.size = len(data)
+            tar.addfile(tarinfo, io.BytesIO(data))
+
+
+class TestExtractCache(TestCase):
+    """The TestExtractCache class."""
+
+    def test_extract_with_cache(self) -> None:
+        """Test that an archive is extracted only once."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "test.tar.gz"
+            _create_tar_file(source)
+            cache_dir = work_path / "cache"
+
+            ingest_filter = IngestionFilter(exclude=["*.png"])
+            dest = work_path / "repository"
+            extract_with_cache(
+                str(source),
+                dest,
+                partial(extract_tar_file, ingest_filter=ingest_filter),
+                cache_dir,
+                1024 * 1024,
+                ingest_filter=ingest_filter,
+            )
+            assert (dest / "project" / "playbook.yml").read_text() == sample_playbook
+            assert not (dest / "project" / "logo.png").exists()
+
+            extract = MagicMock()
+            ingest_filter = IngestionFilter(exclude=["*.png"])
+            dest2 = work_path / "repository2"
+            extract_with_cache(
+                str(source),
+                dest2,
+                extract,
+                cache_dir,
+                1024 * 1024,
+                ingest_filter=ingest_filter,
+            )
+            extract.assert_not_called()
+            assert (dest2 / "project" / "playbook.yml").read_text() == sample_playbook
+            assert ingest_filter.skipped == {"project/logo.png": reason_excluded}
+
+    def test_extract_with_cache_with_failure(self) -> None:
+        """Test that no entry is left behind when the extraction fails."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "test.tar.gz"
+            _create_tar_file(source)
+            cache_dir = work_path / "cache"
+
+            with (
+                patch("ansible_content_parser.safe_checks.threshold_entries", 1),
+                self.assertRaises(RuntimeError),
+            ):
+                extract_with_cache(
+                    str(source),
+                    work_path / "repository",
+                    extract_tar_file,
+                    cache_dir,
+                    1024 * 1024,
+                )
+            assert not any(p.is_dir() for p in cache_dir.iterdir())
+
+    def test_extract_with_cache_with_entry_evicted(self) -> None:
+        """Test that an entry evicted while its lock is downgraded is extracted again."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "test.tar.gz"
+            _create_tar_file(source)
+            cache_dir = work_path / "cache"
+            extract = MagicMock(side_effect=extract_tar_file)
+            downgrades: list[Path] = []
+
+            @contextlib.contextmanager
+            def evicting_lock(path: Path) -> Generator[Callable[[], None], None, None]:
+                with exclusive_lock(path) as downgrade:
+
+                    def evict_and_downgrade() -> None:
+                        # Another process evicts the entry on the first conversion.
+                        if not downgrades:
+                            shutil.rmtree(path.with_suffix(""))
+                        downgrades.append(path)
+                        downgrade()
+
+                    yield evict_and_downgrade
+
+            dest = work_path / "repository"
+            with patch(
+                "ansible_content_parser.extract_cache.exclusive_lock",
+                evicting_lock,
+            ):
+                extract_with_cache(str(source), dest, extract, cache_dir, 1024 * 1024)
+            assert len(downgrades) == 2
+            assert extract.call_count == 2
+            assert (dest / "project" / "playbook.yml").read_text() == sample_playbook
+
+    def test_get_cache_key(self) -> None:
+        """Test that the key depends on the thresholds and the ingestion filter."""
+        with temp_dir() as work:
+            source = Path(work.name) / "test.tar.gz"
+            _create_tar_file(source)
+
+            key = get_cache_key(str(source), None)
+            assert get_cache_key(str(source), None) == key
+            assert get_cache_key(str(source), IngestionFilter()) != key
+            with patch("ansible_content_parser.safe_checks.threshold_size", 1024):
+                assert get_cache_key(str(source), None) != key
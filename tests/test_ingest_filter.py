@@ -0,0 +1,86 @@
+"""Test ingest_filter.py."""
+
+import shutil
+
+from pathlib import Path
+from unittest import TestCase
+
+from ansible_content_parser.ingest_filter import (
+    IngestionFilter,
+    default_exclude_patterns,
+    load_summary,
+    match_path,
+    reason_excluded,
+    reason_not_included,
+    reason_too_large,
+)
+
+from .test_main import sample_playbook, temp_dir
+
+
+class TestIngestFilter(TestCase):
+    """The TestIngestFilter class."""
+
+    def test_match_path(self) -> None:
+        """Test patterns with and without a slash."""
+        assert match_path("a/node_modules/b.js", "node_modules")
+        assert match_path("docs/images/logo.png", "*.png")
+        assert match_path("docs/build/html/index.yml", "docs/build")
+        assert match_path("docs/build/html/index.yml", "docs/build/")
+        assert not match_path("src/docs/build/index.yml", "docs/build")
+        assert not match_path("roles/a/tasks/main.yml", "*.png")
+
+    def test_get_reason(self) -> None:
+        """Test the reasons why files are skipped."""
+        ingest_filter = IngestionFilter(
+            include=["*.yml", "roles"],
+            exclude=default_exclude_patterns,
+            max_file_size=1024,
+        )
+        assert ingest_filter.get_reason("playbook.yml", 100) == ""
+        assert ingest_filter.get_reason("roles/a/files/script.sh", 100) == ""
+        assert ingest_filter.get_reason(".git/config", 100) == reason_excluded
+        assert ingest_filter.get_reason("README.md", 100) == reason_not_included
+        assert ingest_filter.get_reason("vars/big.yml", 2048) == reason_too_large
+        assert ingest_filter.accept_directory("roles")
+        assert not ingest_filter.accept_directory("roles/a/node_modules")
+
+    def test_copytree_with_ignore_function(self) -> None:
+        """Test that skipped files are not copied and are recorded in the summary."""
+        with temp_dir() as work:
+            source = Path(work.name) / "source"
+            (source / "node_modules" / "a").mkdir(parents=True)
+            (source / "node_modules" / "a" / "index.js").write_text("")
+            (source / "docs").mkdir()
+            (source / "docs" / "logo.png").write_bytes(b"\x89PNG")
+            (source / "playbook.yml").write_text(sample_playbook)
+            (source / "big.yml").write_text("#" * 2048)
+
+            ingest_filter = IngestionFilter(
+                exclude=default_exclude_patterns,
+                max_file_size=1024,
+            )
+            dest = Path(work.name) / "repository"
+            shutil.copytree(
+                source,
+                dest,
+                ignore=ingest_filter.get_ignore_function(str(source)),
+            )
+
+            assert sorted(str(p.relative_to(dest)) for p in dest.rglob("*")) == [
+                "docs",
+                "playbook.yml",
+            ]
+            assert ingest_filter.skipped == {
+                "big.yml": reason_too_large,
+                "docs/logo.png": reason_excluded,
+                "node_modules": reason_excluded,
+            }
+
+            metadata_path = Path(work.name) / "metadata"
+            metadata_path.mkdir()
+            ingest_filter.write_summary(metadata_path)
+            assert load_summary(metadata_path) == {
+                reason_excluded: 2,
+                reason_too_large: 1,
+            }
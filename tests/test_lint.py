@@ -0,0 +1,132 @@
+"""Test lint.py."""
+
+import os
+
+from pathlib import Path
+from unittest import TestCase
+
+from ansible_content_parser.lint import FailFast, LintEngine
+from ansiblelint.config import options
+from ansiblelint.constants import RC
+
+from .test_main import (
+    dot_ansible_lint,
+    dot_ansible_lint_name,
+    sample_playbook,
+    sample_playbook_name,
+    temp_dir,
+)
+
+
+def _lint(
+    engine: LintEngine,
+    repository: Path,
+    fail_fast: FailFast | None = None,
+    args: tuple[str, ...] = (),
+) -> set[str]:
+    previous_dir = Path.cwd()
+    os.chdir(repository)
+    try:
+        lint_options = engine.get_options(["--offline", *args, sample_playbook_name])
+        result, _, return_code = engine.lint(
+            lint_options.lintables,
+            lint_options,
+            fail_fast=fail_fast,
+        )
+    finally:
+        os.chdir(previous_dir)
+    if fail_fast and fail_fast.match:
+        assert return_code == RC.VIOLATIONS_FOUND
+    return {match.tag for match in result.matches}
+
+
+class TestLint(TestCase):
+    """The TestLint class."""
+
+    def test_lint_engine(self) -> None:
+        """Test that runs of an engine do not affect each other."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            basic = work_path / "basic"
+            basic.mkdir()
+            (basic / sample_playbook_name).write_text(sample_playbook)
+            (basic / dot_ansible_lint_name).write_text(dot_ansible_lint)
+            default = work_path / "default"
+            default.mkdir()
+            (default / sample_playbook_name).write_text(sample_playbook)
+
+            saved_options = vars(options).copy()
+            engine = LintEngine()
+            basic_tags = _lint(engine, basic)
+            default_tags = _lint(engine, default)
+            # fqcn is not a rule of the basic profile, and all rules are run by default.
+            assert "fqcn[action-core]" in default_tags
+            assert "fqcn[action-core]" not in basic_tags
+            assert _lint(engine, basic) == basic_tags
+            assert _lint(engine, default) == default_tags
+            assert len(engine._rules) == 2  # noqa: SLF001
+            assert vars(options) == saved_options
+
+    def test_lint_engine_with_yamllint_config(self) -> None:
+        """Test that the yamllint configuration of a repository is not used for others."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            playbook = sample_playbook.replace(
+                "  hosts: web\n",
+                f"  hosts: web  # {'x' * 200}\n",
+                1,
+            )
+            relaxed = work_path / "relaxed"
+            relaxed.mkdir()
+            (relaxed / sample_playbook_name).write_text(playbook)
+            (relaxed / ".yamllint").write_text(
+                "extends: default\nrules:\n  line-length: disable\n",
+            )
+            default = work_path / "default"
+            default.mkdir()
+            (default / sample_playbook_name).write_text(playbook)
+
+            engine = LintEngine()
+            assert "yaml[line-length]" not in _lint(engine, relaxed)
+            assert "yaml[line-length]" in _lint(engine, default)
+            assert "yaml[line-length]" not in _lint(engine, relaxed)
+
+    def test_lint_engine_with_fail_fast(self) -> None:
+        """Test that linting stops at the first match that is not fixed."""
+        with temp_dir() as work:
+            repository = Path(work.name)
+            (repository / sample_playbook_name).write_text(sample_playbook)
+            engine = LintEngine()
+            all_tags = _lint(engine, repository)
+
+            fail_fast = FailFast()
+            tags = _lint(engine, repository, fail_fast, ("--fix=all",))
+            assert fail_fast.match
+            assert tags == {fail_fast.match.tag}
+            assert tags < all_tags
+            # fqcn is fixed by autofix.
+            assert not fail_fast.match.tag.startswith("fqcn")
+            assert (repository / sample_playbook_name).read_text() == sample_playbook
+
+            fail_fast = FailFast()
+            assert _lint(engine, repository, fail_fast, ("--fix=none",)) < all_tags
+
+    def test_lint_engine_with_stop_file(self) -> None:
+        """Test that runs sharing a stop file stop when one of them stops."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            repository = work_path / "repository"
+            repository.mkdir()
+            (repository / sample_playbook_name).write_text(sample_playbook)
+            stop_file = work_path / "stop"
+            engine = LintEngine()
+
+            fail_fast = FailFast(stop_file=str(stop_file))
+            assert _lint(engine, repository, fail_fast, ("--fix=none",))
+            assert stop_file.exists()
+
+            # Another run sharing the stop file lints no files and performs no autofix.
+            fail_fast = FailFast(stop_file=str(stop_file))
+            assert not _lint(engine, repository, fail_fast, ("--fix=all",))
+            assert not fail_fast.match
+            assert (repository / sample_playbook_name).read_text() == sample_playbook
@@ -0,0 +1,102 @@
+"""Test lint_budget.py."""
+
+import json
+import sys
+import time
+
+from pathlib import Path
+from typing import Any
+from unittest import TestCase
+from unittest.mock import patch
+
+from ansible_content_parser.__main__ import main
+from ansible_content_parser.lint_budget import TimeBudget, Watchdog
+from ansiblelint.rules import RulesCollection
+
+from .test_main import (
+    dot_ansible_lint,
+    dot_ansible_lint_name,
+    sample_playbook,
+    sample_playbook2,
+    sample_playbook2_name,
+    sample_playbook_name,
+    temp_dir,
+)
+
+
+def _sleep(seconds: float) -> str:
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        time.sleep(0.01)
+    return "done"
+
+
+class TestLintBudget(TestCase):
+    """The TestLintBudget class."""
+
+    def test_watchdog(self) -> None:
+        """Test that files over the budget are interrupted and recorded."""
+        watchdog = Watchdog(TimeBudget(file_seconds=0.5), interval=0.05)
+        with watchdog.watching():
+            start = time.monotonic()
+            assert watchdog.call("slow.yml", "", _sleep, 30) == ""
+            assert time.monotonic() - start < 5
+            assert watchdog.call("fast.yml", "", _sleep, 0) == "done"
+            # The time spent on a file is added up over calls.
+            assert watchdog.measure("twice.yml", _sleep, 0.3) == "done"
+            assert watchdog.call("twice.yml", "", _sleep, 0.3) == ""
+        assert set(watchdog.exceeded) == {"slow.yml", "twice.yml"}
+        assert watchdog.exceeded["slow.yml"] >= 0.5
+
+    def test_watchdog_with_deadline(self) -> None:
+        """Test that no files are linted after the deadline of a run."""
+        budget = TimeBudget(run_seconds=0.5).start()
+        watchdog = Watchdog(budget, interval=0.05)
+        with watchdog.watching():
+            assert watchdog.call("a.yml", "", _sleep, 0) == "done"
+            assert watchdog.call("b.yml", "", _sleep, 30) == ""
+            assert watchdog.call("c.yml", "", _sleep, 0) == ""
+        assert watchdog.exceeded["c.yml"] == 0.0
+        assert set(watchdog.exceeded) == {"b.yml", "c.yml"}
+
+    def test_cli_with_lint_file_time_budget(self) -> None:
+        """Test that files over the time budget are excluded and reported."""
+        original_run = RulesCollection.run
+
+        def run(self: RulesCollection, file: Any, *args: Any) -> Any:
+            if file.name == sample_playbook2_name:
+                _sleep(30)
+            return original_run(self, file, *args)
+
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "source"
+            source.mkdir()
+            (source / sample_playbook_name).write_text(sample_playbook)
+            (source / sample_playbook2_name).write_text(sample_playbook2)
+            (source / dot_ansible_lint_name).write_text(dot_ansible_lint)
+            output = work_path / "output"
+            testargs = [
+                "ansible-content-parser",
+                "--lint-file-time-budget",
+                "2",
+                str(source),
+                str(output),
+            ]
+            with (
+                patch.object(sys, "argv", testargs),
+                patch.object(RulesCollection, "run", run),
+                self.assertRaises(SystemExit) as context,
+            ):
+                main()
+
+            assert context.exception.code == 0
+            with (output / "metadata" / "lint-result.json").open() as f:
+                assert list(json.load(f)["over_budget"]) == [sample_playbook2_name]
+            with (output / "metadata" / "lint-result-2.json").open() as f:
+                assert json.load(f)["excluded"] == [sample_playbook2_name]
+            with (output / "metadata" / "excluded-files.json").open() as f:
+                assert sample_playbook2_name in json.load(f)
+            report = (output / "report.txt").read_text()
+            assert "[ Files excluded due to the time budget of ansible-lint ]" in report
+            assert sample_playbook2_name in report
@@ -0,0 +1,122 @@
+"""Test lint_cache.py."""
+
+import json
+import os
+import sys
+
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from ansible_content_parser.__main__ import main
+from ansible_content_parser.lint_cache import LintCache
+
+from .test_main import (
+    dot_ansible_lint,
+    dot_ansible_lint_name,
+    sample_playbook,
+    sample_playbook_name,
+    temp_dir,
+)
+
+
+def _run(source: str, output: str, cache_dir: str) -> list[dict[str, str]]:
+    testargs = [
+        "ansible-content-parser",
+        "--lint-cache",
+        cache_dir,
+        source,
+        output,
+    ]
+    with patch.object(sys, "argv", testargs), TestCase().assertRaises(SystemExit):
+        main()
+    with (Path(output) / "metadata" / "sarif.json").open() as f:
+        return [
+            {
+                "ruleId": result["ruleId"],
+                "message": result["message"]["text"],
+                "uri": result["locations"][0]["physicalLocation"]["artifactLocation"][
+                    "uri"
+                ],
+            }
+            for result in json.load(f)["runs"][0]["results"]
+        ]
+
+
+class TestLintCache(TestCase):
+    """The TestLintCache class."""
+
+    def test_cli_with_lint_cache(self) -> None:
+        """Test that matches found in unchanged files are reused."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "source"
+            source.mkdir()
+            (source / sample_playbook_name).write_text(sample_playbook)
+            (source / dot_ansible_lint_name).write_text(dot_ansible_lint)
+            cache_dir = str(work_path / "cache")
+
+            results = _run(str(source), str(work_path / "output1"), cache_dir)
+            assert results
+            assert any(work_path.joinpath("cache").rglob("*.json"))
+
+            with (
+                patch.object(LintCache, "save") as mock_save,
+                patch.object(
+                    LintCache,
+                    "load",
+                    autospec=True,
+                    side_effect=LintCache.load,
+                ) as mock_load,
+            ):
+                assert (
+                    _run(str(source), str(work_path / "output2"), cache_dir) == results
+                )
+            mock_save.assert_not_called()
+            assert mock_load.call_count > 0
+
+            # A modified file is linted again.
+            (source / sample_playbook_name).write_text(
+                sample_playbook.replace("yum:", "ansible.builtin.yum:"),
+            )
+            with patch.object(LintCache, "save") as mock_save:
+                _run(str(source), str(work_path / "output3"), cache_dir)
+            mock_save.assert_called_once()
+
+    def test_cli_with_yamllint_config_changed(self) -> None:
+        """Test that files are linted again when the yamllint configuration changes."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "source"
+            source.mkdir()
+            (source / sample_playbook_name).write_text(sample_playbook)
+            (source / dot_ansible_lint_name).write_text(dot_ansible_lint)
+            (source / ".yamllint").write_text("extends: default\n")
+            cache_dir = str(work_path / "cache")
+
+            _run(str(source), str(work_path / "output1"), cache_dir)
+
+            (source / ".yamllint").write_text(
+                "extends: default\nrules:\n  line-length: disable\n",
+            )
+            with patch.object(LintCache, "save") as mock_save:
+                _run(str(source), str(work_path / "output2"), cache_dir)
+            saved = {call.args[1].name for call in mock_save.call_args_list}
+            assert sample_playbook_name in saved
+
+    def test_evict_least_recently_used(self) -> None:
+        """Test that least recently used entries are evicted."""
+        with temp_dir() as work:
+            cache_dir = Path(work.name) / "cache"
+            lint_cache = LintCache(cache_dir, 250, "")
+            for i, key in enumerate(["aa01", "bb02", "cc03"]):
+                path = lint_cache.get_entry_path(key)
+                path.parent.mkdir(parents=True)
+                path.write_text("[]" + " " * 98)
+                os.utime(path, (1000 + i, 1000 + i))
+
+            lint_cache.evict_least_recently_used()
+
+            assert not lint_cache.get_entry_path("aa01").exists()
+            assert lint_cache.get_entry_path("bb02").exists()
+            assert lint_cache.get_entry_path("cc03").exists()
@@ -0,0 +1,121 @@
+"""Test lint_timings.py."""
+
+import json
+import sys
+
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from ansible_content_parser.__main__ import main
+from ansible_content_parser.lint_timings import LintTimings, merge_timings
+
+from .test_main import (
+    dot_ansible_lint,
+    dot_ansible_lint_name,
+    sample_playbook,
+    sample_playbook_name,
+    temp_dir,
+)
+
+
+class TestLintTimings(TestCase):
+    """The TestLintTimings class."""
+
+    def test_measure(self) -> None:
+        """Test that the time spent in contexts is added up."""
+        timings = LintTimings()
+        with timings.measure("rules", file="a.yml"):
+            with timings.measure(rule="name"):
+                pass
+            with timings.measure(rule="name"):
+                pass
+        with timings.measure("render"):
+            pass
+        t = timings.to_dict()
+        assert set(t["phases"]) == {"rules", "render"}
+        assert list(t["rules"]) == ["name"]
+        assert list(t["files"]) == ["a.yml"]
+        assert t["files"]["a.yml"] >= t["rules"]["name"]
+
+    def test_merge_timings(self) -> None:
+        """Test that timings are added up and sorted by time."""
+        merged = merge_timings(
+            [
+                {"phases": {"rules": 1.0}, "files": {"a.yml": 0.5, "b.yml": 0.25}},
+                {"phases": {"rules": 2.0, "render": 0.1}, "files": {"b.yml": 0.5}},
+            ],
+        )
+        assert merged == {
+            "phases": {"rules": 3.0, "render": 0.1},
+            "rules": {},
+            "files": {"b.yml": 0.75, "a.yml": 0.5},
+        }
+        assert list(merged["files"]) == ["b.yml", "a.yml"]
+
+    def test_cli_with_lint_timings(self) -> None:
+        """Test that timings are written to metadata and summarized in the report."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "source"
+            source.mkdir()
+            (source / sample_playbook_name).write_text(sample_playbook)
+            (source / dot_ansible_lint_name).write_text(dot_ansible_lint)
+            output = work_path / "output"
+            testargs = [
+                "ansible-content-parser",
+                "--lint-timings",
+                str(source),
+                str(output),
+            ]
+            with (
+                patch.object(sys, "argv", testargs),
+                self.assertRaises(SystemExit) as context,
+            ):
+                main()
+
+            assert context.exception.code == 0
+            metadata = output / "metadata"
+            with (metadata / "lint-timings.json").open() as f:
+                timings = json.load(f)
+            assert {"discovery", "syntax-check", "rules", "render"} <= set(
+                timings["phases"],
+            )
+            assert "name" in timings["rules"]
+            assert sample_playbook_name in timings["files"]
+            with (metadata / "lint-result.json").open() as f:
+                assert "timings" not in json.load(f)
+            report = (output / "report.txt").read_text()
+            assert "[ Time spent by ansible-lint ]" in report
+            assert "- Top 10 rules" in report
+
+    def test_cli_with_lint_timings_and_lint_cache(self) -> None:
+        """Test that the rules are not timed on files found in the lint cache."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "source"
+            source.mkdir()
+            (source / sample_playbook_name).write_text(sample_playbook)
+            (source / dot_ansible_lint_name).write_text(dot_ansible_lint)
+            for output in ["output1", "output2"]:
+                testargs = [
+                    "ansible-content-parser",
+                    "--lint-timings",
+                    "--lint-cache",
+                    str(work_path / "cache"),
+                    str(source),
+                    str(work_path / output),
+                ]
+                with (
+                    patch.object(sys, "argv", testargs),
+                    self.assertRaises(SystemExit) as context,
+                ):
+                    main()
+                assert context.exception.code == 0
+
+            with (work_path / "output1" / "metadata" / "lint-timings.json").open() as f:
+                assert json.load(f)["rules"]
+            with (work_path / "output2" / "metadata" / "lint-timings.json").open() as f:
+                timings = json.load(f)
+            assert timings["rules"] == {}
+            assert "rules" not in timings["phases"]
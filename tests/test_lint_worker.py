@@ -0,0 +1,141 @@
+"""Test lint_worker.py."""
+
+import contextlib
+import json
+import os
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from unittest import TestCase
+
+from ansible_content_parser.lint_worker import (
+    LintWorker,
+    get_executor,
+    run_with_executor,
+)
+
+from .test_main import (
+    sample_playbook,
+    sample_playbook4,
+    sample_playbook4_name,
+    sample_playbook_name,
+    temp_dir,
+)
+
+
+def _get_uris(sarif_file: Path) -> set[str]:
+    with sarif_file.open() as f:
+        return {
+            location["physicalLocation"]["artifactLocation"]["uri"]
+            for run in json.load(f)["runs"]
+            for result in run["results"]
+            for location in result["locations"]
+        }
+
+
+def _lint(
+    repository: Path,
+    *,
+    in_process: bool = False,
+) -> tuple[set[str], set[str], set[str]]:
+    """Lint a repository twice as the CLI does.
+
+    The files of the first run and the URIs of the results of both runs are returned.
+    """
+    sarif_file = repository.parent / f"{repository.name}-sarif.json"
+    sarif_file2 = repository.parent / f"{repository.name}-sarif-2.json"
+    worker = LintWorker(str(repository), in_process=in_process)
+    with contextlib.closing(worker):
+        result, _ = worker.run(["ansible-lint", "--sarif-file", str(sarif_file)])
+        worker.rerun(
+            [
+                "ansible-lint",
+                "--sarif-file",
+                str(sarif_file2),
+                "--exclude",
+                sample_playbook4_name,
+            ],
+            [sample_playbook4_name],
+        )
+    files = {f["filename"] for f in result["files"]}
+    return files, _get_uris(sarif_file), _get_uris(sarif_file2)
+
+
+def _create_repository(path: Path, name: str) -> Path:
+    repository = path / name
+    repository.mkdir()
+    (repository / f"{name}-{sample_playbook_name}").write_text(sample_playbook)
+    (repository / sample_playbook4_name).write_text(sample_playbook4)
+    return repository
+
+
+class TestLintWorker(TestCase):
+    """The TestLintWorker class."""
+
+    def test_concurrent_runs(self) -> None:
+        """Test that repositories are linted concurrently in the shared worker process."""
+        with temp_dir() as work:
+            repositories = [
+                _create_repository(Path(work.name), name) for name in ["a", "b"]
+            ]
+
+            cwd = Path.cwd()
+            pid = get_executor().submit(os.getpid).result()
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                results = list(executor.map(_lint, repositories))
+
+            # The working directory is changed in the worker process only, and the
+            # worker process is kept for other repositories.
+            assert Path.cwd() == cwd
+            assert get_executor().submit(os.getpid).result() == pid
+            for name, other, (files, uris, uris2) in zip(
+                ["a", "b"],
+                ["b", "a"],
+                results,
+                strict=True,
+            ):
+                playbook_name = f"{name}-{sample_playbook_name}"
+                other_playbook_name = f"{other}-{sample_playbook_name}"
+                assert {playbook_name, sample_playbook4_name} <= files
+                assert {playbook_name, sample_playbook4_name} <= uris
+                assert other_playbook_name not in files | uris
+                # The results of the playbook are carried over from the first run of
+                # the same repository.
+                assert playbook_name in uris2
+                assert sample_playbook4_name not in uris2
+                assert other_playbook_name not in uris2
+
+    def test_in_process(self) -> None:
+        """Test that the working directory is restored after runs in the process."""
+        with temp_dir() as work:
+            repository = _create_repository(Path(work.name), "a")
+            playbook_name = f"a-{sample_playbook_name}"
+
+            cwd = Path.cwd()
+            files, uris, uris2 = _lint(repository, in_process=True)
+
+            assert Path.cwd() == cwd
+            assert {playbook_name, sample_playbook4_name} <= files
+            assert {playbook_name, sample_playbook4_name} <= uris
+            assert playbook_name in uris2
+            assert sample_playbook4_name not in uris2
+
+    def test_broken_pool(self) -> None:
+        """Test that a pool broken by a dead worker process is replaced."""
+        executors: list[ProcessPoolExecutor] = []
+
+        def run(executor: ProcessPoolExecutor) -> int:
+            executors.append(executor)
+            if len(executors) == 1:
+                # The worker process dies while running the task.
+                executor.submit(os._exit, 1).result()
+            return executor.submit(os.getpid).result()
+
+        # Worker processes are started in the working directory.
+        with temp_dir():
+            pid = run_with_executor(2, run)
+
+            assert len(executors) == 2
+            assert executors[0] is not executors[1]
+            assert get_executor(2) is executors[1]
+            assert pid != os.getpid()
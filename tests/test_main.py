@@ -2,6 +2,7 @@
 
 import argparse
 import contextlib
+import io
 import json
 import os
 import sys
@@ -24,6 +25,7 @@ from ansible_content_parser.__main__ import (
     main,
     update_argv,
 )
+from ansiblelint.runner import Runner
 
 
 sample_playbook = """---
@@ -124,6 +126,22 @@ sample_playbook3 = """---
         assign_public_ip: yes
 """
 
+# A playbook that fails the syntax check because of a missing file
+sample_playbook4 = """---
+- name: Missing file
+  hosts: all
+  tasks:
+    - name: Import missing tasks
+      ansible.builtin.import_tasks: tasks/missing.yml
+    - name: Include tasks
+      ansible.builtin.include_tasks: extra/included.yml
+"""
+
+included_tasks = """---
+- name: Included task
+  ansible.builtin.shell: echo hi
+"""
+
 dot_ansible_lint = """---
 # .ansible-lint
 profile: basic
@@ -133,6 +151,8 @@ verbosity: 1
 sample_playbook_name = "playbook.yml"
 sample_playbook2_name = "transform-no-jinja-when.yml"
 sample_playbook3_name = "ec2-sample.yml"
+sample_playbook4_name = "missing-file.yml"
+included_tasks_name = "extra/included.yml"
 galaxy_yml_name = "galaxy.yml"
 dot_ansible_lint_name = ".ansible-lint"
 repo_name = "repo_name"
@@ -227,6 +247,10 @@ class TestMain(TestCase):
                 assert context.exception.code == 0, "The exit code should be 0"
                 assert os.environ["ANSIBLE_LINT_NODEPS"] == "1"
 
+                report = (Path(output.name) / "report.txt").read_text()
+                # No files are skipped at ingestion.
+                assert "[ Files skipped at ingestion ]" not in report
+
                 found_file_counts_section = False
                 with (Path(output.name) / "report.txt").open("r") as f:
                     for line in f:
@@ -253,6 +277,224 @@ class TestMain(TestCase):
                             line = f.readline()
                             assert line == "---------------------\n"
 
+    def test_cli_with_local_directory_with_syntax_check_errors(self) -> None:
+        """Run the CLI with a local directory that contains syntax-check errors."""
+        with temp_dir() as source:
+            self._create_repo(source)
+            (Path(source.name) / sample_playbook4_name).write_text(sample_playbook4)
+            (Path(source.name) / included_tasks_name).parent.mkdir()
+            (Path(source.name) / included_tasks_name).write_text(included_tasks)
+            with temp_dir() as output:
+                testargs = [
+                    "ansible-content-parser",
+                    source.name,
+                    output.name,
+                ]
+                with (
+                    patch.object(sys, "argv", testargs),
+                    patch(
+                        "ansiblelint.runner.Runner._get_ansible_syntax_check_matches",
+                        autospec=True,
+                        side_effect=Runner._get_ansible_syntax_check_matches,  # noqa: SLF001
+                    ) as mock_syntax_check,
+                    self.assertRaises(
+                        SystemExit,
+                    ) as context,
+                ):
+                    main()
+
+                assert context.exception.code == 0, "The exit code should be 0"
+                # The syntax check is executed on the first run only.
+                assert mock_syntax_check.call_count == 2
+
+                metadata_path = Path(output.name) / "metadata"
+                with (metadata_path / "lint-result.json").open() as f:
+                    files = {(f["filename"], f["kind"]) for f in json.load(f)["files"]}
+                assert ("tasks/missing.yml", "tasks") in files
+                assert (included_tasks_name, "tasks") in files
+
+                with (metadata_path / "lint-result-2.json").open() as f:
+                    lint_result_2 = json.load(f)
+                assert lint_result_2["excluded"] == [sample_playbook4_name]
+                files = {(f["filename"], f["kind"]) for f in lint_result_2["files"]}
+                assert files == {
+                    (sample_playbook_name, "playbook"),
+                    (galaxy_yml_name, "galaxy"),
+                    (dot_ansible_lint_name, "ansible-lint-config"),
+                    (included_tasks_name, "yaml"),
+                }
+                assert all(
+                    f["updated"]
+                    for f in lint_result_2["files"]
+                    if f["kind"] == "playbook"
+                )
+
+                # The excluded file is skipped by the pipeline without being renamed.
+                with (metadata_path / "excluded-files.json").open() as f:
+                    assert sample_playbook4_name in json.load(f)
+                repository_path = Path(output.name) / "repository"
+                assert (repository_path / sample_playbook4_name).exists()
+                with (metadata_path / "sage-objects.json").open() as f:
+                    assert all(
+                        json.loads(line).get("filepath") != sample_playbook4_name
+                        for line in f
+                    )
+
+                with (Path(output.name) / "report.json").open() as f:
+                    report = json.load(f)
+                assert report["file_types"]["playbook"] == 2
+                file_states = dict(
+                    zip(
+                        report["files"]["path"],
+                        report["files"]["state"],
+                        strict=True,
+                    ),
+                )
+                assert file_states[sample_playbook4_name] == "excluded"
+                assert file_states[galaxy_yml_name] == "autofixed"
+                assert sample_playbook4_name in report["excluded"]
+                assert report["excluded_from_second_run"] == [sample_playbook4_name]
+                assert len(report["issues"]) == 2
+                assert "syntax-check[missing-file]" in report["issues"][0]["error"]
+                assert report["modules"]
+
+    def test_cli_with_syntax_check_prepass(self) -> None:
+        """Test that the syntax check prepass produces the same results as two runs."""
+        with temp_dir() as source:
+            self._create_repo(source)
+            (Path(source.name) / sample_playbook4_name).write_text(sample_playbook4)
+            (Path(source.name) / included_tasks_name).parent.mkdir()
+            (Path(source.name) / included_tasks_name).write_text(included_tasks)
+            results = []
+            for options in [[], ["--syntax-check-prepass"]]:
+                with temp_dir() as output:
+                    testargs = [
+                        "ansible-content-parser",
+                        *options,
+                        source.name,
+                        output.name,
+                    ]
+                    with (
+                        patch.object(sys, "argv", testargs),
+                        patch(
+                            "ansiblelint.runner.Runner._get_ansible_syntax_check_matches",
+                            autospec=True,
+                            side_effect=Runner._get_ansible_syntax_check_matches,  # noqa: SLF001
+                        ) as mock_syntax_check,
+                        self.assertRaises(
+                            SystemExit,
+                        ),
+                    ):
+                        main()
+
+                    # The syntax check is not executed again by the full run.
+                    assert mock_syntax_check.call_count == 2
+
+                    metadata_path = Path(output.name) / "metadata"
+                    with (metadata_path / "sarif.json").open() as f:
+                        rule_ids = {
+                            r["ruleId"] for r in json.load(f)["runs"][0]["results"]
+                        }
+                    with (metadata_path / "sarif-2.json").open() as f:
+                        sarif_2 = json.load(f)["runs"][0]["results"]
+                    with (metadata_path / "lint-result-2.json").open() as f:
+                        lint_result_2 = json.load(f)
+                    repository_path = Path(output.name) / "repository"
+                    results.append(
+                        (
+                            sarif_2,
+                            lint_result_2["excluded"],
+                            sorted(
+                                (f["filename"], f["kind"], f["updated"])
+                                for f in lint_result_2["files"]
+                            ),
+                            {
+                                str(p.relative_to(repository_path)): p.read_text()
+                                for p in sorted(repository_path.rglob("*.yml*"))
+                            },
+                        ),
+                    )
+
+            # The first run of the prepass does not run other rules.
+            assert rule_ids == {
+                "syntax-check[missing-file]",
+                "load-failure[filenotfounderror]",
+            }
+            assert results[0] == results[1]
+            assert results[1][1] == [sample_playbook4_name]
+
+    def test_cli_with_local_directory_with_link_workspace_mode(self) -> None:
+        """Run the CLI with a local directory with --workspace-mode link."""
+        with temp_dir() as source:
+            self._create_repo(source)
+            with temp_dir() as output:
+                testargs = [
+                    "ansible-content-parser",
+                    "--workspace-mode",
+                    "link",
+                    source.name,
+                    output.name,
+                ]
+                with (
+                    patch.object(sys, "argv", testargs),
+                    self.assertRaises(
+                        SystemExit,
+                    ) as context,
+                ):
+                    main()
+
+                assert context.exception.code == 0, "The exit code should be 0"
+
+                # The playbook in the repository directory is updated by autofix, but
+                # the one in the source directory is not.
+                with (Path(source.name) / sample_playbook_name).open() as f:
+                    assert f.read() == sample_playbook
+                repository_path = Path(output.name) / "repository"
+                with (repository_path / sample_playbook_name).open() as f:
+                    assert f.read() != sample_playbook
+
+    def test_cli_with_local_directory_with_ingest_filter(self) -> None:
+        """Run the CLI with a local directory that contains files to be skipped."""
+        with temp_dir() as source:
+            self._create_repo(source)
+            (Path(source.name) / "node_modules").mkdir()
+            (Path(source.name) / "node_modules" / "index.js").write_text("")
+            (Path(source.name) / "logo.png").write_bytes(b"\x89PNG")
+            # The filter is applied only with --ingest-filter or other --ingest-* options.
+            for args, skipped in [
+                ([], False),
+                (["--ingest-filter"], True),
+                (["--ingest-exclude", "*.md"], True),
+            ]:
+                with temp_dir() as output:
+                    testargs = [
+                        "ansible-content-parser",
+                        "--skip-ansible-lint",
+                        *args,
+                        source.name,
+                        output.name,
+                    ]
+                    with (
+                        patch.object(sys, "argv", testargs),
+                        self.assertRaises(
+                            SystemExit,
+                        ) as context,
+                    ):
+                        main()
+
+                    assert context.exception.code == 0, "The exit code should be 0"
+                    repository_path = Path(output.name) / "repository"
+                    assert (repository_path / sample_playbook_name).exists()
+                    assert (repository_path / "node_modules").exists() != skipped
+                    assert (repository_path / "logo.png").exists() != skipped
+
+                    with (Path(output.name) / "report.txt").open() as f:
+                        report = f.read()
+                    assert ("[ Files skipped at ingestion ]" in report) == skipped
+                    assert (
+                        "matched an exclude pattern         2\n" in report
+                    ) == skipped
+
     def test_cli_with_local_directory_with_production_profile(self) -> None:
         """Run the CLI with a local directory."""
         with temp_dir() as source:
@@ -383,6 +625,49 @@ class TestMain(TestCase):
 
                     assert context.exception.code == 1, "The exit code should be 1"
 
+    def test_cli_with_local_directory_with_fail_fast(self) -> None:
+        """Run the CLI with --fail-fast and --no-exclude."""
+        with temp_dir() as source:
+            self._create_repo(source)
+            self._add_second_playbook(source)
+            with temp_dir() as output:
+                testargs = [
+                    "ansible-content-parser",
+                    "--no-exclude",
+                    "--fail-fast",
+                    source.name,
+                    output.name,
+                ]
+                with (
+                    patch.object(sys, "argv", testargs),
+                    self.assertRaises(
+                        SystemExit,
+                    ) as context,
+                ):
+                    main()
+
+                assert context.exception.code == 1, "The exit code should be 1"
+                output_path = Path(output.name)
+                with (output_path / "metadata" / "sarif.json").open() as f:
+                    results = json.load(f)["runs"][0]["results"]
+                assert len(results) == 1
+                report = (output_path / "report.txt").read_text()
+                assert "[ ansible-lint stopped at the first error ]" in report
+                assert f"Rule ID  : {results[0]['ruleId']}" in report
+                assert "[ Issues found by ansible-lint ]" not in report
+                with (output_path / "report.json").open() as f:
+                    report_json = json.load(f)
+                assert report_json["fail_fast"]["rule"] == results[0]["ruleId"]
+                assert "issues" not in report_json
+                # Autofix is not performed.
+                repository_path = output_path / "repository"
+                for name, content in [
+                    (sample_playbook_name, sample_playbook),
+                    (sample_playbook2_name, sample_playbook2),
+                ]:
+                    assert (repository_path / name).read_text() == content
+                assert not (output_path / "ftdata.jsonl").exists()
+
     def test_cli_with_non_archive_file(self) -> None:
         """Run the CLI with specifying a non archive file as input."""
         with temp_dir() as source:
@@ -455,6 +740,33 @@ class TestMain(TestCase):
 
                     assert context.exception.code == 0, "The exit code should be 0"
 
+    def test_cli_with_tarball_from_stdin(self) -> None:
+        """Run the CLI with a tarball read from the standard input."""
+        with temp_dir() as source:
+            self._create_tarball(source, "gz")
+            with (Path(source.name) / f"{repo_name}.tar.gz").open("rb") as f:
+                stdin = io.TextIOWrapper(io.BytesIO(f.read()))
+            with temp_dir() as output:
+                testargs = [
+                    "ansible-content-parser",
+                    "--profile",
+                    "min",
+                    "--repo-name",
+                    repo_name,
+                    "-",
+                    output.name,
+                ]
+                with (
+                    patch.object(sys, "argv", testargs),
+                    patch.object(sys, "stdin", stdin),
+                    self.assertRaises(SystemExit) as context,
+                ):
+                    main()
+
+                assert context.exception.code == 0, "The exit code should be 0"
+                repository_path = Path(output.name) / "repository"
+                assert (repository_path / sample_playbook_name).exists()
+
     def test_cli_with_compressed_tarball(self) -> None:
         """Run the CLI with a tarball (.tar.gz)."""
         with temp_dir() as source:
@@ -576,7 +888,7 @@ class TestMain(TestCase):
     @patch("git.Repo.clone_from")
     def test_cli_with_git_https_url(self, mock_clone_from: MagicMock) -> None:
         """Run the CLI with a git HTTPS URL."""
-        mock_clone_from.return_value = None
+        mock_clone_from.return_value = MagicMock()
         with temp_dir() as output:
             testargs = [
                 "ansible-content-parser",
@@ -592,7 +904,7 @@ class TestMain(TestCase):
     @patch("git.Repo.clone_from")
     def test_cli_with_git_ssh_url(self, mock_clone_from: MagicMock) -> None:
         """Run the CLI with a git SSH URL."""
-        mock_clone_from.return_value = None
+        mock_clone_from.return_value = MagicMock()
         with temp_dir() as output:
             testargs = [
                 "ansible-content-parser",
@@ -0,0 +1,53 @@
+"""Test prerun_cache.py."""
+
+import os
+
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from ansible_compat.runtime import Runtime
+from ansible_content_parser.prerun_cache import PrerunCache, get_cache_key
+
+from .test_main import temp_dir
+
+
+class TestPrerunCache(TestCase):
+    """The TestPrerunCache class."""
+
+    def test_prerun_cache(self) -> None:
+        """Test that the Ansible setup is run once and reused."""
+        with temp_dir() as work:
+            cache = PrerunCache(Path(work.name))
+            with cache.using():
+                runtime = Runtime()
+            entries = [p for p in cache.cache_dir.iterdir() if p.is_dir()]
+            assert [p.name for p in entries] == [get_cache_key()]
+
+            with (
+                cache.using(),
+                patch(
+                    "ansible_compat.config.subprocess.check_output",
+                    side_effect=AssertionError,
+                ),
+                patch.object(Runtime, "run", side_effect=AssertionError),
+            ):
+                cached_runtime = Runtime()
+            assert cached_runtime.version == runtime.version
+            assert cached_runtime.config.data == runtime.config.data
+
+    def test_get_cache_key(self) -> None:
+        """Test that the key depends on the configuration of Ansible."""
+        with temp_dir() as work:
+            # ansible.cfg in the working directory is used by Ansible.
+            os.chdir(work.name)
+            try:
+                key = get_cache_key()
+                with patch.dict(os.environ, {"ANSIBLE_TIMEOUT": "99"}):
+                    assert get_cache_key() != key
+                with patch.dict(os.environ, {"UNRELATED": "1"}):
+                    assert get_cache_key() == key
+                (Path(work.name) / "ansible.cfg").write_text("[defaults]\n")
+                assert get_cache_key() != key
+            finally:
+                os.chdir(Path(__file__).parent)
@@ -0,0 +1,96 @@
+"""Test sarif_index.py."""
+
+import json
+
+from pathlib import Path
+from unittest import TestCase
+
+from ansible_content_parser.sarif_index import SarifIndex
+from sarif import loader
+from sarif.operations import summary_op
+
+from .test_main import temp_dir
+
+
+def _result(
+    rule_id: str,
+    uri: str,
+    level: str | None = None,
+    message: str = "Found",
+) -> dict[str, object]:
+    result: dict[str, object] = {
+        "ruleId": rule_id,
+        "message": {"text": message},
+        "locations": [
+            {
+                "physicalLocation": {
+                    "artifactLocation": {"uri": uri},
+                    "region": {"startLine": 1},
+                },
+            },
+        ],
+    }
+    if level:
+        result["level"] = level
+    return result
+
+
+sarif = {
+    "version": "2.1.0",
+    "runs": [
+        {
+            "tool": {
+                "driver": {
+                    "name": "ansible-lint",
+                    "rules": [
+                        {
+                            "id": "yaml[truthy]",
+                            "defaultConfiguration": {"level": "error"},
+                        },
+                    ],
+                },
+            },
+            "results": [
+                _result("syntax-check[specific]", "a.yml", "error"),
+                _result("name[missing]", "b.yml", "warning", "All tasks have names"),
+                _result("name[missing]", "c.yml", "warning", "All tasks are named"),
+                _result("yaml[truthy]", "c.yml"),
+                _result("fqcn[action-core]", "d.yml", "note", "fqcn[action-core] x"),
+                _result("no-changed-when", "d.yml", "warning", "x" * 200),
+                _result("no-changed-when", "e.yml", "warning", "x" * 200),
+                _result("risky-octal", "e.yml", "none", "Octal\nvalues"),
+            ],
+        },
+    ],
+}
+
+
+class TestSarifIndex(TestCase):
+    """The TestSarifIndex class."""
+
+    def test_get_exclude_paths(self) -> None:
+        """Test that files with errors are excluded."""
+        with temp_dir() as work:
+            sarif_file = Path(work.name) / "sarif.json"
+            sarif_file.write_text(json.dumps(sarif))
+            index = SarifIndex.load(str(sarif_file))
+            assert index.get_exclude_paths([], True) == ["a.yml"]
+            assert index.get_exclude_paths(["f.yml"], False) == [
+                "a.yml",
+                "c.yml",
+                "f.yml",
+            ]
+
+    def test_summary(self) -> None:
+        """Test that the summary is the same as the one of sarif-tools."""
+        with temp_dir() as work:
+            sarif_file = Path(work.name) / "sarif.json"
+            sarif_file.write_text(json.dumps(sarif))
+            summary_file = Path(work.name) / "summary.txt"
+            summary_op.generate_summary(
+                loader.load_sarif_files(str(sarif_file)),
+                str(summary_file),
+                False,
+            )
+            index = SarifIndex.load(str(sarif_file))
+            assert index.summary == summary_file.read_text()
@@ -0,0 +1,207 @@
+"""Test shard.py."""
+
+import json
+import sys
+
+from pathlib import Path
+from typing import Any
+from unittest import TestCase
+from unittest.mock import patch
+
+from ansible_content_parser.__main__ import main
+from ansible_content_parser.shard import Shard, merge_sarif, partition_lintables
+
+from .test_main import (
+    dot_ansible_lint,
+    dot_ansible_lint_name,
+    included_tasks,
+    included_tasks_name,
+    sample_playbook,
+    sample_playbook4,
+    sample_playbook4_name,
+    sample_playbook_name,
+    temp_dir,
+)
+
+
+def _get_sarif(results: list[dict[str, Any]]) -> dict[str, Any]:
+    return {
+        "version": "2.1.0",
+        "runs": [
+            {
+                "tool": {
+                    "driver": {
+                        "name": "ansible-lint",
+                        "rules": [{"id": r["ruleId"]} for r in results],
+                    },
+                },
+                "results": results,
+            },
+        ],
+    }
+
+
+def _get_result(rule_id: str, uri: str, line: int) -> dict[str, Any]:
+    return {
+        "ruleId": rule_id,
+        "message": {"text": rule_id},
+        "locations": [
+            {
+                "physicalLocation": {
+                    "artifactLocation": {"uri": uri},
+                    "region": {"startLine": line},
+                },
+            },
+        ],
+    }
+
+
+def _get_results(sarif_file: Path) -> list[tuple[str, str, int]]:
+    with sarif_file.open() as f:
+        sarif = json.load(f)
+    return sorted(
+        (
+            result["ruleId"],
+            result["locations"][0]["physicalLocation"]["artifactLocation"]["uri"],
+            result["locations"][0]["physicalLocation"]["region"]["startLine"],
+        )
+        for result in sarif["runs"][0]["results"]
+    )
+
+
+def _run(source: str, output: str, workers: int, *args: str) -> dict[str, Any]:
+    testargs = [
+        "ansible-content-parser",
+        "--lint-workers",
+        str(workers),
+        *args,
+        source,
+        output,
+    ]
+    with patch.object(sys, "argv", testargs), TestCase().assertRaises(SystemExit):
+        main()
+    metadata_path = Path(output) / "metadata"
+    result: dict[str, Any] = {
+        "results1": _get_results(metadata_path / "sarif.json"),
+        "repository": {
+            str(path.relative_to(Path(output))): path.read_text()
+            for path in sorted((Path(output) / "repository").rglob("*.yml*"))
+        },
+    }
+    if (metadata_path / "sarif-2.json").exists():
+        with (metadata_path / "lint-result-2.json").open() as f:
+            lint_result = json.load(f)
+        result["results"] = _get_results(metadata_path / "sarif-2.json")
+        result["excluded"] = lint_result["excluded"]
+        result["files"] = sorted(
+            (f["filename"], f["kind"]) for f in lint_result["files"]
+        )
+    return result
+
+
+def _create_source(source: Path) -> None:
+    (source / included_tasks_name).parent.mkdir(parents=True)
+    (source / sample_playbook_name).write_text(sample_playbook)
+    (source / sample_playbook4_name).write_text(sample_playbook4)
+    (source / included_tasks_name).write_text(included_tasks)
+    (source / dot_ansible_lint_name).write_text(dot_ansible_lint)
+
+
+class TestShard(TestCase):
+    """The TestShard class."""
+
+    def test_partition_lintables(self) -> None:
+        """Test that lintables are partitioned by roles, playbooks and collections."""
+        shards = partition_lintables(
+            [
+                ("collection/galaxy.yml", "galaxy"),
+                ("collection/roles/a/tasks/main.yml", "tasks"),
+                ("collection/vars/main.yml", "vars"),
+                ("playbook.yml", "playbook"),
+                ("roles/b", "role"),
+                ("roles/b/tasks/main.yml", "tasks"),
+                ("tasks/main.yml", "tasks"),
+            ],
+        )
+        assert shards == [
+            Shard(".", ["tasks/main.yml"]),
+            Shard("collection", ["collection/galaxy.yml", "collection/vars/main.yml"]),
+            Shard("collection/roles/a", ["collection/roles/a/tasks/main.yml"]),
+            Shard("playbook.yml", ["playbook.yml"]),
+            Shard("roles/b", ["roles/b", "roles/b/tasks/main.yml"]),
+        ]
+
+    def test_merge_sarif(self) -> None:
+        """Test that merged results do not depend on the order of the shards."""
+        sarif1 = _get_sarif(
+            [_get_result("yaml", "b.yml", 2), _get_result("name", "b.yml", 1)],
+        )
+        sarif2 = _get_sarif(
+            [_get_result("fqcn", "a.yml", 3), _get_result("name", "b.yml", 1)],
+        )
+        merged = merge_sarif([sarif1, sarif2])
+        assert merged == merge_sarif([sarif2, sarif1])
+        run = merged["runs"][0]
+        assert [r["id"] for r in run["tool"]["driver"]["rules"]] == [
+            "fqcn",
+            "name",
+            "yaml",
+        ]
+        assert [
+            (r["ruleId"], r["locations"][0]["physicalLocation"]["region"]["startLine"])
+            for r in run["results"]
+        ] == [("fqcn", 3), ("name", 1), ("yaml", 2)]
+
+    def test_cli_with_lint_workers(self) -> None:
+        """Test that sharded runs produce the same results as a single run."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "source"
+            _create_source(source)
+
+            result = _run(str(source), str(work_path / "output1"), 1)
+            assert result["excluded"] == [sample_playbook4_name]
+            assert _run(str(source), str(work_path / "output2"), 2) == result
+            assert _run(str(source), str(work_path / "output3"), 3) == result
+
+    def test_cli_with_lint_workers_and_no_exclude(self) -> None:
+        """Test that autofix is suppressed in all shards by syntax-check errors."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "source"
+            _create_source(source)
+
+            result = _run(str(source), str(work_path / "output1"), 1, "--no-exclude")
+            assert any(r[0].startswith("syntax-check") for r in result["results1"])
+            assert any(r[0].startswith("name[casing]") for r in result["results1"])
+            assert (
+                result["repository"][f"repository/{sample_playbook_name}"]
+                == sample_playbook
+            )
+            assert (
+                _run(str(source), str(work_path / "output2"), 2, "--no-exclude")
+                == result
+            )
+
+    def test_cli_with_lint_workers_and_fail_fast(self) -> None:
+        """Test that all shards stop at the first error with --fail-fast."""
+        with temp_dir() as work:
+            work_path = Path(work.name)
+            source = work_path / "source"
+            _create_source(source)
+
+            output = work_path / "output"
+            result = _run(
+                str(source),
+                str(output),
+                2,
+                "--no-exclude",
+                "--fail-fast",
+            )
+            assert len(result["results1"]) == 1
+            assert (
+                result["repository"][f"repository/{sample_playbook_name}"]
+                == sample_playbook
+            )
+            with (output / "metadata" / "lint-result.json").open() as f:
+                assert json.load(f)["fail_fast"]
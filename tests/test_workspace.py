@@ -0,0 +1,33 @@
+"""Test workspace.py."""
+
+from pathlib import Path
+from unittest import TestCase
+
+from ansible_content_parser.workspace import link_tree, materialize
+
+from .test_main import sample_playbook, temp_dir
+
+
+class TestWorkspace(TestCase):
+    """The TestWorkspace class."""
+
+    def test_link_tree(self) -> None:
+        """Test that files are shared with the source until they are materialized."""
+        with temp_dir() as work:
+            source = Path(work.name) / "source"
+            (source / "roles" / "a").mkdir(parents=True)
+            (source / "playbook.yml").write_text(sample_playbook)
+            (source / "roles" / "a" / "main.yml").write_text("---\n")
+
+            dest = Path(work.name) / "repository"
+            link_tree(str(source), dest)
+
+            assert (dest / "playbook.yml").read_text() == sample_playbook
+            assert (dest / "roles" / "a" / "main.yml").read_text() == "---\n"
+
+            playbook = dest / "playbook.yml"
+            materialize(playbook)
+            assert playbook.stat().st_nlink == 1
+            assert playbook.stat().st_ino != (source / "playbook.yml").stat().st_ino
+            playbook.write_text("---\n")
+            assert (source / "playbook.yml").read_text() == sample_playbook
@@ -0,0 +1,383 @@
+"""Benchmark the ingestion paths of ansible-content-parser.
+
+Synthetic repositories are generated along the file count, file size and directory depth
+axes and packed with each codec.  Safety checks, extraction, local directory copies and
+git clones are timed separately, and the results are written as JSON.  When a baseline
+result file is given with --compare, the exit code is 1 if any median time regressed by
+more than --tolerance.
+
+Usage:
+    python tools/benchmarks/ingestion.py --output results.json
+    python tools/benchmarks/ingestion.py --compare baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+
+from functools import partial
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from ansible_content_parser import safe_checks
+from ansible_content_parser.clone import clone_repository
+from ansible_content_parser.extract import extract_tar_file, extract_zip_file
+from ansible_content_parser.workspace import link_tree
+from git import Actor, Repo
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+codecs = ["tar", "tar.gz", "tar.bz2", "tar.xz", "zip"]
+
+_words = [
+    "name",
+    "hosts",
+    "tasks",
+    "become",
+    "ansible.builtin.copy",
+    "ansible.builtin.service",
+    "state",
+    "present",
+    "started",
+    "when",
+    "loop",
+    "item",
+]
+
+
+def generate_repository(
+    path: Path,
+    file_count: int,
+    file_size: int,
+    depth: int,
+) -> None:
+    """Generate YAML-like files spread over directories nested depth levels deep."""
+    rng = random.Random(f"{file_count}-{file_size}-{depth}")
+    for i in range(file_count):
+        directory = path.joinpath(*[f"d{(i >> level) % 4}" for level in range(depth)])
+        directory.mkdir(parents=True, exist_ok=True)
+        lines = ["---\n"]
+        size = 4
+        while size < file_size:
+            line = (
+                f"- {rng.choice(_words)}: {rng.choice(_words)}{rng.randrange(1000)}\n"
+            )
+            lines.append(line)
+            size += len(line)
+        (directory / f"f{i}.yml").write_text("".join(lines)[:file_size])
+
+
+def create_archive(source: Path, archive: Path, codec: str) -> None:
+    """Pack a directory with the given codec."""
+    if codec == "zip":
+        with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as z:
+            for p in sorted(source.rglob("*")):
+                z.write(p, p.relative_to(source))
+    else:
+        compression = codec.removeprefix("tar").removeprefix(".")
+        with tarfile.open(archive, f"w:{compression}") as tar:
+            tar.add(source, arcname=".")
+
+
+def create_bare_repository(source: Path, path: Path) -> str:
+    """Commit a directory to a new repository and return the file:// URL of its bare clone."""
+    work_tree = path / "work"
+    shutil.copytree(source, work_tree)
+    repo = Repo.init(work_tree)
+    repo.git.add("-A")
+    actor = Actor("Benchmark", "benchmark@example.com")
+    repo.index.commit("benchmark", author=actor, committer=actor)
+    bare = repo.clone(path / "bare.git", bare=True)
+    bare.git.config("uploadpack.allowFilter", "true")
+    return (path / "bare.git").as_uri()
+
+
+def measure(
+    func: Callable[[Path], object],
+    work_path: Path,
+    repeat: int,
+) -> list[float]:
+    """Call func with a new destination path repeat times and return the elapsed times."""
+    times = []
+    for i in range(repeat):
+        dest = work_path / f"dest-{i}"
+        start = time.perf_counter()
+        func(dest)
+        times.append(time.perf_counter() - start)
+        shutil.rmtree(dest, ignore_errors=True)
+    return times
+
+
+def _check_tar_file(source: str, _: Path) -> None:
+    safe_checks.check_tar_file_is_safe(source)
+
+
+def _check_zip_file(source: str, _: Path) -> None:
+    safe_checks.check_zip_file_is_safe(source)
+
+
+def _extract_all_tar(source: Path, dest: Path) -> None:
+    with tarfile.open(source) as tar:
+        tar.extractall(dest)  # noqa: S202
+
+
+def _extract_all_zip(source: Path, dest: Path) -> None:
+    with zipfile.ZipFile(source) as z:
+        z.extractall(dest)  # noqa: S202
+
+
+def get_archive_benchmarks(
+    archive: Path,
+    codec: str,
+    workers: list[int],
+) -> dict[str, Callable[[Path], object]]:
+    """Return the functions to be timed for an archive."""
+    source = str(archive)
+    benchmarks: dict[str, Callable[[Path], object]] = {}
+    if codec == "zip":
+        benchmarks["check_zip_file_is_safe"] = partial(_check_zip_file, source)
+        benchmarks["extractall"] = partial(_extract_all_zip, archive)
+        for n in workers:
+            benchmarks[f"extract_zip_file[workers={n}]"] = partial(
+                extract_zip_file,
+                source,
+                workers=n,
+            )
+    else:
+        benchmarks["check_tar_file_is_safe"] = partial(_check_tar_file, source)
+        benchmarks["extractall"] = partial(_extract_all_tar, archive)
+        for n in workers:
+            benchmarks[f"extract_tar_file[workers={n}]"] = partial(
+                extract_tar_file,
+                source,
+                workers=n,
+            )
+    return benchmarks
+
+
+def _clone(url: str, dest: Path, **kwargs: Any) -> None:
+    dest.mkdir()
+    clone_repository(url, dest, **kwargs)
+
+
+def get_clone_benchmarks(url: str) -> dict[str, Callable[[Path], object]]:
+    """Return the functions to be timed for a git repository."""
+    return {
+        "clone": partial(_clone, url),
+        "clone[depth=1,filter=blob:none,sparse]": partial(
+            _clone,
+            url,
+            depth=1,
+            blob_filter="blob:none",
+            sparse_checkout=True,
+        ),
+    }
+
+
+def run(args: argparse.Namespace) -> list[dict[str, Any]]:
+    """Run all benchmarks and return the results."""
+    # Large inputs must not be rejected by the limits.
+    safe_checks.threshold_entries = sys.maxsize
+    safe_checks.threshold_size = sys.maxsize
+
+    results = []
+    for file_count, file_size, depth in itertools.product(
+        args.file_counts,
+        args.file_sizes,
+        args.depths,
+    ):
+        with tempfile.TemporaryDirectory() as work:
+            work_path = Path(work)
+            source = work_path / "source"
+            generate_repository(source, file_count, file_size, depth)
+
+            inputs: list[tuple[str, dict[str, Callable[[Path], object]]]] = []
+            for codec in args.codecs:
+                archive = work_path / f"source.{codec}"
+                create_archive(source, archive, codec)
+                inputs.append(
+                    (codec, get_archive_benchmarks(archive, codec, args.workers)),
+                )
+            inputs.append(
+                (
+                    "directory",
+                    {
+                        "copytree": partial(shutil.copytree, source),
+                        "link_tree": partial(link_tree, str(source)),
+                    },
+                ),
+            )
+            if not args.skip_git:
+                url = create_bare_repository(source, work_path / "git")
+                inputs.append(("git", get_clone_benchmarks(url)))
+
+            for codec, benchmarks in inputs:
+                for name, func in benchmarks.items():
+                    times = measure(func, work_path, args.repeat)
+                    result = {
+                        "path": name,
+                        "codec": codec,
+                        "file_count": file_count,
+                        "file_size": file_size,
+                        "depth": depth,
+                        "times": times,
+                        "min": min(times),
+                        "median": statistics.median(times),
+                    }
+                    print(  # noqa: T201
+                        f"{name:45} {codec:9} files={file_count:<6} size={file_size:<7} "
+                        f"depth={depth:<2} median={result['median']:.4f}s",
+                        file=sys.stderr,
+                    )
+                    results.append(result)
+    return results
+
+
+def _get_key(result: dict[str, Any]) -> tuple[Any, ...]:
+    return tuple(
+        result[k] for k in ["path", "codec", "file_count", "file_size", "depth"]
+    )
+
+
+def compare(
+    results: list[dict[str, Any]],
+    baseline: list[dict[str, Any]],
+    tolerance: float,
+) -> list[str]:
+    """Return descriptions of the results whose median regressed beyond tolerance."""
+    baseline_medians = {_get_key(r): r["median"] for r in baseline}
+    regressions = []
+    for result in results:
+        base = baseline_medians.get(_get_key(result))
+        if base and result["median"] > base * (1 + tolerance):
+            regressions.append(
+                f"{_get_key(result)}: {base:.4f}s -> {result['median']:.4f}s",
+            )
+    return regressions
+
+
+def get_environment() -> dict[str, str]:
+    """Return the versions of the software the benchmark ran with."""
+    environment = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+    for name in ["ansible-content-parser", "GitPython"]:
+        try:
+            environment[name] = version(name)
+        except PackageNotFoundError:
+            environment[name] = "(not found)"
+    environment["git"] = Repo.GitCommandWrapperType().version()
+    return environment
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    """Parse arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the ingestion paths of ansible-content-parser.",
+    )
+    parser.add_argument(
+        "--file-counts",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 5000],
+        help="Numbers of files in generated repositories (default: 100 1000 5000).",
+    )
+    parser.add_argument(
+        "--file-sizes",
+        type=int,
+        nargs="+",
+        default=[1024, 65536],
+        help="Sizes of generated files in bytes (default: 1024 65536).",
+    )
+    parser.add_argument(
+        "--depths",
+        type=int,
+        nargs="+",
+        default=[1, 8],
+        help="Directory depths of generated files (default: 1 8).",
+    )
+    parser.add_argument(
+        "--codecs",
+        nargs="+",
+        choices=codecs,
+        default=codecs,
+        help="Archive formats to be benchmarked (default: all).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[1, 4],
+        help="Numbers of extraction threads (default: 1 4).",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Number of times each benchmark is run (default: 3).",
+    )
+    parser.add_argument(
+        "--skip-git",
+        action="store_true",
+        help="Do not benchmark git clones.",
+    )
+    parser.add_argument(
+        "--output",
+        help="Write the results to the specified JSON file instead of the standard output.",
+    )
+    parser.add_argument(
+        "--compare",
+        help="Compare the results with the specified JSON file of a previous run.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Ratio of slowdown allowed by --compare (default: 0.2).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str]) -> int:
+    """Run the benchmarks and return the exit code."""
+    args = parse_args(argv)
+    output: dict[str, Any] = {
+        "environment": get_environment(),
+        "results": run(args),
+    }
+
+    if args.output:
+        with Path(args.output).open("w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+    else:
+        json.dump(output, sys.stdout, indent=2)
+
+    if args.compare:
+        with Path(args.compare).open(encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(output["results"], baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)  # noqa: T201
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
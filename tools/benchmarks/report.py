@@ -0,0 +1,226 @@
+"""Benchmark the generation of report.txt of ansible-content-parser.
+
+Synthetic lint results are generated along the file count axis with a fixed ratio of
+excluded and autofixed files, and generate_report() is timed on them.  The results are
+written as JSON with the time per file, which stays flat when the report is generated in
+linear time.  When a baseline result file is given with --compare, the exit code is 1 if
+any median time regressed by more than --tolerance.
+
+Usage:
+    python tools/benchmarks/report.py --output results.json
+    python tools/benchmarks/report.py --compare baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any
+
+from ansible_content_parser.report import generate_report
+
+
+_kinds = ["playbook", "tasks", "vars", "meta", "handlers", "yaml", ""]
+
+_modules = [
+    "ansible.builtin.copy",
+    "ansible.builtin.service",
+    "ansible.builtin.template",
+    "ansible.builtin.debug",
+]
+
+
+def generate_metadata(
+    output: Path,
+    file_count: int,
+    excluded_ratio: float,
+) -> list[str]:
+    """Write lint results and sage objects of a synthetic repository to output.
+
+    The paths of the excluded files are returned.
+    """
+    rng = random.Random(file_count)
+    metadata_path = output / "metadata"
+    metadata_path.mkdir(parents=True)
+    files: list[dict[str, Any]] = [
+        {
+            "filename": f"roles/r{i % 100}/tasks/f{i}.yml",
+            "kind": rng.choice(_kinds),
+            "updated": rng.random() < 0.1,
+        }
+        for i in range(file_count)
+    ]
+    excluded = sorted(f["filename"] for f in files if rng.random() < excluded_ratio)
+    with (metadata_path / "lint-result.json").open("w", encoding="utf-8") as f:
+        json.dump({"files": files}, f)
+    excluded_set = set(excluded)
+    with (metadata_path / "lint-result-2.json").open("w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "files": [f for f in files if f["filename"] not in excluded_set],
+                "excluded": excluded,
+            },
+            f,
+        )
+    with (metadata_path / "sage-objects.json").open("w", encoding="utf-8") as f:
+        for _ in range(file_count):
+            task = {
+                "py/object": "sage_scan.models.Task",
+                "module": rng.choice(_modules),
+            }
+            f.write(json.dumps(task) + "\n")
+    return excluded
+
+
+def _generate_report(output: Path, excluded: list[str]) -> None:
+    metadata_path = output / "metadata"
+    args = argparse.Namespace(source="source", output=str(output))
+    generate_report(
+        str(metadata_path / "lint-result.json"),
+        str(metadata_path / "lint-result-2.json"),
+        None,
+        None,
+        args,
+        excluded,
+        sage_objects=str(metadata_path / "sage-objects.json"),
+    )
+
+
+def run(args: argparse.Namespace) -> list[dict[str, Any]]:
+    """Run all benchmarks and return the results."""
+    results = []
+    for file_count in args.file_counts:
+        with tempfile.TemporaryDirectory() as work:
+            output = Path(work)
+            excluded = generate_metadata(output, file_count, args.excluded_ratio)
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                _generate_report(output, excluded)
+                times.append(time.perf_counter() - start)
+        result = {
+            "path": "generate_report",
+            "file_count": file_count,
+            "excluded_count": len(excluded),
+            "times": times,
+            "min": min(times),
+            "median": statistics.median(times),
+            "median_per_file": statistics.median(times) / file_count,
+        }
+        print(  # noqa: T201
+            f"files={file_count:<7} excluded={len(excluded):<6} "
+            f"median={result['median']:.4f}s "
+            f"per_file={result['median_per_file'] * 1e6:.2f}us",
+            file=sys.stderr,
+        )
+        results.append(result)
+    return results
+
+
+def compare(
+    results: list[dict[str, Any]],
+    baseline: list[dict[str, Any]],
+    tolerance: float,
+) -> list[str]:
+    """Return descriptions of the results whose median regressed beyond tolerance."""
+    baseline_medians = {r["file_count"]: r["median"] for r in baseline}
+    regressions = []
+    for result in results:
+        base = baseline_medians.get(result["file_count"])
+        if base and result["median"] > base * (1 + tolerance):
+            regressions.append(
+                f"files={result['file_count']}: {base:.4f}s -> {result['median']:.4f}s",
+            )
+    return regressions
+
+
+def get_environment() -> dict[str, str]:
+    """Return the versions of the software the benchmark ran with."""
+    environment = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+    try:
+        environment["ansible-content-parser"] = version("ansible-content-parser")
+    except PackageNotFoundError:
+        environment["ansible-content-parser"] = "(not found)"
+    return environment
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    """Parse arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the generation of report.txt of ansible-content-parser.",
+    )
+    parser.add_argument(
+        "--file-counts",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="Numbers of files in lint results (default: 1000 10000 100000).",
+    )
+    parser.add_argument(
+        "--excluded-ratio",
+        type=float,
+        default=0.05,
+        help="Ratio of excluded files (default: 0.05).",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Number of times each benchmark is run (default: 3).",
+    )
+    parser.add_argument(
+        "--output",
+        help="Write the results to the specified JSON file instead of the standard output.",
+    )
+    parser.add_argument(
+        "--compare",
+        help="Compare the results with the specified JSON file of a previous run.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Ratio of slowdown allowed by --compare (default: 0.2).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str]) -> int:
+    """Run the benchmarks and return the exit code."""
+    args = parse_args(argv)
+    output: dict[str, Any] = {
+        "environment": get_environment(),
+        "results": run(args),
+    }
+
+    if args.output:
+        with Path(args.output).open("w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+    else:
+        json.dump(output, sys.stdout, indent=2)
+
+    if args.compare:
+        with Path(args.compare).open(encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(output["results"], baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)  # noqa: T201
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))